@@ -1,10 +1,4 @@
 const API_BASE = 'http://localhost:8000';
-const TMDB_API_KEY = 'f76f21adfb842abd3437c23e9506a334';
-const TMDB_IMAGE_BASE = 'https://image.tmdb.org/t/p/w500';
-const TMDB_SEARCH_BASE = 'https://api.themoviedb.org/3/search/movie';
-const WATCHMODE_API_KEY = 'qhoLfGsMly6yFmDNBjmOD9JmwWB0f9Zl98MiZQRx'; // Get from https://api.watchmode.com/
-const WATCHMODE_SEARCH_BASE = 'https://api.watchmode.com/v1/search/';
-const WATCHMODE_TITLE_BASE = 'https://api.watchmode.com/v1/title/';
 
 const movieInput = document.getElementById('movieInput');
 const modelSelect = document.getElementById('modelSelect');
@@ -88,7 +82,7 @@ async function searchMovies() {
 
     try {
         const response = await fetch(
-            `${API_BASE}/search?query=${encodeURIComponent(query)}&limit=5`
+            `${API_BASE}/autocomplete?prefix=${encodeURIComponent(query)}&limit=5`
         );
         const data = await response.json();
 
@@ -163,7 +157,7 @@ async function showMovieDetails(movie, posterUrl) {
     modal.style.display = "block";
 
     // Fetch streaming availability
-    fetchStreamingInfo(movie.title, movie.year);
+    fetchStreamingInfo(movie.movie_id);
 }
 
 async function getRecommendations(movieTitle) {
@@ -199,32 +193,52 @@ async function getRecommendations(movieTitle) {
     }
 }
 
-// Cache for poster URLs and streaming data
+// Cache for poster URLs and streaming data (the server keeps a persistent cache too)
 const posterCache = {};
 const streamingCache = {};
 
-async function fetchPosterUrl(movieTitle, year) {
-    const cacheKey = `${movieTitle}_${year}`;
-
-    if (posterCache[cacheKey]) return posterCache[cacheKey];
-
-    if (!TMDB_API_KEY || TMDB_API_KEY === 'YOUR_API_KEY_HERE') return null;
+async function fetchMetadata(movieIds, includeStreaming = false) {
+    const response = await fetch(`${API_BASE}/metadata`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ movie_ids: movieIds, include_streaming: includeStreaming })
+    });
+    if (!response.ok) {
+        throw new Error(`Metadata request failed (${response.status})`);
+    }
+    const data = await response.json();
+    return data.metadata || {};
+}
 
-    try {
-        const searchUrl = `${TMDB_SEARCH_BASE}?api_key=${TMDB_API_KEY}&query=${encodeURIComponent(movieTitle)}${year ? `&year=${year}` : ''}`;
-        const response = await fetch(searchUrl);
-        const data = await response.json();
+async function loadPosters(movies) {
+    // One batched request for every card on the page
+    const missing = movies.map(m => m.movie_id).filter(id => !(id in posterCache));
 
-        if (data.results && data.results.length > 0 && data.results[0].poster_path) {
-            const posterUrl = `${TMDB_IMAGE_BASE}${data.results[0].poster_path}`;
-            posterCache[cacheKey] = posterUrl;
-            return posterUrl;
+    if (missing.length > 0) {
+        try {
+            const metadata = await fetchMetadata(missing);
+            missing.forEach(id => {
+                posterCache[id] = metadata[id] ? metadata[id].poster_url : null;
+            });
+        } catch (error) {
+            console.error('Error fetching posters:', error);
         }
-    } catch (error) {
-        console.error('Error fetching poster:', error);
     }
 
-    return null;
+    movies.forEach((movie, index) => {
+        const posterUrl = posterCache[movie.movie_id] || null;
+        // Update stored data
+        if (window.currentRecommendations[index]) {
+            window.currentRecommendations[index].posterUrl = posterUrl;
+        }
+
+        if (posterUrl) {
+            const posterElement = document.getElementById(`poster-${index}`);
+            if (posterElement) {
+                posterElement.innerHTML = `<img src="${posterUrl}" alt="${movie.title}" class="rec-poster">`;
+            }
+        }
+    });
 }
 
 function extractGenres(genres) {
@@ -241,7 +255,7 @@ function extractGenres(genres) {
 async function displayResults(data) {
     let html = `
         <div class="results">
-            <div class="query-movie">More Like: ${data.query_movie}</div>
+            <div class="query-movie">More Like: ${data.matched_title || data.query_movie}</div>
             <div class="recommendations">
     `;
 
@@ -280,20 +294,7 @@ async function displayResults(data) {
     content.innerHTML = html;
 
     // Fetch posters
-    data.recommendations.forEach(async (movie, index) => {
-        const posterUrl = await fetchPosterUrl(movie.title, movie.year);
-        // Update stored data
-        if (window.currentRecommendations[index]) {
-            window.currentRecommendations[index].posterUrl = posterUrl;
-        }
-
-        if (posterUrl) {
-            const posterElement = document.getElementById(`poster-${index}`);
-            if (posterElement) {
-                posterElement.innerHTML = `<img src="${posterUrl}" alt="${movie.title}" class="rec-poster">`;
-            }
-        }
-    });
+    loadPosters(data.recommendations);
 }
 
 function handleMovieClick(index) {
@@ -327,44 +328,22 @@ async function loadStats() {
     }
 }
 
-async function fetchStreamingInfo(movieTitle, year) {
-    const cacheKey = `${movieTitle}_${year}`;
+async function fetchStreamingInfo(movieId) {
     const streamingInfoDiv = document.getElementById('streaming-info');
 
     if (!streamingInfoDiv) return;
 
     // Check cache first
-    if (streamingCache[cacheKey]) {
-        displayStreamingInfo(streamingCache[cacheKey]);
+    if (streamingCache[movieId]) {
+        displayStreamingInfo(streamingCache[movieId]);
         return;
     }
 
-    // Check if API key is configured
-    if (!WATCHMODE_API_KEY || WATCHMODE_API_KEY === 'YOUR_WATCHMODE_API_KEY_HERE') {
-        console.log('Watchmode API key not configured');
-        streamingInfoDiv.innerHTML = `
-            <div class="streaming-header">Where to Watch</div>
-            <div style="color:#999; font-size:0.85em;">
-                Configure Watchmode API key to see streaming availability
-            </div>
-        `;
-        return;
-    }
-
-    console.log('Fetching streaming info for:', movieTitle, year);
-
     try {
-        // Step 1: Search for the movie to get Watchmode ID
-        const searchUrl = `${WATCHMODE_SEARCH_BASE}?apiKey=${WATCHMODE_API_KEY}&search_field=name&search_value=${encodeURIComponent(movieTitle)}`;
-        console.log('Watchmode search URL:', searchUrl.replace(WATCHMODE_API_KEY, 'API_KEY_HIDDEN'));
-
-        const searchResponse = await fetch(searchUrl);
-        console.log('Search response status:', searchResponse.status);
+        const metadata = await fetchMetadata([movieId], true);
+        const entry = metadata[movieId];
 
-        const searchData = await searchResponse.json();
-        console.log('Search results:', searchData);
-
-        if (!searchData.title_results || searchData.title_results.length === 0) {
+        if (!entry || entry.sources === null) {
             streamingInfoDiv.innerHTML = `
                 <div class="streaming-header">Where to Watch</div>
                 <div style="color:#999; font-size:0.85em;">Streaming info not available</div>
@@ -372,26 +351,9 @@ async function fetchStreamingInfo(movieTitle, year) {
             return;
         }
 
-        // Find best match (prefer exact year match)
-        let bestMatch = searchData.title_results[0];
-        if (year) {
-            const yearMatch = searchData.title_results.find(r => r.year === parseInt(year));
-            if (yearMatch) bestMatch = yearMatch;
-        }
-
-        // Step 2: Get detailed info including sources
-        const detailUrl = `${WATCHMODE_TITLE_BASE}${bestMatch.id}/details/?apiKey=${WATCHMODE_API_KEY}&append_to_response=sources`;
-        console.log('Fetching details for Watchmode ID:', bestMatch.id);
-
-        const detailResponse = await fetch(detailUrl);
-        console.log('Detail response status:', detailResponse.status);
-
-        const detailData = await detailResponse.json();
-        console.log('Detail data:', detailData);
-
         // Cache the result
-        streamingCache[cacheKey] = detailData;
-        displayStreamingInfo(detailData);
+        streamingCache[movieId] = entry;
+        displayStreamingInfo(entry);
 
     } catch (error) {
         console.error('Error fetching streaming info:', error);
@@ -601,19 +563,7 @@ async function displayGenreResults(data) {
     content.innerHTML = html;
 
     // Fetch posters
-    data.recommendations.forEach(async (movie, index) => {
-        const posterUrl = await fetchPosterUrl(movie.title, movie.year);
-        if (window.currentRecommendations[index]) {
-            window.currentRecommendations[index].posterUrl = posterUrl;
-        }
-
-        if (posterUrl) {
-            const posterElement = document.getElementById(`poster-${index}`);
-            if (posterElement) {
-                posterElement.innerHTML = `<img src="${posterUrl}" alt="${movie.title}" class="rec-poster">`;
-            }
-        }
-    });
+    loadPosters(data.recommendations);
 }
 
 function debounce(func, delay) {
@@ -0,0 +1,165 @@
+"""
+Movie Recommendation System - Admission Control
+Concurrency limit with fast load shedding, and per-request deadlines
+"""
+
+import asyncio
+import time
+from collections import deque
+import numpy as np
+
+
+class Deadline:
+    """
+    Absolute time budget for one request
+
+    Based on time.monotonic, so it can be checked from worker threads as well as
+    the event loop. Long-running work calls expired() between chunks.
+    """
+
+    __slots__ = ('budget_s', 'expires_at')
+
+    def __init__(self, budget_s):
+        """
+        Args:
+            budget_s: Seconds from now until the deadline
+        """
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self):
+        """Seconds left (negative once expired)"""
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def elapsed_ms(self):
+        return (self.budget_s - self.remaining()) * 1000.0
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a short, bounded wait queue
+
+    Up to `max_concurrent` requests run at once. Up to `max_queued` more may wait
+    at most `queue_timeout_s` for a slot; anything beyond that is rejected
+    immediately, so overload turns into fast 503s instead of growing latency.
+    """
+
+    def __init__(self, max_concurrent=64, max_queued=0, queue_timeout_s=0.1, retry_after_s=1,
+                 latency_window=2048):
+        """
+        Args:
+            max_concurrent: Requests processed at the same time (0 disables the limit)
+            max_queued: Requests allowed to wait for a slot
+            queue_timeout_s: Longest wait for a slot before shedding
+            retry_after_s: Retry-After value sent with shed responses
+            latency_window: Recent latencies kept per endpoint for percentiles
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self.latency_window = latency_window
+        self._latencies = {}
+        self._requests = {}
+
+        self.in_flight = 0
+        self.queued = 0
+        self._released = None
+
+        self.stats = {
+            'admitted': 0,
+            'shed_concurrency': 0,
+            'shed_queue_timeout': 0,
+            'deadline_exceeded': 0,
+            'partial_responses': 0,
+            'peak_in_flight': 0
+        }
+
+    @property
+    def enabled(self):
+        return self.max_concurrent > 0
+
+    async def acquire(self):
+        """
+        Take a processing slot, waiting briefly if the queue has room
+
+        Raises:
+            Overloaded: If no slot is available in time
+        """
+        if self.in_flight >= self.max_concurrent:
+            if self.queued >= self.max_queued:
+                self.stats['shed_concurrency'] += 1
+                raise Overloaded("Server at concurrency limit", self.retry_after_s)
+            await self._wait_for_slot()
+
+        self.in_flight += 1
+        self.stats['admitted'] += 1
+        if self.in_flight > self.stats['peak_in_flight']:
+            self.stats['peak_in_flight'] = self.in_flight
+
+    async def _wait_for_slot(self):
+        if self._released is None:
+            self._released = asyncio.Condition()
+        self.queued += 1
+        try:
+            async with self._released:
+                await asyncio.wait_for(
+                    self._released.wait_for(lambda: self.in_flight < self.max_concurrent),
+                    self.queue_timeout_s
+                )
+        except asyncio.TimeoutError:
+            self.stats['shed_queue_timeout'] += 1
+            raise Overloaded("Timed out waiting for a processing slot", self.retry_after_s)
+        finally:
+            self.queued -= 1
+
+    async def release(self):
+        self.in_flight -= 1
+        if self.queued and self._released is not None:
+            async with self._released:
+                self._released.notify()
+
+    def record(self, endpoint, seconds):
+        """Record the latency (including any wait for a slot) of one request to `endpoint`"""
+        if endpoint not in self._latencies:
+            self._latencies[endpoint] = deque(maxlen=self.latency_window)
+            self._requests[endpoint] = 0
+        self._latencies[endpoint].append(seconds * 1000.0)
+        self._requests[endpoint] += 1
+
+    def endpoint_metrics(self):
+        """Request count and latency percentiles (ms) per endpoint route"""
+        endpoints = {}
+        for endpoint, window in self._latencies.items():
+            latencies = np.fromiter(window, dtype=np.float64)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            endpoints[endpoint] = {
+                'requests': self._requests[endpoint],
+                'p50': round(float(p50), 3),
+                'p95': round(float(p95), 3),
+                'p99': round(float(p99), 3),
+                'mean': round(float(latencies.mean()), 3)
+            }
+        return endpoints
+
+    def metrics(self):
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queued': self.max_queued,
+            'queue_timeout_ms': self.queue_timeout_s * 1000.0,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            **self.stats
+        }
@@ -3,19 +3,35 @@ Movie Recommendation System - FastAPI Server
 Lightweight REST API for real-time recommendations
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 import uvicorn
 from pathlib import Path
 import sys
+import os
+import time
+import asyncio
+import hashlib
+import threading
+import contextvars
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from movie_recommender import MovieRecommender
+from movie_recommender import MovieRecommender, SERVING_DIR
+from similarity_shards import SHARDS_DIR
+from metadata_service import create_metadata_service
+from request_dispatcher import RecommendDispatcher
+from model_variants import VariantRegistry, parse_traffic
+from admission import AdmissionController, Deadline, Overloaded
+from request_profiler import RequestProfiler, is_profiling, profiled
+from memory_report import build_report
+from user_history import HistoryStore
 
 
 # Initialize FastAPI app
@@ -34,18 +50,477 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load recommender model
-try:
-    # Use absolute path relative to this script
-    script_dir = Path(__file__).parent
-    models_dir = script_dir.parent / 'results'
-    recommender = MovieRecommender(models_dir=str(models_dir))
-    print("[OK] MovieRecommender loaded successfully!")
-except Exception as e:
-    print(f"✗ Error loading models: {type(e).__name__}: {e}")
-    import traceback
-    traceback.print_exc()
-    recommender = None
+# Models load in a background thread at startup, so the server accepts
+# connections (and answers /ready) while the pickles are still being read
+MODELS_DIR = os.environ.get('MODELS_DIR', str(Path(__file__).parent.parent / 'results'))
+WARMUP_ENABLED = os.environ.get('WARMUP', '1') != '0'
+WARMUP_TOP_N = int(os.environ.get('WARMUP_TOP_N', 100))
+WARMUP_TITLES = [t.strip() for t in os.environ.get('WARMUP_TITLES', '').split('|') if t.strip()]
+WARMUP_STAGES = ('touch_arrays', 'precompute')
+# 'lean' serves exported NumPy/JSON artifacts without importing pandas/sklearn;
+# 'sharded' is lean with the similarity matrix split across local shard processes
+SERVING_MODE = os.environ.get('SERVING_MODE', 'full')
+# A/B testing: extra variants loaded next to the default one (sharing its catalog),
+# and the split used to assign requests that carry a user_id, e.g. "improved:90,svd:10"
+MODEL_VARIANTS = [v.strip() for v in os.environ.get('MODEL_VARIANTS', '').split(',') if v.strip()]
+VARIANT_TRAFFIC = parse_traffic(os.environ.get('VARIANT_TRAFFIC', ''))
+VARIANT_SALT = os.environ.get('VARIANT_SALT', '')
+
+# Watched movies per user_id; requests carrying a user_id never get them recommended
+history = HistoryStore(
+    max_users=int(os.environ.get('HISTORY_MAX_USERS', 100000)),
+    max_items_per_user=int(os.environ.get('HISTORY_MAX_ITEMS', 5000))
+)
+
+
+
+class ServingState(NamedTuple):
+    """
+    One model version as served, published with a single assignment to `serving`
+
+    Requests read `serving` once (see current_state) and use only that
+    snapshot, so a hot swap can never hand one request a new recommender with
+    the old variant registry or the reverse. Histories are keyed by the
+    snapshot's recommender.movie_ids.
+    """
+    recommender: MovieRecommender
+    dispatcher: RecommendDispatcher
+    variants: VariantRegistry
+
+
+serving = None
+# The snapshot a request was admitted with, so its ETag and its body come from the same version
+request_serving_state = contextvars.ContextVar('request_serving_state', default=None)
+loading_state = {
+    "status": "pending",
+    "stage": None,
+    "completed_stages": [],
+    "total_stages": len(MovieRecommender.LOAD_STAGES) + (len(WARMUP_STAGES) if WARMUP_ENABLED else 0),
+    "elapsed_s": None,
+    "error": None
+}
+
+
+def create_dispatcher(variant_recommender):
+    """Coalesce identical in-flight /recommend calls and micro-batch distinct ones"""
+    return RecommendDispatcher(
+        variant_recommender,
+        window_ms=float(os.environ.get('DISPATCH_WINDOW_MS', 2.0)),
+        max_batch_size=int(os.environ.get('DISPATCH_MAX_BATCH', 32))
+    )
+
+
+def build_serving_stack(models_dir, on_progress=None):
+    """
+    Load a MovieRecommender, its extra model variants and their dispatchers
+    
+    Returns:
+        ServingState of the default recommender, its dispatcher and the registry
+    """
+    new_recommender = MovieRecommender(
+        models_dir=str(models_dir),
+        progress_callback=on_progress,
+        serving_mode=SERVING_MODE
+    )
+    
+    recommenders = {new_recommender.variant_name: new_recommender}
+    for name in MODEL_VARIANTS:
+        if name not in recommenders:
+            recommenders[name] = new_recommender.load_variant(name)
+    new_variants = VariantRegistry(
+        recommenders,
+        {name: create_dispatcher(rec) for name, rec in recommenders.items()},
+        default=new_recommender.variant_name,
+        traffic=VARIANT_TRAFFIC or None,
+        salt=VARIANT_SALT
+    )
+    return ServingState(new_recommender, new_variants.dispatchers[new_variants.default], new_variants)
+
+
+def current_state():
+    """The ServingState this request uses; 503 until models are loaded"""
+    state = request_serving_state.get() or serving
+    if state is None:
+        raise HTTPException(status_code=503, detail="Models not loaded")
+    return state
+
+
+def warm_up_serving_stack(new_recommender, new_variants, on_progress=None):
+    """
+    Pre-touch the loaded arrays and precompute results for the top titles, for every variant
+    
+    Returns:
+        Dict with bytes touched and number of precomputed titles
+    """
+    on_progress = on_progress or (lambda stage: None)
+    
+    bytes_touched = sum(rec.warm_up() for rec in new_variants.recommenders.values())
+    on_progress('touch_arrays')
+    
+    indices = new_recommender.most_popular_indices(WARMUP_TOP_N)
+    for title in WARMUP_TITLES:
+        idx = new_recommender.get_movie_by_title(title)
+        if idx is not None and idx not in indices:
+            indices.append(idx)
+    for variant_dispatcher in new_variants.dispatchers.values():
+        variant_dispatcher.precompute(indices)
+    on_progress('precompute')
+    
+    return {"bytes_touched": bytes_touched, "precomputed_titles": len(indices)}
+
+
+def load_recommender(models_dir=MODELS_DIR, warmup=WARMUP_ENABLED):
+    """
+    Load models, build the dispatcher and optionally warm up, updating loading_state
+    
+    The recommender is only published (and /ready only succeeds) once warm-up is done.
+    """
+    global serving
+    
+    start = time.time()
+    loading_state.update(status="loading", stage=None, completed_stages=[], error=None)
+    
+    def on_progress(stage):
+        loading_state["stage"] = stage
+        loading_state["completed_stages"].append(stage)
+        loading_state["elapsed_s"] = round(time.time() - start, 3)
+    
+    try:
+        new_state = build_serving_stack(models_dir, on_progress)
+        if warmup:
+            loading_state["status"] = "warming"
+            loading_state["warmup"] = warm_up_serving_stack(new_state.recommender, new_state.variants, on_progress)
+        
+        # Bind before publishing: requests on the new recommender must find histories in its catalog
+        history.bind(new_state.recommender.movie_ids)
+        serving = new_state
+        loading_state["status"] = "ready"
+        print("[OK] MovieRecommender loaded successfully!")
+    except Exception as e:
+        print(f"✗ Error loading models: {type(e).__name__}: {e}")
+        import traceback
+        traceback.print_exc()
+        loading_state["status"] = "failed"
+        loading_state["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        loading_state["elapsed_s"] = round(time.time() - start, 3)
+
+
+# Hot model swap: new artifacts are loaded next to the live ones, validated with
+# smoke queries, then published with a single assignment of `serving`. Requests
+# already holding the old ServingState finish on it; version-keyed ETags change with it.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+
+reload_lock = threading.Lock()
+reload_history = []
+
+
+def require_admin(token):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require it"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled (set ADMIN_TOKEN)")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def reload_models(models_dir=None, warmup=WARMUP_ENABLED, trigger="admin"):
+    """
+    Load, validate and atomically swap in a new model version
+    
+    Returns:
+        Report dict with timings and old/new versions
+    
+    Raises:
+        RuntimeError: If another reload is already running
+        Exception: Any load/validation error; the current models stay in service
+    """
+    global serving
+    
+    if not reload_lock.acquire(blocking=False):
+        raise RuntimeError("A model reload is already in progress")
+    
+    report = {
+        "trigger": trigger,
+        "started_at": time.time(),
+        "old_version": serving.recommender.model_version if serving is not None else None
+    }
+    try:
+        t0 = time.perf_counter()
+        new_state = build_serving_stack(models_dir or MODELS_DIR)
+        new_recommender = new_state.recommender
+        t1 = time.perf_counter()
+        report["validation"] = {
+            name: rec.validate() for name, rec in new_state.variants.recommenders.items()
+        }
+        t2 = time.perf_counter()
+        warmup_info = warm_up_serving_stack(new_recommender, new_state.variants) if warmup else None
+        t3 = time.perf_counter()
+        
+        # Histories hold catalog indices: bind them to the new catalog before it serves
+        # anything. Requests still running on the old one pass its movie_ids and are translated.
+        history.bind(new_recommender.movie_ids)
+        t4 = time.perf_counter()
+        # The swap itself: one assignment. The old state is held until after the timing, so
+        # dropping it (and, sharded, stopping its shard processes) happens outside the swap
+        retired, serving = serving, new_state
+        t5 = time.perf_counter()
+        del retired
+        
+        report.update({
+            "status": "swapped",
+            "new_version": new_recommender.model_version,
+            "load_s": round(t1 - t0, 3),
+            "validate_s": round(t2 - t1, 3),
+            "warmup_s": round(t3 - t2, 3),
+            "history_bind_ms": round((t4 - t3) * 1000, 3),
+            "swap_ms": round((t5 - t4) * 1000, 4),
+            "total_s": round(t5 - t0, 3),
+            "warmup": warmup_info
+        })
+        print(f"[OK] Swapped model {report['old_version']} -> {report['new_version']} in {report['total_s']}s")
+        return report
+    except Exception as e:
+        report.update({"status": "rejected", "error": f"{type(e).__name__}: {e}"})
+        raise
+    finally:
+        reload_history.append(report)
+        del reload_history[:-20]
+        reload_lock.release()
+
+
+def artifact_signature(models_dir, serving_mode=SERVING_MODE):
+    """
+    (name, size, mtime) of the files the serving mode loads from
+    
+    Full mode watches every pickle. Lean and sharded mode load exports, which
+    are published by atomically replacing their manifests, so those are watched.
+    """
+    if serving_mode == 'full':
+        paths = sorted(Path(models_dir).glob('*.pkl'))
+    else:
+        serving_dir = Path(models_dir) / SERVING_DIR
+        paths = [serving_dir / 'manifest.json']
+        if serving_mode == 'sharded':
+            paths.append(serving_dir / SHARDS_DIR / 'manifest.json')
+    
+    signature = []
+    for path in paths:
+        if path.exists():
+            stat = path.stat()
+            signature.append((str(path.relative_to(models_dir)), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def watch_model_files(models_dir=MODELS_DIR, interval=MODEL_WATCH_INTERVAL):
+    """
+    Poll the models directory and hot-swap when the artifacts change
+    
+    A change must be stable for one extra interval, so half-copied files are not loaded.
+    """
+    current = artifact_signature(models_dir)
+    candidate = None
+    while True:
+        time.sleep(interval)
+        try:
+            signature = artifact_signature(models_dir)
+        except OSError:
+            continue
+        if signature == current:
+            candidate = None
+        elif signature != candidate:
+            candidate = signature
+        else:
+            try:
+                reload_models(models_dir, trigger="watcher")
+            except Exception as e:
+                print(f"✗ Model reload rejected: {type(e).__name__}: {e}")
+            current, candidate = signature, None
+
+
+@app.on_event("startup")
+async def start_background_loading():
+    """Kick off model loading without blocking the server from accepting connections"""
+    threading.Thread(target=load_recommender, name="model-loader", daemon=True).start()
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_model_files, name="model-watcher", daemon=True).start()
+
+
+# Poster/streaming metadata, cached on disk next to the models
+metadata_service = create_metadata_service(
+    os.environ.get('METADATA_CACHE_PATH', str(Path(__file__).parent.parent / 'results' / 'metadata_cache.sqlite')),
+    ttl_seconds=int(os.environ.get('METADATA_CACHE_TTL', 7 * 24 * 3600))
+)
+
+
+# Request profiling is off (and its middleware not even installed) unless PROFILING=1.
+# Then a request is profiled when it sends ?profile=1 or X-Profile: 1 together with
+# the admin token, or when it is one in PROFILE_SAMPLE_EVERY eligible requests.
+PROFILING_ENABLED = os.environ.get('PROFILING', '0') == '1'
+profiler = RequestProfiler(
+    sample_every=int(os.environ.get('PROFILE_SAMPLE_EVERY', 0)),
+    max_stored=int(os.environ.get('PROFILE_MAX_STORED', 50))
+) if PROFILING_ENABLED else None
+PROFILE_EXEMPT_PATHS = ("/ready", "/health", "/metrics", "/admin/", "/docs", "/redoc", "/openapi.json")
+
+
+async def profile_requests(request: Request, call_next):
+    """Run explicitly requested or sampled requests under cProfile"""
+    explicit = request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+    if explicit:
+        try:
+            require_admin(request.headers.get("x-admin-token"))
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+        reason = "explicit"
+    elif request.url.path != "/" and not request.url.path.startswith(PROFILE_EXEMPT_PATHS) and profiler.sample():
+        reason = "sampled"
+    else:
+        return await call_next(request)
+    
+    response, profile_id = await profiler.run(call_next, request, reason)
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+        response.headers["X-Profile-Url"] = f"/admin/profiles/{profile_id}"
+    return response
+
+
+if PROFILING_ENABLED:
+    app.middleware("http")(profile_requests)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """run_in_threadpool, except inline under the profiler while the request is profiled (cProfile is per-thread)"""
+    if is_profiling():
+        return profiled(func, *args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+# Admission control: at most MAX_CONCURRENT_REQUESTS run at once, MAX_QUEUED_REQUESTS
+# more may wait QUEUE_TIMEOUT_MS for a slot, and the rest get an immediate 503
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('MAX_CONCURRENT_REQUESTS', 64)),
+    max_queued=int(os.environ.get('MAX_QUEUED_REQUESTS', 32)),
+    queue_timeout_s=float(os.environ.get('QUEUE_TIMEOUT_MS', 100)) / 1000.0,
+    retry_after_s=int(os.environ.get('SHED_RETRY_AFTER', 1))
+)
+ADMISSION_EXEMPT_PATHS = ("/ready", "/health", "/metrics", "/admin/", "/docs", "/redoc", "/openapi.json")
+
+# Default time budget per request; clients may lower it with X-Request-Timeout-Ms
+REQUEST_TIMEOUT_MS = int(os.environ.get('REQUEST_TIMEOUT_MS', 5000))
+
+
+def request_deadline(timeout_ms=None):
+    """Deadline for one request: the client's budget, capped at REQUEST_TIMEOUT_MS"""
+    budget_ms = REQUEST_TIMEOUT_MS if timeout_ms is None else min(max(timeout_ms, 1), REQUEST_TIMEOUT_MS)
+    return Deadline(budget_ms / 1000.0)
+
+
+class AdmissionMiddleware:
+    """
+    Shed load with a fast 503 + Retry-After instead of queueing without limit; time admitted requests
+    
+    Plain ASGI rather than @app.middleware("http"): there call_next returns once
+    the headers are out, so a streamed body (e.g. /bulk-recommend, which does
+    all its scoring while streaming) would run after its slot was released.
+    Here the slot is held until the app has sent the last body chunk.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path == "/" or path.startswith(ADMISSION_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        if admission.enabled:
+            try:
+                await admission.acquire()
+            except Overloaded as e:
+                response = JSONResponse(
+                    status_code=503,
+                    content={"detail": e.reason},
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+                await response(scope, receive, send)
+                return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if admission.enabled:
+                await admission.release()
+        
+        # Grouped by route template (e.g. GET /browse/genre/{genre}), not by raw path
+        route = scope.get("route")
+        admission.record(f"{scope['method']} {getattr(route, 'path', 'unmatched')}", time.perf_counter() - start)
+
+
+app.add_middleware(AdmissionMiddleware)
+
+
+# HTTP caching: GET responses on these paths depend only on the loaded model
+CACHEABLE_PATHS = (
+    "/genres", "/stats", "/movie-info", "/browse/genre/", "/recommend",
+    "/search", "/autocomplete", "/match-title"
+)
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', 3600))
+
+
+def compute_etag(model_version, request):
+    """Strong ETag for a GET request against a given model version"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    key = f"{app.version}|{model_version}|{request.url.path}|{query}"
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+@app.middleware("http")
+async def http_cache_validators(request: Request, call_next):
+    """
+    Pin the request to the current ServingState, emit ETag/Cache-Control and
+    answer If-None-Match with 304 before any recommender work
+    """
+    state = serving
+    token = request_serving_state.set(state)
+    try:
+        if (
+            request.method != "GET"
+            or state is None
+            or not request.url.path.startswith(CACHEABLE_PATHS)
+        ):
+            return await call_next(request)
+        return await respond_with_validators(state, request, call_next)
+    finally:
+        request_serving_state.reset(token)
+
+
+async def respond_with_validators(state, request, call_next):
+    """ETag from `state`'s model version (and the user's history revision), 304 on a match"""
+    version = state.variants.version
+    cache_control = f"public, max-age={CACHE_MAX_AGE}"
+    user_id = request.query_params.get("user_id")
+    if user_id and request.query_params.get("exclude_seen", "true").lower() not in ("0", "false"):
+        # Depends on the user's history too: revalidate every time, 304 while it is unchanged
+        version = f"{version}|seen:{history.revision(user_id)}"
+        cache_control = "private, no-cache"
+    
+    etag = compute_etag(version, request)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control
+    }
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    response = await call_next(request)
+    # Endpoints opt out (e.g. partial results) by setting their own Cache-Control
+    if response.status_code == 200 and "cache-control" not in response.headers:
+        response.headers.update(headers)
+    return response
 
 
 # Pydantic models for request/response
@@ -53,6 +528,10 @@ class RecommendationRequest(BaseModel):
     movie_title: str
     n_recommendations: int = 10
     model_type: str = 'hybrid'
+    variant: Optional[str] = None
+    user_id: Optional[str] = None
+    exclude_seen: bool = True
+    diversity: float = 0.0
 
 
 class SearchRequest(BaseModel):
@@ -64,6 +543,41 @@ class BatchRequest(BaseModel):
     movie_titles: List[str]
     n_recommendations: int = 5
     model_type: str = 'hybrid'
+    allow_partial: bool = True
+    user_id: Optional[str] = None
+    exclude_seen: bool = True
+
+
+class TextQueryRequest(BaseModel):
+    query: str
+    n_recommendations: int = 10
+    model_type: str = 'hybrid'
+    user_id: Optional[str] = None
+    exclude_seen: bool = True
+
+
+class BulkRequest(BaseModel):
+    movie_ids: List[int] = []
+    movie_titles: List[str] = []
+    all_movies: bool = False
+    n_recommendations: int = 10
+    model_type: str = 'hybrid'
+    format: str = 'auto'
+
+
+class HistoryRequest(BaseModel):
+    movie_titles: List[str] = []
+    movie_ids: List[int] = []
+
+
+class ReloadRequest(BaseModel):
+    models_dir: Optional[str] = None
+    warmup: bool = True
+
+
+class MetadataRequest(BaseModel):
+    movie_ids: List[int]
+    include_streaming: bool = False
 
 
 # API Routes
@@ -76,86 +590,377 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/docs - Interactive API documentation",
+            "/ready - Readiness probe with loading progress",
+            "/metrics - Serving counters",
+            "/variants - Loaded model variants, traffic split, latency and memory",
+            "/admin/reload - Hot-swap models (requires ADMIN_TOKEN)",
             "/recommend - Get recommendations for a movie",
+            "/recommend/text - Recommendations for a free-text description",
             "/search - Search movies",
+            "/autocomplete - Title prefix completion",
+            "/match-title - Typo-tolerant title candidates",
             "/movie-info - Get movie information",
-            "/batch-recommend - Get recommendations for multiple movies"
+            "/batch-recommend - Get recommendations for multiple movies",
+            "/bulk-recommend - (seed_id, rec_id, score) triples as Arrow IPC or .npy",
+            "/users/{user_id}/history - Watched movies excluded from that user's recommendations",
+            "/metadata - Posters and streaming sources for many movies"
         ]
     }
 
 
+@app.get("/ready", tags=["General"])
+async def readiness_check():
+    """Readiness probe: 200 once models are loaded and warmed up, 503 with progress until then"""
+    progress = {
+        **loading_state,
+        "progress": round(len(loading_state["completed_stages"]) / loading_state["total_stages"], 3)
+    }
+    if loading_state["status"] == "ready" and serving is not None:
+        return {"ready": True, **progress}
+    return JSONResponse(
+        status_code=503,
+        content={"ready": False, **progress},
+        headers={"Retry-After": "2"}
+    )
+
+
 @app.get("/health", tags=["General"])
 async def health_check():
     """Health check endpoint"""
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     return {
         "status": "healthy",
-        "movies_loaded": len(recommender.train_df),
+        "movies_loaded": recommender.n_movies,
+        "serving_mode": recommender.serving_mode,
         "models": ["cosine_similarity", "lightweight_hybrid"]
     }
 
 
+@app.get("/metrics", tags=["General"])
+async def get_metrics():
+    """Serving counters: request dispatcher batching and metadata cache"""
+    state = current_state()
+    recommender = state.recommender
+    
+    return {
+        "model_version": recommender.model_version,
+        "serving_mode": recommender.serving_mode,
+        "n_movies": recommender.n_movies,
+        "endpoints": admission.endpoint_metrics(),
+        "dispatcher": state.dispatcher.metrics(),
+        "variants": state.variants.metrics(),
+        "admission": admission.metrics(),
+        "profiler": profiler.metrics() if profiler is not None else None,
+        "history": history.metrics(),
+        "shards": recommender.shard_router.metrics() if recommender.shard_router is not None else None,
+        "metadata_cache": dict(metadata_service.stats),
+        "last_reload": reload_history[-1] if reload_history else None
+    }
+
+
+@app.get("/variants", tags=["General"])
+async def get_variants():
+    """Loaded model variants with traffic split, latency percentiles and memory footprint"""
+    variants = current_state().variants
+    
+    report = variants.metrics()
+    memory = variants.memory()
+    for name, entry in report["variants"].items():
+        entry["memory"] = memory[name]
+        entry["dispatcher"] = variants.dispatchers[name].metrics()
+    return report
+
+
+def seen_exclusion(user_id, movie_ids, exclude_seen=True):
+    """(sorted seen indices in catalog `movie_ids`, coalescing key) for a user, or (None, None)"""
+    if not user_id or not exclude_seen:
+        return None, None
+    seen = history.get(user_id)
+    if seen is None:
+        return None, None
+    return history.seen_indices(user_id, movie_ids), (user_id, seen.revision)
+
+
+async def recommend_with_variant(state, movie_title, n_recommendations, model_type, variant=None, user_id=None,
+                                 deadline=None, exclude_seen=True, diversity=0.0):
+    """
+    Route one /recommend call to a model variant of `state` and record its latency
+    
+    The variant is the one named in the request, else the one assigned to
+    `user_id` by the traffic split, else the default. Movies in the user's
+    history are masked before the top-N selection unless `exclude_seen` is off.
+    Raises 504 if the scoring job does not finish before `deadline`.
+    """
+    if not 0 <= diversity < 1:
+        raise HTTPException(status_code=400, detail="diversity must be in [0, 1)")
+    active = state.variants
+    try:
+        name = active.select(variant, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    exclude, exclude_key = seen_exclusion(user_id, active.recommenders[name].movie_ids, exclude_seen)
+    
+    start = time.perf_counter()
+    deadline = deadline or request_deadline()
+    if is_profiling():
+        # Score inline so the profile shows title lookup and scoring, not the dispatcher
+        variant_recommender = active.recommenders[name]
+        score = (variant_recommender.recommend_hybrid if model_type == 'hybrid'
+                 else variant_recommender.recommend_content_based)
+        result = profiled(score, movie_title, n_recommendations, exclude, diversity)
+        if "error" in result:
+            raise HTTPException(status_code=404, detail=result["error"])
+        result["variant"] = name
+        return result
+    try:
+        # The dispatcher shields the shared job, so timing out only drops this caller
+        result = await asyncio.wait_for(
+            active.dispatchers[name].recommend(
+                movie_title, n_recommendations, model_type, exclude, exclude_key, diversity
+            ),
+            max(deadline.remaining(), 0)
+        )
+    except asyncio.TimeoutError:
+        admission.stats['deadline_exceeded'] += 1
+        raise HTTPException(status_code=504, detail=f"Deadline of {deadline.budget_s * 1000:.0f}ms exceeded")
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    active.record(name, time.perf_counter() - start)
+    
+    result["variant"] = name
+    return result
+
+
+@app.get("/admin/memory", tags=["Admin"])
+async def admin_memory(x_admin_token: Optional[str] = Header(None)):
+    """
+    Byte accounting of everything the process holds
+    
+    Lists every loaded array, index and cache per component, split into private,
+    memory-mapped and shared bytes (each buffer is counted once, by the first
+    component that references it), next to the process RSS from /proc.
+    """
+    require_admin(x_admin_token)
+    state = current_state()
+    recommender, variants = state.recommender, state.variants
+    
+    try:
+        caches = {
+            f"precomputed:{name}": dispatcher._precomputed
+            for name, dispatcher in variants.dispatchers.items()
+        }
+        if profiler is not None:
+            caches["profiles"] = profiler.profiles
+        caches["history"] = history.users
+        caches["metadata"] = str(metadata_service.cache.path)
+        
+        report = await run_in_threadpool(build_report, recommender, variants, caches)
+        report["variants"] = variants.memory()
+        return report
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/profiles", tags=["Admin"])
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Profiles captured by ?profile=1 / X-Profile: 1 or by sampling, newest first"""
+    require_admin(x_admin_token)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling disabled (set PROFILING=1)")
+    
+    return {**profiler.metrics(), "profiles": profiler.list()}
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"])
+async def get_profile(
+    profile_id: str,
+    format: str = Query('text', regex='^(text|pstats)$'),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Download one profile
+    
+    - **format**: 'text' (top functions by cumulative time) or 'pstats'
+      (binary, open with `python -m pstats <file>` or snakeviz)
+    """
+    require_admin(x_admin_token)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling disabled (set PROFILING=1)")
+    
+    entry = profiler.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found (only the last {profiler.max_stored} are kept)")
+    
+    if format == 'pstats':
+        return Response(
+            content=entry['pstats'],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'}
+        )
+    meta = entry['meta']
+    header = f"{meta['method']} {meta['path']}?{meta['query']} -> {meta['status_code']} in {meta['duration_ms']}ms ({meta['reason']})\n\n"
+    return PlainTextResponse(header + entry['text'])
+
+
+@app.post("/admin/reload", tags=["Admin"])
+async def admin_reload(
+    request: Optional[ReloadRequest] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Hot-swap the models without a restart
+    
+    New artifacts are loaded alongside the current ones, validated with smoke
+    queries and warmed up, then swapped in atomically. In-flight requests finish
+    on the old version. Returns per-phase timings including the swap itself.
+    """
+    require_admin(x_admin_token)
+    request = request or ReloadRequest()
+    
+    try:
+        return await run_in_threadpool(
+            reload_models, request.models_dir, request.warmup, "admin"
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=reload_history[-1] if reload_history else str(e))
+
+
 @app.post("/recommend", tags=["Recommendations"])
-async def get_recommendations(request: RecommendationRequest):
+async def get_recommendations(
+    request: RecommendationRequest,
+    x_request_timeout_ms: Optional[int] = Header(None)
+):
     """
     Get movie recommendations based on a query movie
     
     - **movie_title**: Name of the movie to get recommendations for
     - **n_recommendations**: Number of recommendations (1-50)
     - **model_type**: 'content_based' or 'hybrid' (default: 'hybrid')
+    - **variant**: Model variant to use (optional; see /variants)
+    - **user_id**: Assigns a variant by the A/B traffic split when `variant` is not given,
+      and leaves out movies in the user's history
+    - **exclude_seen**: Set to false to include already-seen movies
+    - **diversity**: MMR re-ranking in [0, 1) over the top 200 candidates; e.g.
+      0.3 breaks up runs of near-identical sequels (default: 0, off)
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    state = current_state()
     
     if request.n_recommendations > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 recommendations allowed")
     
     try:
-        if request.model_type == 'hybrid':
-            result = recommender.recommend_hybrid(
-                request.movie_title,
-                n_recommendations=request.n_recommendations
-            )
-        else:
-            result = recommender.recommend_content_based(
-                request.movie_title,
-                n_recommendations=request.n_recommendations
-            )
+        return await recommend_with_variant(
+            state,
+            request.movie_title,
+            request.n_recommendations,
+            request.model_type,
+            variant=request.variant,
+            user_id=request.user_id,
+            deadline=request_deadline(x_request_timeout_ms),
+            exclude_seen=request.exclude_seen,
+            diversity=request.diversity
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/recommend", tags=["Recommendations"])
+async def get_recommendations_query(
+    movie_title: str = Query(..., description="Movie title"),
+    n_recommendations: int = Query(10, ge=1, le=50),
+    model_type: str = Query('hybrid', regex='^(content_based|hybrid)$'),
+    variant: Optional[str] = Query(None, description="Model variant (see /variants)"),
+    user_id: Optional[str] = Query(None, description="Assigns a variant by the A/B traffic split and excludes seen movies"),
+    exclude_seen: bool = Query(True, description="Leave out movies in the user's history"),
+    diversity: float = Query(0.0, ge=0, lt=1, description="MMR re-ranking strength (0 = off)"),
+    x_request_timeout_ms: Optional[int] = Header(None)
+):
+    """
+    Get movie recommendations via query parameters
+    """
+    state = current_state()
+    
+    try:
+        return await recommend_with_variant(
+            state, movie_title, n_recommendations, model_type, variant, user_id,
+            deadline=request_deadline(x_request_timeout_ms),
+            exclude_seen=exclude_seen,
+            diversity=diversity
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/recommend/text", tags=["Recommendations"])
+async def recommend_by_text(request: TextQueryRequest):
+    """
+    Recommend movies matching a free-text overview or keywords
+    
+    - **query**: Plot description or keywords (need not be a catalog title)
+    - **n_recommendations**: Number of recommendations (1-50)
+    - **model_type**: 'content_based' (text similarity only) or 'hybrid'
+    - **user_id** / **exclude_seen**: Leave out movies in the user's history
+    """
+    recommender = current_state().recommender
+    
+    if request.n_recommendations > 50:
+        raise HTTPException(status_code=400, detail="Maximum 50 recommendations allowed")
+    
+    try:
+        result = profiled(
+            recommender.recommend_by_text,
+            request.query,
+            n_recommendations=request.n_recommendations,
+            model_type=request.model_type,
+            exclude=seen_exclusion(request.user_id, recommender.movie_ids, request.exclude_seen)[0]
+        )
         
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/recommend", tags=["Recommendations"])
-async def get_recommendations_query(
-    movie_title: str = Query(..., description="Movie title"),
+@app.get("/recommend/text", tags=["Recommendations"])
+async def recommend_by_text_query(
+    query: str = Query(..., description="Plot description or keywords"),
     n_recommendations: int = Query(10, ge=1, le=50),
-    model_type: str = Query('hybrid', regex='^(content_based|hybrid)$')
+    model_type: str = Query('hybrid', regex='^(content_based|hybrid)$'),
+    user_id: Optional[str] = Query(None, description="Leave out movies in this user's history"),
+    exclude_seen: bool = Query(True)
 ):
     """
-    Get movie recommendations via query parameters
+    Recommend movies matching a free-text description via query parameters
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        if model_type == 'hybrid':
-            result = recommender.recommend_hybrid(movie_title, n_recommendations)
-        else:
-            result = recommender.recommend_content_based(movie_title, n_recommendations)
+        result = profiled(
+            recommender.recommend_by_text, query, n_recommendations, model_type,
+            exclude=seen_exclusion(user_id, recommender.movie_ids, exclude_seen)[0]
+        )
         
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         
         return result
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -168,11 +973,10 @@ async def search_movies(request: SearchRequest):
     - **query**: Search query string
     - **limit**: Maximum number of results (default: 10)
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        results = recommender.search_movies(request.query, limit=request.limit)
+        results = profiled(recommender.search_movies, request.query, limit=request.limit)
         return {
             "query": request.query,
             "count": len(results),
@@ -188,11 +992,10 @@ async def search_movies_query(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Search movies via query parameters"""
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        results = recommender.search_movies(query, limit=limit)
+        results = profiled(recommender.search_movies, query, limit=limit)
         return {
             "query": query,
             "count": len(results),
@@ -202,6 +1005,43 @@ async def search_movies_query(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/autocomplete", tags=["Search"])
+async def autocomplete(
+    prefix: str = Query(..., description="Partial movie title"),
+    limit: int = Query(5, ge=1, le=10)
+):
+    """Complete a partial title with the most popular matching movies"""
+    recommender = current_state().recommender
+    
+    try:
+        return {"movies": profiled(recommender.autocomplete, prefix, limit=limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/match-title", tags=["Search"])
+async def match_title(
+    query: str = Query(..., description="Movie title, possibly misspelled"),
+    limit: int = Query(5, ge=1, le=20)
+):
+    """
+    Rank catalog titles by edit-distance similarity to the query
+    
+    Candidates marked `accepted` are the ones /recommend would resolve to.
+    """
+    recommender = current_state().recommender
+    
+    try:
+        candidates = profiled(recommender.suggest_titles, query, limit=limit)
+        return {
+            "query": query,
+            "threshold": recommender.fuzzy_threshold,
+            "candidates": candidates
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/movie-info", tags=["Search"])
 async def get_movie_info(
     movie_title: str = Query(..., description="Movie title")
@@ -209,43 +1049,244 @@ async def get_movie_info(
     """
     Get detailed information about a specific movie
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        info = recommender.get_movie_info(movie_title)
+        info = profiled(recommender.get_movie_info, movie_title)
         if "error" in info:
             raise HTTPException(status_code=404, detail=info["error"])
         return info
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/batch-recommend", tags=["Recommendations"])
-async def batch_recommendations(request: BatchRequest):
+async def batch_recommendations(
+    request: BatchRequest,
+    x_request_timeout_ms: Optional[int] = Header(None)
+):
     """
     Get recommendations for multiple movies at once
     
     - **movie_titles**: List of movie titles
     - **n_recommendations**: Number of recommendations per movie
     - **model_type**: 'content_based' or 'hybrid'
+    - **allow_partial**: When the deadline runs out, return the titles finished so
+      far (listed under `unprocessed` otherwise) instead of a 504
+    - **user_id** / **exclude_seen**: Leave out movies in the user's history
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     if len(request.movie_titles) > 100:
         raise HTTPException(status_code=400, detail="Maximum 100 movies per batch")
     
+    deadline = request_deadline(x_request_timeout_ms)
     try:
-        results = recommender.batch_recommend(
+        # Off the event loop, so a long batch does not stall other requests
+        results = await run_blocking(
+            recommender.batch_recommend,
             request.movie_titles,
             model_type=request.model_type,
-            n_recommendations=request.n_recommendations
+            n_recommendations=request.n_recommendations,
+            deadline=deadline,
+            exclude=seen_exclusion(request.user_id, recommender.movie_ids, request.exclude_seen)[0]
         )
+        unprocessed = [title for title in request.movie_titles if title not in results]
+        if unprocessed:
+            admission.stats['deadline_exceeded'] += 1
+            if not request.allow_partial:
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Deadline of {deadline.budget_s * 1000:.0f}ms exceeded after "
+                           f"{len(results)} of {len(request.movie_titles)} titles"
+                )
+            admission.stats['partial_responses'] += 1
+        
         return {
             "batch_size": len(request.movie_titles),
             "model_type": request.model_type,
-            "results": results
+            "results": results,
+            "partial": bool(unprocessed),
+            "unprocessed": unprocessed,
+            "elapsed_ms": round(deadline.elapsed_ms(), 3)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def resolve_seeds(active, movie_ids, movie_titles):
+    """Catalog indices of the seed movies that exist, and how many did not"""
+    seeds = [active.id_to_index.get(movie_id) for movie_id in movie_ids]
+    seeds += [active.get_movie_by_title(title) for title in movie_titles]
+    found = [idx for idx in seeds if idx is not None]
+    return found, len(seeds) - len(found)
+
+
+@app.post("/bulk-recommend", tags=["Recommendations"])
+async def bulk_recommendations(request: BulkRequest):
+    """
+    Recommendation triples for offline jobs, as a columnar binary stream
+    
+    - **movie_ids** / **movie_titles**: Seed movies, or **all_movies** for the whole catalog
+    - **n_recommendations**: Recommendations per seed (1-100)
+    - **model_type**: 'content_based' or 'hybrid'
+    - **format**: 'arrow' (Arrow IPC stream), 'npy' (structured array with
+      seed_id, rec_id, score fields) or 'auto' (Arrow when pyarrow is installed)
+    
+    Rows are streamed chunk by chunk straight from the scoring arrays; seeds
+    that cannot be resolved are skipped and counted in X-Unresolved.
+    """
+    # Imported on first use so servers that never export do not load it (or pyarrow)
+    from bulk_export import export_recommendations, MEDIA_TYPES
+    
+    active = current_state().recommender
+    
+    if not 1 <= request.n_recommendations <= 100:
+        raise HTTPException(status_code=400, detail="n_recommendations must be between 1 and 100")
+    
+    if request.all_movies:
+        seeds = list(range(active.n_movies))
+        unresolved = 0
+    else:
+        if len(request.movie_ids) + len(request.movie_titles) > 10000:
+            raise HTTPException(status_code=400, detail="Maximum 10000 seeds per request (or use all_movies)")
+        # Up to 10000 fuzzy title lookups: keep them off the event loop
+        seeds, unresolved = await run_blocking(resolve_seeds, active, request.movie_ids, request.movie_titles)
+        if not seeds:
+            raise HTTPException(status_code=404, detail="None of the seed movies were found")
+    
+    try:
+        fmt, n_rows, stream = export_recommendations(
+            active, seeds, request.model_type, request.n_recommendations, request.format
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # A sync iterator: Starlette pulls each chunk in its threadpool
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "X-Export-Format": fmt,
+            "X-Rows": str(n_rows),
+            "X-Unresolved": str(unresolved),
+            "X-Model-Version": active.model_version,
+            "Content-Disposition": f'attachment; filename="recommendations.{fmt}"'
+        }
+    )
+
+
+def resolve_history_movies(active, movie_titles, movie_ids):
+    """Catalog indices of the given titles and ids, and the titles/ids that did not resolve"""
+    indices, unresolved = [], []
+    for title in movie_titles:
+        idx = active.get_movie_by_title(title)
+        if idx is None:
+            unresolved.append(title)
+        else:
+            indices.append(idx)
+    for movie_id in movie_ids:
+        idx = active.id_to_index.get(movie_id)
+        if idx is None:
+            unresolved.append(movie_id)
+        else:
+            indices.append(idx)
+    return indices, unresolved
+
+
+@app.post("/users/{user_id}/history", tags=["History"])
+async def add_history(user_id: str, request: HistoryRequest):
+    """
+    Record movies a user has watched; they are left out of that user's recommendations
+    
+    - **movie_titles**: Titles (typo-tolerant, like /recommend)
+    - **movie_ids**: Catalog movie ids
+    """
+    recommender = current_state().recommender
+    
+    if len(request.movie_titles) + len(request.movie_ids) > 500:
+        raise HTTPException(status_code=400, detail="Maximum 500 movies per request")
+    
+    # Up to 500 fuzzy title lookups: keep them off the event loop
+    indices, unresolved = await run_blocking(
+        resolve_history_movies, recommender, request.movie_titles, request.movie_ids
+    )
+    
+    try:
+        added = history.add(user_id, indices, recommender.movie_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    seen = history.get(user_id)
+    return {
+        "user_id": user_id,
+        "added": added,
+        "seen_count": len(seen) if seen is not None else 0,
+        "unresolved": unresolved
+    }
+
+
+@app.get("/users/{user_id}/history", tags=["History"])
+async def get_history(user_id: str):
+    """Movies recorded as watched by a user"""
+    recommender = current_state().recommender
+    
+    seen = history.get(user_id)
+    indices = history.seen_indices(user_id, recommender.movie_ids)
+    return {
+        "user_id": user_id,
+        "seen_count": len(indices),
+        "storage": None if seen is None else {
+            "container": "bitmap" if seen.is_bitmap else "array",
+            "bytes": seen.nbytes
+        },
+        "movies": [
+            {"movie_id": int(recommender.movie_ids[idx]), "title": recommender.movie_titles[idx]}
+            for idx in indices
+        ]
+    }
+
+
+@app.delete("/users/{user_id}/history", tags=["History"])
+async def clear_history(
+    user_id: str,
+    movie_id: Optional[List[int]] = Query(None, description="Only forget these movies")
+):
+    """Forget a user's watch history, or only some movies of it"""
+    if movie_id:
+        recommender = current_state().recommender
+        indices = [recommender.id_to_index[m] for m in movie_id if m in recommender.id_to_index]
+        history.remove(user_id, indices, recommender.movie_ids)
+        seen = history.get(user_id)
+        return {"user_id": user_id, "seen_count": len(seen) if seen is not None else 0}
+    return {"user_id": user_id, "cleared": history.clear(user_id)}
+
+
+@app.post("/metadata", tags=["Search"])
+async def get_metadata(request: MetadataRequest):
+    """
+    Resolve posters (and optionally streaming sources) for many movies in one call
+    
+    - **movie_ids**: List of movie ids (max 100)
+    - **include_streaming**: Also resolve where-to-watch sources
+    """
+    recommender = current_state().recommender
+    
+    if len(request.movie_ids) > 100:
+        raise HTTPException(status_code=400, detail="Maximum 100 movies per request")
+    
+    try:
+        movies = profiled(recommender.get_movies_by_id, request.movie_ids)
+        metadata = await run_in_threadpool(
+            metadata_service.get_metadata, movies, request.include_streaming
+        )
+        return {
+            "provider": metadata_service.provider.name,
+            "metadata": {str(movie_id): entry for movie_id, entry in metadata.items()}
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -254,21 +1295,10 @@ async def batch_recommendations(request: BatchRequest):
 @app.get("/stats", tags=["General"])
 async def get_stats():
     """Get system statistics"""
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
-    
-    # Extract unique genres from dict objects
-    unique_genres = set()
-    for genres_list in recommender.train_df['genres_list']:
-        if isinstance(genres_list, list):
-            for g in genres_list:
-                if isinstance(g, dict) and 'name' in g:
-                    unique_genres.add(g['name'])
+    recommender = current_state().recommender
     
     return {
-        "total_movies": len(recommender.train_df),
-        "available_genres": len(unique_genres),
-        "avg_rating": float(recommender.train_df['vote_average'].mean()),
+        **profiled(recommender.get_catalog_stats),
         "model_type": "lightweight_hybrid + content_based",
         "inference_time_ms": "<10ms per recommendation"
     }
@@ -277,11 +1307,10 @@ async def get_stats():
 @app.get("/genres", tags=["Browse"])
 async def get_genres():
     """Get list of all available genres"""
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        genres = recommender.get_all_genres()
+        genres = profiled(recommender.get_all_genres)
         return {
             "genres": genres,
             "count": len(genres)
@@ -294,7 +1323,8 @@ async def get_genres():
 async def browse_by_genre(
     genre: str,
     n_recommendations: int = Query(20, ge=1, le=50),
-    sort_by: str = Query('rating', regex='^(rating|popularity|recent)$')
+    sort_by: str = Query('rating', regex='^(rating|popularity|recent)$'),
+    x_request_timeout_ms: Optional[int] = Header(None)
 ):
     """
     Browse movies by genre
@@ -302,15 +1332,24 @@ async def browse_by_genre(
     - **genre**: Genre name (e.g., 'Action', 'Comedy', 'Drama')
     - **n_recommendations**: Number of movies to return (1-50)
     - **sort_by**: Sort criteria - 'rating', 'popularity', or 'recent'
+    
+    If the deadline runs out the movies built so far come back with `partial: true`.
     """
-    if recommender is None:
-        raise HTTPException(status_code=503, detail="Models not loaded")
+    recommender = current_state().recommender
     
     try:
-        result = recommender.recommend_by_genre(genre, n_recommendations, sort_by)
+        result = profiled(
+            recommender.recommend_by_genre,
+            genre, n_recommendations, sort_by, deadline=request_deadline(x_request_timeout_ms)
+        )
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
+        if result.get("partial"):
+            admission.stats['partial_responses'] += 1
+            return JSONResponse(content=jsonable_encoder(result), headers={"Cache-Control": "no-store"})
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,86 @@
+"""
+Movie Recommendation System - Artifact Store
+Versioned export directories published by atomically replacing a manifest
+
+Serving processes memory-map exported .npy files, so an export must never
+rewrite a file in place: a live process would see the new bytes under its old
+model version, or fault (SIGBUS) on a truncated page. Each export is written
+into a fresh directory, and the manifest that points at it is swapped in with
+os.replace only once every file is complete. Readers load the manifest first
+and then open files from the directory it names.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+MANIFEST_FILE = 'manifest.json'
+EXPORT_PREFIX = 'export-'
+
+
+def new_export_dir(parent, version):
+    """
+    Create an empty, uniquely named directory for one export under `parent`
+
+    Returns:
+        (absolute path, name relative to parent)
+    """
+    os.makedirs(parent, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=f'{EXPORT_PREFIX}{version}-', dir=parent)
+    os.chmod(path, 0o755)
+    return path, os.path.basename(path)
+
+
+def files_dir(parent, manifest):
+    """Directory holding the files of a manifest (exports without 'files_dir' keep them beside it)"""
+    return os.path.join(parent, manifest['files_dir']) if manifest.get('files_dir') else parent
+
+
+def read_manifest(parent):
+    with open(os.path.join(parent, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def publish(parent, export_dir, manifest, keep=2, default=None):
+    """
+    Point `parent`'s manifest at a finished export, then drop old exports
+
+    The manifest is also written inside the export directory, so a process
+    that was handed that directory never needs the (replaceable) outer one.
+
+    Args:
+        parent: Directory whose manifest.json readers open
+        export_dir: Directory from new_export_dir(), fully written
+        manifest: Manifest dict; 'files_dir' is set here
+        keep: Exports kept, newest first, including this one; the previous
+            one usually still backs a running server
+        default: json.dump fallback for non-builtin values
+    """
+    manifest = {**manifest, 'files_dir': os.path.basename(export_dir)}
+    with open(os.path.join(export_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({**manifest, 'files_dir': None}, f, indent=2, default=default)
+
+    tmp_path = os.path.join(parent, f'.{MANIFEST_FILE}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(parent, MANIFEST_FILE))
+    prune(parent, keep, current=os.path.basename(export_dir))
+
+
+def prune(parent, keep, current):
+    """
+    Remove all but the `keep` newest export directories (never `current`)
+
+    Unlinking is safe for processes that still map the files: the data lives
+    until the last mapping goes away. Only truncation or rewriting is not.
+    """
+    exports = [
+        entry for entry in os.scandir(parent)
+        if entry.is_dir() and entry.name.startswith(EXPORT_PREFIX) and entry.name != current
+    ]
+    exports.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in exports[max(keep - 1, 0):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
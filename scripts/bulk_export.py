@@ -0,0 +1,180 @@
+"""
+Movie Recommendation System - Bulk Export
+(seed_id, rec_id, score) recommendation triples as a columnar binary stream,
+for offline jobs that do not need titles, overviews or JSON
+
+Formats:
+    arrow  Arrow IPC stream, one record batch per scoring chunk (needs pyarrow)
+    npy    A single .npy file holding a structured array with fields
+           seed_id <i8, rec_id <i8, score <f4; load with np.load()
+
+Usage:
+    python scripts/bulk_export.py --all --out recs.npy [--models-dir results] [--n 20] [--format npy]
+    python scripts/bulk_export.py --titles "Avatar|Inception" --out recs.arrow --format arrow
+    python scripts/bulk_export.py --url http://localhost:8000 --all --out recs.npy
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
+
+TRIPLE_DTYPE = np.dtype([('seed_id', '<i8'), ('rec_id', '<i8'), ('score', '<f4')])
+MEDIA_TYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'npy': 'application/x-npy'
+}
+# Arrow IPC end-of-stream marker: continuation token followed by a zero length
+_ARROW_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+
+def arrow_available():
+    """Whether pyarrow is installed, without importing it (it is heavy; servers load it on first use)"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def resolve_format(requested='auto'):
+    """
+    Pick the output format
+
+    Raises:
+        ValueError: For an unknown format, or 'arrow' without pyarrow installed
+    """
+    if requested == 'auto':
+        return 'arrow' if arrow_available() else 'npy'
+    if requested not in MEDIA_TYPES:
+        raise ValueError(f"Unknown format '{requested}' (expected 'auto', 'arrow' or 'npy')")
+    if requested == 'arrow' and not arrow_available():
+        raise ValueError("Arrow output needs pyarrow (pip install pyarrow), or use format=npy")
+    return requested
+
+
+def encode_stream(chunks, n_rows, fmt):
+    """
+    Serialize column chunks as they are produced
+
+    Args:
+        chunks: Iterable of (seed_ids, rec_ids, scores) arrays
+        n_rows: Total rows across all chunks (the .npy header needs it up front)
+        fmt: 'arrow' or 'npy'
+
+    Yields:
+        Bytes of the output, chunk by chunk
+    """
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        schema = pa.schema([('seed_id', pa.int64()), ('rec_id', pa.int64()), ('score', pa.float32())])
+        yield schema.serialize().to_pybytes()
+        for seed_ids, rec_ids, scores in chunks:
+            batch = pa.record_batch([pa.array(seed_ids), pa.array(rec_ids), pa.array(scores)], schema=schema)
+            yield batch.serialize().to_pybytes()
+        yield _ARROW_EOS
+        return
+
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {
+        'descr': np.lib.format.dtype_to_descr(TRIPLE_DTYPE),
+        'fortran_order': False,
+        'shape': (n_rows,)
+    })
+    yield header.getvalue()
+    for seed_ids, rec_ids, scores in chunks:
+        rows = np.empty(len(seed_ids), dtype=TRIPLE_DTYPE)
+        rows['seed_id'] = seed_ids
+        rows['rec_id'] = rec_ids
+        rows['score'] = scores
+        yield rows.tobytes()
+
+
+def export_recommendations(recommender, movie_indices, model_type='hybrid', n_recommendations=10,
+                           fmt='auto', chunk_size=256):
+    """
+    Bulk recommendations for the given query movies as a binary stream
+
+    Returns:
+        (format, n_rows, iterator of bytes)
+    """
+    fmt = resolve_format(fmt)
+    n = min(n_recommendations, recommender.n_movies - 1)
+    chunks = recommender.iter_recommendation_arrays(movie_indices, model_type, n, chunk_size)
+    n_rows = len(movie_indices) * n
+    return fmt, n_rows, encode_stream(chunks, n_rows, fmt)
+
+
+def read_triples(data, fmt):
+    """Decode an export back into a structured (seed_id, rec_id, score) array"""
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(data).read_all()
+        rows = np.empty(table.num_rows, dtype=TRIPLE_DTYPE)
+        for name in TRIPLE_DTYPE.names:
+            rows[name] = table.column(name).to_numpy()
+        return rows
+    return np.load(io.BytesIO(data))
+
+
+def fetch_export(url, body):
+    """POST /bulk-recommend on a running server; returns (format, bytes)"""
+    import urllib.request
+
+    request = urllib.request.Request(
+        url.rstrip('/') + '/bulk-recommend',
+        data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.headers.get('X-Export-Format'), response.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default=str(script_dir.parent / 'results'))
+    parser.add_argument('--serving-mode', choices=['full', 'lean', 'sharded'], default='lean')
+    parser.add_argument('--url', help='export from a running server instead of loading models here')
+    parser.add_argument('--all', action='store_true', help='every catalog movie as a seed')
+    parser.add_argument('--titles', default='', help='seed titles separated by |')
+    parser.add_argument('--ids', default='', help='seed movie ids separated by commas')
+    parser.add_argument('--n', type=int, default=10, help='recommendations per seed')
+    parser.add_argument('--model-type', choices=['hybrid', 'content_based'], default='hybrid')
+    parser.add_argument('--format', choices=['auto', 'arrow', 'npy'], default='auto')
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    titles = [t.strip() for t in args.titles.split('|') if t.strip()]
+    ids = [int(i) for i in args.ids.split(',') if i.strip()]
+
+    if args.url:
+        fmt, data = fetch_export(args.url, {
+            'movie_titles': titles, 'movie_ids': ids, 'all_movies': args.all,
+            'n_recommendations': args.n, 'model_type': args.model_type, 'format': args.format
+        })
+        with open(args.out, 'wb') as f:
+            f.write(data)
+        n_bytes = len(data)
+    else:
+        from movie_recommender import MovieRecommender
+
+        loaded = MovieRecommender(models_dir=args.models_dir, serving_mode=args.serving_mode)
+        if args.all:
+            seeds = np.arange(loaded.n_movies)
+        else:
+            seeds = [loaded.get_movie_by_title(t) for t in titles] + [loaded.id_to_index.get(i) for i in ids]
+            seeds = np.array([idx for idx in seeds if idx is not None], dtype=np.intp)
+        fmt, n_rows, stream = export_recommendations(loaded, seeds, args.model_type, args.n, args.format)
+        n_bytes = 0
+        with open(args.out, 'wb') as f:
+            for block in stream:
+                f.write(block)
+                n_bytes += len(block)
+
+    print(f"✓ Saved: {args.out} ({fmt}, {n_bytes / (1024 * 1024):.2f} MB)")
@@ -0,0 +1,310 @@
+"""
+Memory Report
+Byte footprint of every loaded component, split into private, memory-mapped and shared
+
+Usage:
+    python scripts/memory_report.py [--models-dir results] [--serving-mode full|lean|sharded] [--variants svd,w2v] [--json out.json]
+    python scripts/memory_report.py --url http://localhost:8000 --token $ADMIN_TOKEN
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
+
+
+def _array_root(array):
+    """The ndarray (or buffer owner) at the bottom of a chain of views"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def process_memory():
+    """Resident set size breakdown from /proc/self/status, in bytes (Linux only)"""
+    fields = {'VmRSS': 'rss', 'RssAnon': 'rss_private', 'RssFile': 'rss_file_backed',
+              'RssShmem': 'rss_shmem', 'VmHWM': 'peak_rss'}
+    usage = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
+
+
+class MemoryAccountant:
+    """
+    Attributes bytes to named components, counting every buffer and object once
+
+    The first component to reach an object owns it; later components that
+    reference the same object (or view the same array data) report those bytes
+    as shared with the owner instead of counting them again.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._owners = {}
+        # Keep measured objects alive so their ids are not reused mid-report
+        self._keep = []
+
+    def add(self, component, name, obj, detail=None):
+        """Measure `obj` and record it under component/name"""
+        label = f'{component}.{name}'
+        usage = {'new': 0, 'mmap': 0, 'shared': 0, 'shared_with': set()}
+        self._measure(obj, label, usage)
+
+        if usage['mmap']:
+            kind = 'mmap'
+        elif usage['new'] or not usage['shared']:
+            kind = 'private'
+        else:
+            kind = 'shared'
+        entry = {
+            'component': component,
+            'name': name,
+            'kind': kind,
+            'bytes': usage['new'] + usage['mmap'],
+            'shared_bytes': usage['shared'],
+            'shared_with': sorted(usage['shared_with'])
+        }
+        if detail:
+            entry['detail'] = detail
+        self.entries.append(entry)
+        return entry
+
+    def add_file(self, component, name, path):
+        """Record an on-disk artifact (not resident; reported for completeness)"""
+        size = os.path.getsize(path) if path and os.path.exists(path) else 0
+        self.entries.append({
+            'component': component, 'name': name, 'kind': 'disk',
+            'bytes': size, 'shared_bytes': 0, 'shared_with': [], 'detail': str(path)
+        })
+
+    def _claim(self, key, size, label, usage, obj):
+        owner = self._owners.get(key)
+        if owner is not None:
+            # Repeated references inside one entry are neither new nor shared
+            if owner[0] != label:
+                usage['shared'] += owner[1]
+                usage['shared_with'].add(owner[0])
+            return False
+        self._owners[key] = (label, size)
+        self._keep.append(obj)
+        return True
+
+    def _measure(self, obj, label, usage):
+        if isinstance(obj, np.ndarray):
+            self._measure_array(obj, label, usage)
+            return
+        # NumPy-backed pandas extension arrays (e.g. python-storage strings) wrap an object ndarray
+        backing = getattr(obj, '_ndarray', None)
+        if isinstance(backing, np.ndarray):
+            self._measure_array(backing, label, usage)
+            return
+
+        # Statically allocated singletons belong to the interpreter, not to a component
+        if obj is None or isinstance(obj, bool) or (type(obj) is int and -5 <= obj <= 256):
+            return
+        # pandas extension arrays (e.g. Arrow-backed strings) report their own buffers
+        size = obj.nbytes if hasattr(obj, 'nbytes') and hasattr(obj, 'dtype') else sys.getsizeof(obj)
+        if not self._claim(id(obj), size, label, usage, obj):
+            return
+        usage['new'] += size
+
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                self._measure(key, label, usage)
+                self._measure(value, label, usage)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            for item in obj:
+                self._measure(item, label, usage)
+
+    def _measure_array(self, array, label, usage):
+        root = _array_root(array)
+        is_mmap = isinstance(array, np.memmap) or isinstance(root.base, mmap.mmap)
+        # Views of different columns of one block are distinct; the same view twice is not
+        key = ('array', id(root), array.__array_interface__['data'][0], array.nbytes)
+        if not self._claim(key, array.nbytes, label, usage, array):
+            return
+        usage['mmap' if is_mmap else 'new'] += array.nbytes
+
+        if array.dtype == object:
+            for item in array.ravel():
+                self._measure(item, label, usage)
+
+    def totals(self):
+        """Bytes per kind, each buffer counted once"""
+        totals = {'private': 0, 'mmap': 0, 'disk': 0}
+        for entry in self.entries:
+            kind = 'private' if entry['kind'] == 'shared' else entry['kind']
+            totals[kind] += entry['bytes']
+        return totals
+
+
+def account_recommender(accountant, recommender, component='recommender'):
+    """Add the arrays, catalog and indexes of one MovieRecommender"""
+    train_df = getattr(recommender, 'train_df', None)
+    if train_df is not None:
+        # Full mode: the catalog columns are views into these
+        for column in train_df.columns:
+            accountant.add('train_df', column, train_df[column].values, detail=str(train_df[column].dtype))
+
+    for column, values in recommender.catalog.items():
+        accountant.add(f'{component}.catalog', column, values, detail=str(values.dtype))
+
+    similarity = recommender.similarity_matrix
+    if similarity is not None:
+        accountant.add(component, 'similarity_matrix', similarity,
+                       detail=f'{similarity.shape[0]}x{similarity.shape[1]} {similarity.dtype}')
+    elif getattr(recommender, 'shard_router', None) is not None:
+        # Held by the shard processes, not this one
+        router = recommender.shard_router
+        for k, shard in enumerate(router.manifest['shards']):
+            accountant.add_file('shards', f'shard_{k}', os.path.join(router.files_dir, shard['similarity_file']))
+    accountant.add(component, 'popularity_scaled', recommender.popularity_scaled)
+    accountant.add(component, 'rating_scaled', recommender.rating_scaled)
+    accountant.add(component, 'hybrid_weights', recommender.hybrid_weights)
+
+    title_index = recommender.title_index
+    for name in ('lower_titles', 'normalized', 'exact', 'postings', 'gram_counts'):
+        accountant.add('title_index', name, getattr(title_index, name))
+    prefix_index = recommender.prefix_index
+    for name in ('keys', 'key_ids', 'top', 'popularity'):
+        accountant.add('prefix_index', name, getattr(prefix_index, name))
+    accountant.add('lookup', 'id_to_index', recommender.id_to_index)
+    accountant.add('lookup', 'genre_index', recommender.genre_index)
+
+    text_index = getattr(recommender, 'text_index', None)
+    if text_index is not None:
+        for name in ('data', 'indices', 'indptr', 'posting_docs', 'posting_weights', 'posting_ptr'):
+            accountant.add('text_index', name, getattr(text_index, name))
+        accountant.add('text_index', 'vocabulary', text_index.vectorizer.vocabulary)
+        accountant.add('text_index', 'terms', text_index.vectorizer.terms)
+        accountant.add('text_index', 'idf', text_index.vectorizer.idf)
+
+
+def build_report(recommender, variants=None, caches=None):
+    """
+    Memory accounting for a serving process
+
+    Args:
+        recommender: Default MovieRecommender
+        variants: Optional VariantRegistry; extra variants are reported after the
+            default, so only what they do not share with it counts as theirs
+        caches: Optional {name: object} of in-memory caches, or path strings for
+            on-disk caches
+
+    Returns:
+        Dict with per-component entries, totals per kind and process RSS
+    """
+    accountant = MemoryAccountant()
+    account_recommender(accountant, recommender)
+
+    if variants is not None:
+        for name, variant in variants.recommenders.items():
+            if variant is not recommender:
+                account_recommender(accountant, variant, component=f'variant:{name}')
+
+    for name, cache in (caches or {}).items():
+        if isinstance(cache, str):
+            accountant.add_file('caches', name, cache)
+        else:
+            accountant.add('caches', name, cache)
+
+    by_component = {}
+    for entry in accountant.entries:
+        top = entry['component'].split('.')[0]
+        totals = by_component.setdefault(top, {'private': 0, 'mmap': 0, 'shared': 0, 'disk': 0})
+        totals['private' if entry['kind'] == 'shared' else entry['kind']] += entry['bytes']
+        totals['shared'] += entry['shared_bytes']
+
+    return {
+        'model_version': recommender.model_version,
+        'serving_mode': recommender.serving_mode,
+        'entries': accountant.entries,
+        'components': by_component,
+        'totals': accountant.totals(),
+        'process': process_memory()
+    }
+
+
+def print_report(report):
+    """Human-readable table of a build_report() result"""
+    def mb(n):
+        return f"{n / (1024 * 1024):.2f}"
+
+    print("=" * 96)
+    print(f"MEMORY REPORT  (model {report['model_version']}, {report['serving_mode']} mode)")
+    print("=" * 96)
+    print(f"{'component':<28}{'name':<22}{'kind':<9}{'MB':>10}{'shared MB':>11}  shared with")
+    print("-" * 96)
+    for entry in report['entries']:
+        shared_with = ','.join(entry['shared_with'][:2]) + ('...' if len(entry['shared_with']) > 2 else '')
+        print(f"{entry['component']:<28}{entry['name']:<22}{entry['kind']:<9}"
+              f"{mb(entry['bytes']):>10}{mb(entry['shared_bytes']):>11}  {shared_with}")
+
+    print("-" * 96)
+    print(f"{'component totals':<28}{'private MB':>12}{'mmap MB':>10}{'shared MB':>11}{'disk MB':>10}")
+    for component, totals in report['components'].items():
+        print(f"{component:<28}{mb(totals['private']):>12}{mb(totals['mmap']):>10}"
+              f"{mb(totals['shared']):>11}{mb(totals['disk']):>10}")
+
+    totals = report['totals']
+    print("-" * 96)
+    print(f"Accounted: {mb(totals['private'])} MB private, {mb(totals['mmap'])} MB memory-mapped, "
+          f"{mb(totals['disk'])} MB on disk")
+    process = report.get('process') or {}
+    if process:
+        print(f"Process:   {mb(process.get('rss', 0))} MB RSS "
+              f"({mb(process.get('rss_private', 0))} MB private, {mb(process.get('rss_file_backed', 0))} MB file-backed), "
+              f"peak {mb(process.get('peak_rss', 0))} MB")
+
+
+def fetch_report(url, token):
+    """GET /admin/memory from a running server"""
+    import urllib.request
+
+    request = urllib.request.Request(url.rstrip('/') + '/admin/memory', headers={'X-Admin-Token': token or ''})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default=str(script_dir.parent / 'results'))
+    parser.add_argument('--serving-mode', choices=['full', 'lean', 'sharded'], default='full')
+    parser.add_argument('--variants', default='', help='comma-separated extra model variants to load')
+    parser.add_argument('--url', help='report on a running server instead of loading models here')
+    parser.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'), help='admin token for --url')
+    parser.add_argument('--json', dest='json_path', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    if args.url:
+        result = fetch_report(args.url, args.token)
+    else:
+        from movie_recommender import MovieRecommender
+        from model_variants import VariantRegistry
+
+        loaded = MovieRecommender(models_dir=args.models_dir, serving_mode=args.serving_mode)
+        recommenders = {loaded.variant_name: loaded}
+        for variant_name in [v.strip() for v in args.variants.split(',') if v.strip()]:
+            recommenders[variant_name] = loaded.load_variant(variant_name)
+        registry = VariantRegistry(recommenders, {}, default=loaded.variant_name)
+        result = build_report(loaded, variants=registry)
+
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\n✓ Saved: {args.json_path}")
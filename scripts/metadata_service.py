@@ -0,0 +1,268 @@
+"""
+Movie Recommendation System - Metadata Service
+Batched poster/streaming lookup behind a pluggable provider with an on-disk TTL cache
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+TMDB_MOVIE_BASE = 'https://api.themoviedb.org/3/movie/'
+TMDB_SEARCH_BASE = 'https://api.themoviedb.org/3/search/movie'
+TMDB_IMAGE_BASE = 'https://image.tmdb.org/t/p/w500'
+WATCHMODE_TITLE_BASE = 'https://api.watchmode.com/v1/title/'
+
+STREAMING_TYPES = ('sub', 'free', 'tve')
+
+
+class MetadataProvider(abc.ABC):
+    """
+    Base class for metadata sources
+
+    Subclasses implement fetch_poster and fetch_streaming for a single movie
+    dict ({'movie_id', 'title', 'year'}). Returning None means "known to be
+    unavailable" and is cached unless `cache_misses` is off; raising means
+    "try again later" and is not cached.
+    """
+
+    name = 'base'
+    # Whether None / empty answers are authoritative enough to cache for the full TTL
+    cache_misses = True
+
+    @abc.abstractmethod
+    def fetch_poster(self, movie):
+        """Poster URL for a movie, or None"""
+
+    @abc.abstractmethod
+    def fetch_streaming(self, movie):
+        """List of streaming source dicts for a movie, or None"""
+
+
+class LocalMetadataProvider(MetadataProvider):
+    """
+    Offline stand-in that never leaves the process (tests, no API keys)
+
+    It only knows the mappings it was given, so its misses are not cached: a
+    week of cached "no poster" entries would outlive any reconfiguration.
+    """
+
+    name = 'local'
+    cache_misses = False
+
+    def __init__(self, posters=None, streaming=None):
+        """
+        Args:
+            posters: Optional {movie_id: poster_url} mapping
+            streaming: Optional {movie_id: [source dicts]} mapping
+        """
+        self.posters = posters or {}
+        self.streaming = streaming or {}
+        self.calls = 0
+
+    def fetch_poster(self, movie):
+        self.calls += 1
+        return self.posters.get(movie['movie_id'])
+
+    def fetch_streaming(self, movie):
+        self.calls += 1
+        return self.streaming.get(movie['movie_id'], [])
+
+
+class TMDBProvider(MetadataProvider):
+    """Posters from TMDB, streaming sources from Watchmode (both keyed by TMDB id)"""
+
+    name = 'tmdb'
+
+    def __init__(self, tmdb_api_key, watchmode_api_key=None, timeout=5.0):
+        self.tmdb_api_key = tmdb_api_key
+        self.watchmode_api_key = watchmode_api_key
+        self.timeout = timeout
+
+    def _get_json(self, url, params):
+        with urllib.request.urlopen(f'{url}?{urllib.parse.urlencode(params)}', timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def fetch_poster(self, movie):
+        try:
+            data = self._get_json(f"{TMDB_MOVIE_BASE}{movie['movie_id']}", {'api_key': self.tmdb_api_key})
+            poster_path = data.get('poster_path')
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+            # Not a TMDB id: fall back to a title search, as the frontend used to
+            params = {'api_key': self.tmdb_api_key, 'query': movie['title']}
+            if movie.get('year'):
+                params['year'] = movie['year']
+            results = self._get_json(TMDB_SEARCH_BASE, params).get('results') or []
+            poster_path = results[0].get('poster_path') if results else None
+
+        return f'{TMDB_IMAGE_BASE}{poster_path}' if poster_path else None
+
+    def fetch_streaming(self, movie):
+        if not self.watchmode_api_key:
+            return None
+        try:
+            data = self._get_json(
+                f"{WATCHMODE_TITLE_BASE}movie-{movie['movie_id']}/details/",
+                {'apiKey': self.watchmode_api_key, 'append_to_response': 'sources'}
+            )
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return []
+            raise
+        return [
+            {'name': s.get('name'), 'type': s.get('type'), 'web_url': s.get('web_url')}
+            for s in data.get('sources') or []
+            if s.get('type') in STREAMING_TYPES
+        ]
+
+
+class MetadataCache:
+    """Persistent key/value cache in a single SQLite file, with per-entry timestamps"""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600):
+        """
+        Args:
+            path: SQLite file (created if missing); ':memory:' for a throwaway cache
+            ttl_seconds: Entries older than this are treated as misses
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT, fetched_at REAL)'
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Fresh cached values for `keys` as {key: value}; missing/expired keys are absent"""
+        if not keys:
+            return {}
+        cutoff = time.time() - self.ttl_seconds
+        placeholders = ','.join('?' * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT key, value FROM metadata WHERE fetched_at >= ? AND key IN ({placeholders})',
+                [cutoff, *keys]
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def put_many(self, items):
+        """Store {key: value} with the current timestamp"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO metadata (key, value, fetched_at) VALUES (?, ?, ?)',
+                [(key, json.dumps(value), now) for key, value in items.items()]
+            )
+            self._conn.commit()
+
+    def discard_empty(self, prefix):
+        """Delete entries under a key prefix whose value is null or an empty list"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM metadata WHERE key LIKE ? AND value IN ('null', '[]')", (f'{prefix}%',)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def purge_expired(self):
+        """Delete expired entries, returning how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM metadata WHERE fetched_at < ?', (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class MetadataService:
+    """Resolves metadata for many movies per call: cache first, then parallel provider fetches"""
+
+    def __init__(self, provider, cache, max_workers=8):
+        self.provider = provider
+        self.cache = cache
+        self.max_workers = max_workers
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        if not provider.cache_misses:
+            # Misses cached before this provider stopped caching them would linger for a full TTL
+            cache.discard_empty(f'{provider.name}:')
+
+    def _key(self, kind, movie_id):
+        return f'{self.provider.name}:{kind}:{movie_id}'
+
+    def get_metadata(self, movies, include_streaming=False):
+        """
+        Resolve poster (and optionally streaming) info for a list of movies
+
+        Args:
+            movies: List of {'movie_id', 'title', 'year'} dicts
+            include_streaming: Also resolve streaming sources
+
+        Returns:
+            {movie_id: {'poster_url': ..., 'sources': ...}}
+        """
+        kinds = ('poster', 'streaming') if include_streaming else ('poster',)
+        wanted = {self._key(kind, m['movie_id']): (kind, m) for m in movies for kind in kinds}
+        found = self.cache.get_many(list(wanted))
+
+        missing = [(key, kind, movie) for key, (kind, movie) in wanted.items() if key not in found]
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(missing)
+
+        if missing:
+            def fetch(item):
+                key, kind, movie = item
+                try:
+                    if kind == 'poster':
+                        return key, self.provider.fetch_poster(movie), True
+                    return key, self.provider.fetch_streaming(movie), True
+                except Exception:
+                    return key, None, False
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                fetched = list(pool.map(fetch, missing))
+
+            fresh = {key: value for key, value, ok in fetched if ok}
+            self.stats['errors'] += len(fetched) - len(fresh)
+            self.cache.put_many(
+                fresh if self.provider.cache_misses else {key: value for key, value in fresh.items() if value}
+            )
+            found.update(fresh)
+            found.update({key: value for key, value, ok in fetched if not ok})
+
+        results = {}
+        for movie in movies:
+            entry = {'poster_url': found.get(self._key('poster', movie['movie_id']))}
+            if include_streaming:
+                entry['sources'] = found.get(self._key('streaming', movie['movie_id']))
+            results[movie['movie_id']] = entry
+        return results
+
+
+def create_metadata_service(cache_path, ttl_seconds=7 * 24 * 3600):
+    """
+    Build the service from environment configuration
+
+    Uses TMDB/Watchmode when TMDB_API_KEY (and optionally WATCHMODE_API_KEY)
+    are set, otherwise the offline LocalMetadataProvider.
+    """
+    tmdb_key = os.environ.get('TMDB_API_KEY')
+    if tmdb_key:
+        provider = TMDBProvider(tmdb_key, os.environ.get('WATCHMODE_API_KEY'))
+    else:
+        provider = LocalMetadataProvider()
+    return MetadataService(provider, MetadataCache(cache_path, ttl_seconds))
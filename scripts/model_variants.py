@@ -0,0 +1,154 @@
+"""
+Movie Recommendation System - Model Variants
+Several named models served side by side for A/B tests, with per-variant stats
+"""
+
+import hashlib
+from collections import deque
+import numpy as np
+
+
+def parse_traffic(spec):
+    """
+    Parse a traffic split such as "improved:90,svd:10"
+
+    Returns:
+        {variant: weight} in the order given; bare names get weight 1
+    """
+    traffic = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition(':')
+        traffic[name.strip()] = float(weight) if weight else 1.0
+    return traffic
+
+
+def assign_bucket(user_id, salt=''):
+    """Stable position in [0, 1) for a user id, identical across processes and restarts"""
+    digest = hashlib.sha256(f'{salt}:{user_id}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+
+
+class VariantRegistry:
+    """
+    Loaded model variants, each with its own dispatcher, plus traffic assignment
+
+    Variants come from MovieRecommender.load_variant, so they share the catalog
+    and indexes of the default one and only add their own similarity matrix.
+    """
+
+    def __init__(self, recommenders, dispatchers, default, traffic=None, salt='', latency_window=2048):
+        """
+        Args:
+            recommenders: {name: MovieRecommender}
+            dispatchers: {name: RecommendDispatcher} for the same names
+            default: Variant used when a request neither names one nor carries a user id
+            traffic: {name: weight} for hash-of-user-id assignment (default: all to `default`)
+            salt: Mixed into the user hash; change it to reshuffle assignments
+            latency_window: Recent latencies kept per variant for percentiles
+        """
+        self.recommenders = recommenders
+        self.dispatchers = dispatchers
+        self.default = default
+        self.salt = salt
+
+        traffic = {name: w for name, w in (traffic or {default: 1.0}).items() if w > 0}
+        unknown = set(traffic) - set(recommenders)
+        if unknown:
+            raise ValueError(f"Traffic split names variants that are not loaded: {sorted(unknown)}")
+        if not traffic:
+            raise ValueError("Traffic split assigns no traffic")
+        total = sum(traffic.values())
+        self.traffic = {name: w / total for name, w in traffic.items()}
+        self._names = list(self.traffic)
+        self._cutoffs = np.cumsum(list(self.traffic.values()))
+
+        self._latencies = {name: deque(maxlen=latency_window) for name in recommenders}
+        self._requests = {name: 0 for name in recommenders}
+        self._assigned = {name: 0 for name in recommenders}
+
+        # One version for the whole set, so ETags change when any variant does
+        key = '|'.join(f'{name}={rec.model_version}' for name, rec in sorted(recommenders.items()))
+        self.version = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    def __contains__(self, name):
+        return name in self.recommenders
+
+    def assign(self, user_id):
+        """Variant for a user id according to the traffic split"""
+        position = np.searchsorted(self._cutoffs, assign_bucket(user_id, self.salt), side='right')
+        return self._names[min(position, len(self._names) - 1)]
+
+    def select(self, variant=None, user_id=None):
+        """
+        Resolve the variant for one request: explicit name, then user assignment, then default
+
+        Raises:
+            ValueError: If an explicitly requested variant is not loaded
+        """
+        if variant:
+            if variant not in self.recommenders:
+                raise ValueError(f"Unknown model variant '{variant}' (loaded: {sorted(self.recommenders)})")
+            return variant
+        if user_id:
+            name = self.assign(user_id)
+            self._assigned[name] += 1
+            return name
+        return self.default
+
+    def record(self, name, seconds):
+        """Record the latency of one request served by `name`"""
+        self._requests[name] += 1
+        self._latencies[name].append(seconds * 1000.0)
+
+    def memory(self):
+        """
+        Bytes held per variant, separating what is private from what is shared
+
+        The default variant owns the shared catalog; the others only add their
+        similarity matrix (and scaled vectors if their hybrid model ships its own).
+        Memory-mapped matrices are reported separately since their pages live in
+        the page cache, not the process heap.
+        """
+        base = self.recommenders[self.default]
+        report = {}
+        for name, rec in self.recommenders.items():
+            similarity = rec.similarity_matrix
+            # Sharded mode: the matrix lives in the shard processes
+            arrays = [similarity] if similarity is not None else []
+            if name == self.default or rec.popularity_scaled is not base.popularity_scaled:
+                arrays += [rec.popularity_scaled, rec.rating_scaled]
+            mapped = [a for a in arrays if isinstance(a, np.memmap)]
+            private = [a for a in arrays if not isinstance(a, np.memmap)]
+            report[name] = {
+                'similarity_dtype': str(similarity.dtype) if similarity is not None else 'sharded',
+                'private_bytes': int(sum(np.asarray(a).nbytes for a in private)),
+                'mmap_bytes': int(sum(a.nbytes for a in mapped)),
+                'shares_catalog_with': None if name == self.default else self.default
+            }
+        return report
+
+    def metrics(self):
+        """Traffic split, request counts and latency percentiles per variant"""
+        variants = {}
+        for name in self.recommenders:
+            latencies = np.fromiter(self._latencies[name], dtype=np.float64)
+            entry = {
+                'model_version': self.recommenders[name].model_version,
+                'traffic_share': round(self.traffic.get(name, 0.0), 4),
+                'requests': self._requests[name],
+                'assigned_by_user_hash': self._assigned[name]
+            }
+            if len(latencies):
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                entry['latency_ms'] = {
+                    'p50': round(float(p50), 3),
+                    'p95': round(float(p95), 3),
+                    'p99': round(float(p99), 3),
+                    'mean': round(float(latencies.mean()), 3)
+                }
+            variants[name] = entry
+        return {'default': self.default, 'version': self.version, 'variants': variants}
+
@@ -3,25 +3,110 @@ Movie Recommendation System - Inference Engine
 Fast, lightweight recommendation engine for movies
 """
 
+import copy
 import pickle
+import hashlib
 import numpy as np
-import pandas as pd
 import os
 from typing import List, Tuple, Dict
 import json
 from pathlib import Path
 
+from title_index import TitleIndex, PrefixIndex
+from text_index import TextIndex, TFIDF_PARAMS
+from similarity_shards import ShardRouter, SHARDS_DIR
+import artifact_store
+
+
+def compute_artifact_version(paths, chunk_size=1 << 20, label=None):
+    """
+    Content hash identifying a set of model artifacts
+    
+    Args:
+        paths: Artifact files, in load order
+        chunk_size: Read size while hashing
+        label: Optional name mixed into the hash (variants that read different
+            matrices from the same files)
+    
+    Returns:
+        16-character hex digest that changes whenever any artifact changes
+    """
+    digest = hashlib.sha256()
+    if label is not None:
+        digest.update(label.encode('utf-8'))
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+# Catalog columns used at serving time; everything else in train_df is ignored
+NUMERIC_COLUMNS = ('movie_id', 'release_year', 'vote_average', 'vote_count', 'popularity')
+OBJECT_COLUMNS = ('title', 'overview', 'genres_list')
+SERVING_DIR = 'serving'
+TEXT_VECTORIZER_FILE = 'text_vectorizer.json'
+TEXT_MATRIX_FILE = 'text_matrix.npz'
+
+# Servable model variants: (content pickle, similarity key, hybrid pickles in order of preference).
+# The SVD and Word2Vec matrices are only written to the original Part 3 pickle.
+MODEL_VARIANTS = {
+    'improved': ('content_based_models_improved.pkl', 'similarity_matrix_cosine',
+                 ('hybrid_model_improved.pkl',)),
+    'original': ('content_based_models.pkl', 'similarity_matrix_cosine',
+                 ('hybrid_model_lightweight.pkl',)),
+    'svd': ('content_based_models.pkl', 'similarity_matrix_svd',
+            ('hybrid_model_lightweight.pkl', 'hybrid_model_improved.pkl')),
+    'w2v': ('content_based_models.pkl', 'similarity_matrix_w2v',
+            ('hybrid_model_lightweight.pkl', 'hybrid_model_improved.pkl')),
+}
+
+
+def _object_array(values):
+    """1-D object array from a list, without numpy broadcasting nested lists"""
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def _to_builtin(value):
+    """json.dump default for numpy scalars/arrays"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 
 class MovieRecommender:
     """Lightweight movie recommendation engine"""
     
-    def __init__(self, models_dir='results'):
+    LOAD_STAGES = ('preprocessed_data', 'content_models', 'hybrid_model', 'version_hash', 'indexes')
+    
+    def __init__(self, models_dir='results', fuzzy_threshold=0.75, progress_callback=None,
+                 serving_mode='full', mmap=True):
         """
         Initialize the recommender with pre-trained models
         
         Args:
             models_dir: Directory containing saved model files
+            fuzzy_threshold: Minimum confidence for accepting a typo-tolerant title match
+            progress_callback: Optional callable(stage) invoked after each of LOAD_STAGES
+            serving_mode: 'full' unpickles the notebook artifacts (needs pandas);
+                'lean' loads NumPy/JSON files written by export_serving_artifacts;
+                'sharded' is lean, but scores through local shard processes that
+                each hold a column slice of the similarity matrix
+            mmap: In lean mode, memory-map the similarity matrix instead of reading it
         """
+        if serving_mode not in ('full', 'lean', 'sharded'):
+            raise ValueError(f"Unknown serving_mode '{serving_mode}' (expected 'full', 'lean' or 'sharded')")
+        self.fuzzy_threshold = fuzzy_threshold
+        self.progress_callback = progress_callback
+        self.serving_mode = serving_mode
+        self.mmap = mmap
+        
         # Handle relative paths
         if not os.path.isabs(models_dir):
             # If path starts with ../, resolve it relative to current working directory
@@ -35,36 +120,74 @@ class MovieRecommender:
             self.models_dir = os.path.normpath(models_dir)
         self.load_models()
         
+    def _report_progress(self, stage):
+        if self.progress_callback is not None:
+            self.progress_callback(stage)
+    
     def load_models(self):
         """Load all pre-trained models and data"""
+        self.shard_router = None
+        if self.serving_mode in ('lean', 'sharded'):
+            self._load_serving_artifacts()
+        else:
+            self._load_pickles()
+        
+        self.n_movies = len(self.movie_titles)
+        self.title_index = TitleIndex(self.movie_titles)
+        self.prefix_index = PrefixIndex(self.movie_titles, self.catalog['popularity'])
+        self.id_to_index = {int(movie_id): idx for idx, movie_id in enumerate(self.catalog['movie_id'])}
+        self.genre_index = self._build_genre_index(self.catalog['genres_list'])
+        if self.serving_mode == 'full':
+            self.text_index = (
+                TextIndex.fit(self.catalog['overview'], self._tfidf_params)
+                if 'overview' in self.catalog else None
+            )
+        
+        self._report_progress('indexes')
+        print(f"[OK] Loaded {self.n_movies} movies (model version {self.model_version}, {self.serving_mode} mode)")
+    
+    def _load_pickles(self):
+        """Full mode: unpickle the notebook artifacts (pulls in pandas via the DataFrame)"""
+        artifact_files = []
         try:
             # Load preprocessed data
             with open(os.path.join(self.models_dir, 'preprocessed_data.pkl'), 'rb') as f:
                 preprocess_data = pickle.load(f)
+                artifact_files.append(f.name)
             
             self.train_df = preprocess_data['train_df']
+            self._tfidf_params = self._text_index_params(preprocess_data.get('tfidf_vectorizer_processed'))
+            self._report_progress('preprocessed_data')
             
             # Try to load improved models first, fallback to original
             try:
                 with open(os.path.join(self.models_dir, 'content_based_models_improved.pkl'), 'rb') as f:
                     content_models = pickle.load(f)
+                    artifact_files.append(f.name)
+                self.variant_name = 'improved'
                 print("[OK] Using IMPROVED models!")
             except FileNotFoundError:
                 with open(os.path.join(self.models_dir, 'content_based_models.pkl'), 'rb') as f:
                     content_models = pickle.load(f)
+                    artifact_files.append(f.name)
+                self.variant_name = 'original'
                 print("[OK] Using original models")
             
             self.similarity_matrix = content_models['similarity_matrix_cosine']
+            self._report_progress('content_models')
             
             # Load hybrid model (improved or original)
             try:
                 with open(os.path.join(self.models_dir, 'hybrid_model_improved.pkl'), 'rb') as f:
                     hybrid_model = pickle.load(f)
+                    artifact_files.append(f.name)
             except FileNotFoundError:
                 with open(os.path.join(self.models_dir, 'hybrid_model_lightweight.pkl'), 'rb') as f:
                     hybrid_model = pickle.load(f)
+                    artifact_files.append(f.name)
             
             self.hybrid_model = hybrid_model
+            self._report_progress('hybrid_model')
             
             print(f"  - Movies available: {len(self.train_df)}")
             print(f"  - Similarity matrix: {self.similarity_matrix.shape}")
@@ -73,48 +196,675 @@ class MovieRecommender:
             print(f"✗ Error loading models: {e}")
             raise
         
+        self.artifact_files = artifact_files
+        self.model_version = compute_artifact_version(artifact_files)
+        self._report_progress('version_hash')
         self.hybrid_weights = hybrid_model['weights']
-        self.movie_titles = self.train_df['title'].values
-        self.movie_ids = self.train_df.index.values
         
+        # Column arrays (views into train_df) used by every serving path
+        self.catalog = {
+            column: self.train_df[column].values
+            for column in NUMERIC_COLUMNS + OBJECT_COLUMNS
+            if column in self.train_df.columns
+        }
+        self.movie_titles = self.catalog['title']
+        self.movie_ids = self.catalog['movie_id']
+        self._catalog_scaled = None
+        self.popularity_scaled, self.rating_scaled = self._scaled_vectors(hybrid_model)
+    
+    def _scaled_vectors(self, hybrid_model):
+        """(popularity_scaled, rating_scaled) for a hybrid model"""
         # Use pre-computed scaled values if available, otherwise compute
         if 'popularity_scaled' in hybrid_model and 'rating_scaled' in hybrid_model:
-            self.popularity_scaled = hybrid_model['popularity_scaled']
-            self.rating_scaled = hybrid_model['rating_scaled']
-        else:
-            # Compute scaled popularity and rating scores for hybrid model
-            popularity = self.train_df['popularity'].values
-            rating = self.train_df['vote_average'].values
+            return hybrid_model['popularity_scaled'], hybrid_model['rating_scaled']
+        
+        # Computed once from the catalog and shared by every variant that needs them
+        if self._catalog_scaled is None:
+            popularity = self.catalog['popularity']
+            rating = self.catalog['vote_average']
             
             # Scale to [0, 1]
-            self.popularity_scaled = (popularity - popularity.min()) / (popularity.max() - popularity.min() + 1e-8)
-            self.rating_scaled = (rating - rating.min()) / (rating.max() - rating.min() + 1e-8)
+            self._catalog_scaled = (
+                (popularity - popularity.min()) / (popularity.max() - popularity.min() + 1e-8),
+                (rating - rating.min()) / (rating.max() - rating.min() + 1e-8)
+            )
+        return self._catalog_scaled
+    
+    def _load_serving_artifacts(self):
+        """Lean mode: NumPy arrays and plain JSON only, no pandas/sklearn objects"""
+        serving_dir = os.path.join(self.models_dir, SERVING_DIR)
+        try:
+            # Read once: an export running now swaps the manifest, never these files
+            manifest = artifact_store.read_manifest(serving_dir)
+            data_dir = artifact_store.files_dir(serving_dir, manifest)
+            
+            with open(os.path.join(data_dir, 'catalog.json')) as f:
+                objects = json.load(f)
+            with np.load(os.path.join(data_dir, 'columns.npz')) as data:
+                arrays = {name: data[name] for name in data.files}
+            self.catalog = {name: arrays[name] for name in NUMERIC_COLUMNS if name in arrays}
+            self.catalog.update({name: _object_array(values) for name, values in objects.items()})
+            self.train_df = None
+            self._report_progress('preprocessed_data')
+            
+            if self.serving_mode == 'sharded':
+                # This process never opens the dense matrix; the shards hold it
+                self.similarity_matrix = None
+                self.shard_router = ShardRouter(
+                    os.path.join(serving_dir, SHARDS_DIR), expected_version=manifest['model_version']
+                )
+            else:
+                self.similarity_matrix = np.load(
+                    os.path.join(data_dir, 'similarity.npy'),
+                    mmap_mode='r' if self.mmap else None
+                )
+            self._report_progress('content_models')
+            
+            # Optional: exports made before the text index existed still load
+            self.text_index = None
+            if os.path.exists(os.path.join(data_dir, TEXT_MATRIX_FILE)):
+                self.text_index = TextIndex.load(
+                    os.path.join(data_dir, TEXT_VECTORIZER_FILE),
+                    os.path.join(data_dir, TEXT_MATRIX_FILE)
+                )
+            
+            self.hybrid_model = {'weights': manifest['weights']}
+            self.hybrid_weights = manifest['weights']
+            self.popularity_scaled = arrays['popularity_scaled']
+            self.rating_scaled = arrays['rating_scaled']
+            # Exported variants without their own scaled vectors use these
+            self._catalog_scaled = (self.popularity_scaled, self.rating_scaled)
+            self._report_progress('hybrid_model')
+            
+            print(f"[OK] Using exported serving artifacts ({data_dir})")
+            print(f"  - Movies available: {manifest['n_movies']}")
+            if self.shard_router is not None:
+                print(f"  - Similarity matrix: {self.shard_router.n_shards} column shards")
+            else:
+                print(f"  - Similarity matrix: {self.similarity_matrix.shape}")
+        except FileNotFoundError as e:
+            print(f"✗ Error loading serving artifacts: {e} (run scripts/serving_report.py export first)")
+            raise
         
-        print(f"[OK] Loaded {len(self.train_df)} movies")
+        # The exported files carry the version of the pickles they came from,
+        # so both modes share ETags for identical responses
+        self.artifact_files = [os.path.join(data_dir, name) for name in ('manifest.json', 'catalog.json', 'columns.npz')]
+        self.artifact_files.append(
+            os.path.join(self.shard_router.files_dir, 'manifest.json') if self.shard_router is not None
+            else os.path.join(data_dir, 'similarity.npy')
+        )
+        self.model_version = manifest['model_version']
+        self.variant_name = manifest.get('variant', 'improved')
+        self._manifest = manifest
+        self._data_dir = data_dir
+        self._report_progress('version_hash')
+        
+        self.movie_titles = self.catalog['title']
+        self.movie_ids = self.catalog['movie_id']
     
-    def get_movie_by_title(self, title):
-        """Find movie index by title (fuzzy match)"""
-        title_lower = title.lower()
+    @staticmethod
+    def _text_index_params(notebook_vectorizer):
+        """
+        TF-IDF settings for the free-text index
+        
+        The notebook vectorizer was fit on NLTK-stemmed overviews, which arbitrary
+        query text cannot be matched against without NLTK at serving time. Its
+        hyperparameters are reused, but the index is refit on the raw overviews.
+        """
+        params = dict(TFIDF_PARAMS)
+        if notebook_vectorizer is not None:
+            fitted = notebook_vectorizer.get_params()
+            params.update({key: fitted[key] for key in ('max_features', 'ngram_range', 'min_df', 'max_df', 'sublinear_tf')})
+        return params
+    
+    @staticmethod
+    def _build_genre_index(genres_column):
+        """Genre name -> sorted array of catalog indices"""
+        index = {}
+        for idx, genres_list in enumerate(genres_column):
+            if isinstance(genres_list, list):
+                for g in genres_list:
+                    name = g['name'] if isinstance(g, dict) else g
+                    index.setdefault(name, []).append(idx)
+        return {name: np.asarray(indices, dtype=np.intp) for name, indices in index.items()}
+    
+    def load_variant(self, name):
+        """
+        Load another model variant that shares this instance's catalog and indexes
+        
+        Only the variant's similarity matrix and hybrid weights are read; catalog
+        columns and the title, prefix, genre and text indexes are the same objects.
+        
+        Args:
+            name: Key of MODEL_VARIANTS
+        
+        Returns:
+            MovieRecommender serving the variant (self if `name` is the loaded one)
+        
+        Raises:
+            ValueError: Unknown variant, or a matrix that does not match the catalog
+            FileNotFoundError: The variant's artifacts are missing
+        """
+        if name == self.variant_name:
+            return self
+        if name not in MODEL_VARIANTS:
+            raise ValueError(f"Unknown model variant '{name}' (expected one of {sorted(MODEL_VARIANTS)})")
+        if self.shard_router is not None:
+            raise ValueError("Model variants are not supported in sharded serving mode")
+        
+        if self.serving_mode == 'lean':
+            similarity, hybrid_model, artifact_files, model_version = self._read_exported_variant(name)
+        else:
+            similarity, hybrid_model, artifact_files, model_version = self._read_pickled_variant(name)
+        
+        if similarity.shape != (self.n_movies, self.n_movies):
+            raise ValueError(
+                f"Variant '{name}' similarity matrix {similarity.shape} does not match {self.n_movies} movies"
+            )
+        popularity_scaled, rating_scaled = self._scaled_vectors(hybrid_model)
         
+        variant = copy.copy(self)
+        variant.variant_name = name
+        variant.similarity_matrix = similarity
+        variant.hybrid_model = hybrid_model
+        variant.hybrid_weights = hybrid_model['weights']
+        variant.popularity_scaled = popularity_scaled
+        variant.rating_scaled = rating_scaled
+        variant.artifact_files = artifact_files
+        variant.model_version = model_version
+        print(f"[OK] Loaded model variant '{name}' (model version {model_version})")
+        return variant
+    
+    def _read_pickled_variant(self, name):
+        """Similarity matrix and hybrid model of a variant, from the notebook pickles"""
+        content_file, similarity_key, hybrid_files = MODEL_VARIANTS[name]
+        content_path = os.path.join(self.models_dir, content_file)
+        with open(content_path, 'rb') as f:
+            content_models = pickle.load(f)
+        if similarity_key not in content_models:
+            raise ValueError(f"{content_file} has no '{similarity_key}' for variant '{name}'")
+        similarity = content_models[similarity_key]
+        
+        for hybrid_file in hybrid_files:
+            hybrid_path = os.path.join(self.models_dir, hybrid_file)
+            if os.path.exists(hybrid_path):
+                break
+        else:
+            raise FileNotFoundError(f"No hybrid model for variant '{name}' (tried {', '.join(hybrid_files)})")
+        with open(hybrid_path, 'rb') as f:
+            hybrid_model = pickle.load(f)
+        
+        # The catalog pickle is part of every variant's version
+        artifact_files = [self.artifact_files[0], content_path, hybrid_path]
+        return similarity, hybrid_model, artifact_files, compute_artifact_version(artifact_files, label=name)
+    
+    def _read_exported_variant(self, name):
+        """Similarity matrix and hybrid model of a variant, from the lean export"""
+        entry = self._manifest.get('variants', {}).get(name)
+        if entry is None:
+            raise FileNotFoundError(
+                f"Variant '{name}' was not exported (run scripts/serving_report.py export --variants {name})"
+            )
+        # The export this instance was loaded from, even if a newer one was published since
+        similarity_path = os.path.join(self._data_dir, entry['similarity_file'])
+        similarity = np.load(similarity_path, mmap_mode='r' if self.mmap else None)
+        
+        hybrid_model = {'weights': entry['weights']}
+        if entry.get('scaled_file'):
+            with np.load(os.path.join(self._data_dir, entry['scaled_file'])) as data:
+                hybrid_model['popularity_scaled'] = data['popularity_scaled']
+                hybrid_model['rating_scaled'] = data['rating_scaled']
+        return similarity, hybrid_model, [similarity_path], entry['model_version']
+    
+    @staticmethod
+    def _save_matrix(matrix, path, float32=False):
+        """Write a similarity matrix as a contiguous .npy file"""
+        matrix = np.asarray(matrix)
+        if float32:
+            matrix = matrix.astype(np.float32)
+        np.save(path, np.ascontiguousarray(matrix))
+        return matrix.dtype
+    
+    def export_serving_artifacts(self, out_dir=None, float32=False, variants=()):
+        """
+        Write the NumPy/JSON artifacts that lean serving mode loads
+        
+        Files go to a new export directory under out_dir and become visible
+        only when out_dir/manifest.json is atomically replaced at the end, so
+        servers that have the previous export memory-mapped are unaffected.
+        
+        Args:
+            out_dir: Destination (default: <models_dir>/serving)
+            float32: Store the similarity matrices as float32 (half the memory)
+            variants: Extra variants from load_variant to export alongside this one
+        
+        Returns:
+            Path of the output directory
+        """
+        serving_dir = out_dir or os.path.join(self.models_dir, SERVING_DIR)
+        out_dir, _ = artifact_store.new_export_dir(serving_dir, self.model_version)
+        
+        similarity_dtype = self._save_matrix(
+            self.similarity_matrix, os.path.join(out_dir, 'similarity.npy'), float32
+        )
+        
+        exported_variants = {}
+        for variant in variants:
+            name = variant.variant_name
+            if name == self.variant_name:
+                continue
+            entry = {
+                'model_version': variant.model_version,
+                'weights': variant.hybrid_weights,
+                'similarity_file': f'similarity_{name}.npy'
+            }
+            self._save_matrix(variant.similarity_matrix, os.path.join(out_dir, entry['similarity_file']), float32)
+            if variant.popularity_scaled is not self.popularity_scaled:
+                entry['scaled_file'] = f'scaled_{name}.npz'
+                np.savez(
+                    os.path.join(out_dir, entry['scaled_file']),
+                    popularity_scaled=np.asarray(variant.popularity_scaled, dtype=np.float64),
+                    rating_scaled=np.asarray(variant.rating_scaled, dtype=np.float64)
+                )
+            exported_variants[name] = entry
+        
+        arrays = {name: np.asarray(self.catalog[name]) for name in NUMERIC_COLUMNS if name in self.catalog}
+        arrays['popularity_scaled'] = np.asarray(self.popularity_scaled, dtype=np.float64)
+        arrays['rating_scaled'] = np.asarray(self.rating_scaled, dtype=np.float64)
+        np.savez(os.path.join(out_dir, 'columns.npz'), **arrays)
+        
+        with open(os.path.join(out_dir, 'catalog.json'), 'w') as f:
+            json.dump(
+                {name: list(self.catalog[name]) for name in OBJECT_COLUMNS if name in self.catalog},
+                f, default=_to_builtin
+            )
+        
+        if self.text_index is not None:
+            self.text_index.save(
+                os.path.join(out_dir, TEXT_VECTORIZER_FILE),
+                os.path.join(out_dir, TEXT_MATRIX_FILE)
+            )
+        
+        artifact_store.publish(serving_dir, out_dir, {
+            'model_version': self.model_version,
+            'n_movies': self.n_movies,
+            'weights': self.hybrid_weights,
+            'similarity_dtype': str(similarity_dtype),
+            'variant': self.variant_name,
+            'variants': exported_variants,
+            'text_index_features': self.text_index.n_features if self.text_index is not None else None,
+            'source_files': [os.path.basename(path) for path in self.artifact_files]
+        }, default=_to_builtin)
+        
+        return serving_dir
+    
+    def warm_up(self, chunk_rows=256):
+        """
+        Touch every page of the loaded arrays so first requests don't fault them in
+        
+        Args:
+            chunk_rows: Similarity-matrix rows reduced per step
+        
+        Returns:
+            Number of bytes touched
+        """
+        if self.shard_router is not None:
+            touched = self.shard_router.warm_up()
+        else:
+            touched = 0
+            n_rows = self.similarity_matrix.shape[0]
+            for start in range(0, n_rows, chunk_rows):
+                block = np.asarray(self.similarity_matrix[start:start + chunk_rows])
+                block.sum()
+                touched += block.nbytes
+        for array in (self.popularity_scaled, self.rating_scaled):
+            np.asarray(array).sum()
+            touched += np.asarray(array).nbytes
+        for column in ('movie_id', 'vote_average', 'popularity'):
+            values = self.catalog[column]
+            values.sum()
+            touched += values.nbytes
+        return touched
+    
+    def validate(self, n_queries=5, n_recommendations=10):
+        """
+        Smoke-test freshly loaded artifacts before they are put into service
+        
+        Args:
+            n_queries: Number of popular movies to run through both models
+            n_recommendations: Recommendations requested per smoke query
+        
+        Returns:
+            Dict describing the checks that passed
+        
+        Raises:
+            ValueError: If any check fails
+        """
+        n_movies = self.n_movies
+        if self.shard_router is not None:
+            columns = sorted(shard['columns'] for shard in self.shard_router.info())
+            covered = [lo for lo, _ in columns] + [n_movies] == [0] + [hi for _, hi in columns]
+            if not covered or any(shard['rows'] != n_movies for shard in self.shard_router.info()):
+                raise ValueError(f"Similarity shards {columns} do not cover {n_movies} movies")
+        elif self.similarity_matrix.shape != (n_movies, n_movies):
+            raise ValueError(
+                f"Similarity matrix shape {self.similarity_matrix.shape} does not match {n_movies} movies"
+            )
+        for name in ('popularity_scaled', 'rating_scaled'):
+            if len(getattr(self, name)) != n_movies:
+                raise ValueError(f"{name} has {len(getattr(self, name))} entries, expected {n_movies}")
+        
+        indices = self.most_popular_indices(n_queries)
+        expected = min(n_recommendations, n_movies - 1)
+        for model_type in ('hybrid', 'content_based'):
+            for result in self.recommend_indices(indices, model_type, n_recommendations):
+                recs = result['recommendations']
+                score_key = 'hybrid_score' if model_type == 'hybrid' else 'similarity_score'
+                if len(recs) != expected:
+                    raise ValueError(f"{model_type} smoke query returned {len(recs)} results, expected {expected}")
+                if not all(np.isfinite(rec[score_key]) for rec in recs):
+                    raise ValueError(f"{model_type} smoke query produced non-finite scores")
+        
+        for idx in indices:
+            title = self.movie_titles[idx]
+            if self.get_movie_by_title(title) is None:
+                raise ValueError(f"Title lookup failed for '{title}'")
+        
+        return {'movies': n_movies, 'smoke_queries': len(indices) * 2, 'model_version': self.model_version}
+    
+    def most_popular_indices(self, n):
+        """Catalog indices of the n most popular movies"""
+        popularity = self.catalog['popularity']
+        n = min(n, len(popularity))
+        return [int(idx) for idx in np.argsort(-popularity, kind='stable')[:n]]
+    
+    def get_movie_by_title(self, title):
+        """Find movie index by title (exact, then substring, then typo-tolerant match)"""
         # Exact match first
-        for idx, movie_title in enumerate(self.movie_titles):
-            if movie_title.lower() == title_lower:
-                return idx
+        idx = self.title_index.lookup_exact(title)
+        if idx is not None:
+            return idx
         
         # Partial match
-        for idx, movie_title in enumerate(self.movie_titles):
-            if title_lower in movie_title.lower():
-                return idx
+        idx = self.title_index.lookup_substring(title)
+        if idx is not None:
+            return idx
+        
+        # Approximate match, accepted only above the confidence threshold
+        candidates = self.title_index.search(title, limit=1)
+        if candidates and candidates[0][1] >= self.fuzzy_threshold:
+            return candidates[0][0]
         
         return None
     
-    def recommend_content_based(self, movie_title, n_recommendations=10):
+    def suggest_titles(self, title, limit=5):
+        """
+        Rank catalog titles by similarity to a possibly misspelled title
+        
+        Args:
+            title: Title as typed by the user
+            limit: Maximum number of candidates
+        
+        Returns:
+            List of candidate dicts, best first
+        """
+        return [
+            {
+                'title': self.movie_titles[idx],
+                'movie_id': int(self.movie_ids[idx]),
+                'confidence': round(confidence, 4),
+                'accepted': confidence >= self.fuzzy_threshold
+            }
+            for idx, confidence in self.title_index.search(title, limit=limit)
+        ]
+    
+    def _hybrid_coefficients(self):
+        """(content, popularity, rating) weights for the loaded hybrid model"""
+        # Handle different weight structures (old vs new model)
+        if 'ensemble' in self.hybrid_weights:
+            # New ultra model
+            return (
+                self.hybrid_weights['ensemble'],
+                self.hybrid_weights['popularity'],
+                self.hybrid_weights['rating']
+            )
+        # Old model
+        return (
+            self.hybrid_weights.get('content', 0.6),
+            self.hybrid_weights.get('popularity', 0.2),
+            self.hybrid_weights.get('rating', 0.2)
+        )
+    
+    def _score_rows(self, movie_indices, model_type='hybrid', exclude=None):
+        """
+        Score every catalog movie against several query movies at once
+        
+        Args:
+            exclude: Optional per-row sequence of catalog index arrays (or None)
+                to mask out, e.g. movies the user has already seen
+        
+        Returns:
+            (content_scores, scores) arrays of shape (len(movie_indices), n_movies);
+            each query movie's own column in `scores` is set to -1 and excluded
+            columns to -inf
+        """
+        movie_indices = np.asarray(movie_indices, dtype=np.intp)
+        content_scores = np.asarray(self.similarity_matrix[movie_indices])
+        
+        if model_type == 'hybrid':
+            w_content, w_popularity, w_rating = self._hybrid_coefficients()
+            scores = (
+                w_content * content_scores +
+                w_popularity * self.popularity_scaled +
+                w_rating * self.rating_scaled
+            )
+        else:
+            scores = content_scores.copy()
+        
+        # Exclude the movie itself
+        scores[np.arange(len(movie_indices)), movie_indices] = -1
+        if exclude is not None:
+            for row, seen in enumerate(exclude):
+                if seen is not None and len(seen):
+                    scores[row, seen] = -np.inf
+        return content_scores, scores
+    
+    @staticmethod
+    def _top_n(scores, n):
+        """Column indices of the n highest scores in each row, best first"""
+        n = min(n, scores.shape[1])
+        if n <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.intp)
+        candidates = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(candidates, order, axis=1)
+    
+    def _movie_entry(self, idx):
+        """Catalog fields shared by every recommendation payload"""
+        movie_id = int(self.movie_ids[idx])
+        return {
+            'title': self.movie_titles[idx],
+            'movie_id': movie_id,
+            'year': int(self.catalog['release_year'][idx]) if 'release_year' in self.catalog else '',
+            'overview': self.catalog['overview'][idx] if 'overview' in self.catalog else '',
+            'poster_url': f'https://img.omdbapi.com/?i=tt{movie_id}&apikey=placeholder'
+        }
+    
+    def top_n_arrays(self, movie_indices, model_type='hybrid', n_recommendations=10, exclude=None):
+        """
+        Ranked catalog indices and scores for several query movies, as arrays
+        
+        Args:
+            movie_indices: Catalog indices of the query movies
+            model_type: 'content_based' or 'hybrid'
+            n_recommendations: Number of recommendations per query movie
+            exclude: Optional per-row catalog index arrays to mask out
+        
+        Returns:
+            (indices, scores, content_scores), each of shape
+            (len(movie_indices), min(n_recommendations, n_movies)), best first
+        """
+        if self.shard_router is not None:
+            return self.shard_router.top_n(
+                movie_indices,
+                self._hybrid_coefficients() if model_type == 'hybrid' else None,
+                n_recommendations,
+                exclude
+            )
+        content_scores, scores = self._score_rows(movie_indices, model_type, exclude)
+        top_indices = self._top_n(scores, n_recommendations)
+        return (
+            top_indices,
+            np.take_along_axis(scores, top_indices, axis=1),
+            np.take_along_axis(content_scores, top_indices, axis=1)
+        )
+    
+    def similarity_block(self, indices):
+        """Pairwise content similarity of a set of movies, gathered in one fancy-index"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if self.shard_router is not None:
+            return self.shard_router.similarity_block(indices, indices)
+        matrix = self.similarity_matrix
+        if matrix.flags['C_CONTIGUOUS']:
+            # Flat take is ~1.5x faster than np.ix_ for a 200x200 block
+            return np.take(matrix.reshape(-1), indices[:, np.newaxis] * matrix.shape[1] + indices)
+        return np.asarray(matrix[np.ix_(indices, indices)])
+    
+    @staticmethod
+    def _mmr_order(block, relevance, n, diversity):
+        """
+        Greedy maximal-marginal-relevance order over one candidate set
+        
+        Each step picks the candidate maximizing
+        (1 - diversity) * relevance - diversity * (max similarity to those already picked),
+        updating the running max with one vectorized row of `block`.
+        
+        Returns:
+            Positions into the candidate set, best first; candidates with
+            non-finite relevance (masked) only fill the tail if too few remain
+        """
+        n = min(n, len(relevance))
+        valid = np.isfinite(relevance)
+        gain = np.where(valid, (1.0 - diversity) * relevance, -np.inf)
+        redundancy = np.zeros(len(relevance))
+        order = np.empty(n, dtype=np.intp)
+        for step in range(n):
+            mmr = gain - diversity * redundancy
+            pick = int(np.argmax(mmr))
+            if mmr[pick] == -np.inf:
+                taken = np.zeros(len(relevance), dtype=bool)
+                taken[order[:step]] = True
+                order[step:] = np.flatnonzero(~taken)[:n - step]
+                break
+            order[step] = pick
+            gain[pick] = -np.inf
+            np.maximum(redundancy, block[pick], out=redundancy)
+        return order
+    
+    def _rerank_mmr(self, candidates, scores, content_scores, n, diversity):
+        """Apply _mmr_order row by row to top_n_arrays output"""
+        order = np.stack([
+            self._mmr_order(self.similarity_block(candidates[row]), scores[row], n, diversity)
+            for row in range(len(candidates))
+        ])
+        return (
+            np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(scores, order, axis=1),
+            np.take_along_axis(content_scores, order, axis=1)
+        )
+    
+    def recommend_indices(self, movie_indices, model_type='hybrid', n_recommendations=10, exclude=None,
+                          diversity=0.0, n_candidates=200):
+        """
+        Vectorized recommendations for already-resolved query movies
+        
+        Args:
+            movie_indices: Catalog indices of the query movies
+            model_type: 'content_based' or 'hybrid'
+            n_recommendations: Number of recommendations per query movie
+            exclude: Optional per-row catalog index arrays never to recommend;
+                they are masked before the top-N selection, so each row still
+                gets n_recommendations results while enough movies remain
+            diversity: MMR trade-off in [0, 1); 0 keeps the plain ranking, higher
+                values demote candidates similar to ones already picked
+            n_candidates: Top candidates re-ranked when diversity is on
+        
+        Returns:
+            List of result dicts (without 'query_movie'), one per index
+        """
+        if len(movie_indices) == 0:
+            return []
+        
+        if diversity:
+            candidates = self.top_n_arrays(
+                movie_indices, model_type, max(n_candidates, n_recommendations), exclude
+            )
+            # The query movie scores -1, which MMR could still pick ahead of redundant
+            # candidates; mask it like an exclusion so it lands in the skipped tail
+            cand_indices, cand_scores, cand_content = candidates
+            cand_scores = np.where(
+                cand_indices == np.asarray(movie_indices)[:, np.newaxis], -np.inf, cand_scores
+            )
+            top_indices, top_scores, top_content = self._rerank_mmr(
+                cand_indices, cand_scores, cand_content, n_recommendations, diversity
+            )
+        else:
+            top_indices, top_scores, top_content = self.top_n_arrays(
+                movie_indices, model_type, n_recommendations, exclude
+            )
+        
+        ratings = self.catalog['vote_average']
+        popularity = self.catalog['popularity']
+        genres = self.catalog['genres_list']
+        
+        results = []
+        for row, movie_idx in enumerate(movie_indices):
+            recommendations = []
+            for idx, score, content_score in zip(top_indices[row], top_scores[row], top_content[row]):
+                if score == -np.inf:
+                    # Fewer unseen movies left than requested
+                    break
+                if idx == movie_idx:
+                    continue
+                entry = self._movie_entry(idx)
+                if model_type == 'hybrid':
+                    entry['hybrid_score'] = float(score)
+                    entry['content_similarity'] = float(content_score)
+                else:
+                    entry['similarity_score'] = float(content_score)
+                entry['rating'] = float(ratings[idx])
+                entry['popularity'] = float(popularity[idx])
+                entry['genres'] = genres[idx]
+                recommendations.append(entry)
+            
+            result = {
+                'matched_title': self.movie_titles[movie_idx],
+                'recommendations': recommendations
+            }
+            if model_type == 'hybrid':
+                result['model_type'] = 'lightweight_hybrid'
+                result['weights'] = self.hybrid_weights
+            else:
+                result['model_type'] = 'content_based'
+            if exclude is not None and exclude[row] is not None:
+                result['excluded_seen'] = len(exclude[row])
+            if diversity:
+                result['diversity'] = {'lambda': diversity, 'candidates': candidates[0].shape[1]}
+            results.append(result)
+        
+        return results
+    
+    def recommend_content_based(self, movie_title, n_recommendations=10, exclude=None, diversity=0.0,
+                                n_candidates=200):
         """
         Get recommendations using content-based filtering
         
         Args:
             movie_title: Name of the movie to get recommendations for
             n_recommendations: Number of recommendations to return
+            exclude: Optional catalog indices to leave out (e.g. already seen)
+            diversity: Optional MMR re-ranking strength in [0, 1) (see recommend_hybrid)
+            n_candidates: Candidates considered by the re-ranking
         
         Returns:
             List of (movie_title, similarity_score, rating) tuples
@@ -124,42 +874,14 @@ class MovieRecommender:
         if movie_idx is None:
             return {"error": f"Movie '{movie_title}' not found"}
         
-        # Get similarity scores
-        scores = self.similarity_matrix[movie_idx]
-        
-        # Exclude the movie itself
-        scores_copy = scores.copy()
-        scores_copy[movie_idx] = -1
-        
-        # Get top N recommendations
-        top_indices = np.argsort(scores_copy)[::-1][:n_recommendations]
-        
-        recommendations = []
-        for idx in top_indices:
-            movie_id = int(self.train_df.iloc[idx]['movie_id'])
-            title = self.movie_titles[idx]
-            year = int(self.train_df.iloc[idx]['release_year']) if 'release_year' in self.train_df.columns else ''
-            overview = self.train_df.iloc[idx]['overview'] if 'overview' in self.train_df.columns else ''
-            
-            recommendations.append({
-                'title': title,
-                'movie_id': movie_id,
-                'year': year,
-                'overview': overview,
-                'poster_url': f'https://img.omdbapi.com/?i=tt{movie_id}&apikey=placeholder',
-                'similarity_score': float(scores[idx]),
-                'rating': float(self.train_df.iloc[idx]['vote_average']),
-                'popularity': float(self.train_df.iloc[idx]['popularity']),
-                'genres': self.train_df.iloc[idx]['genres_list']
-            })
-        
-        return {
-            'query_movie': movie_title,
-            'recommendations': recommendations,
-            'model_type': 'content_based'
-        }
+        result = self.recommend_indices(
+            [movie_idx], 'content_based', n_recommendations,
+            exclude=None if exclude is None else [exclude],
+            diversity=diversity, n_candidates=n_candidates
+        )[0]
+        return {'query_movie': movie_title, **result}
     
-    def recommend_hybrid(self, movie_title, n_recommendations=10):
+    def recommend_hybrid(self, movie_title, n_recommendations=10, exclude=None, diversity=0.0, n_candidates=200):
         """
         Get recommendations using lightweight hybrid model
         Combines content similarity with popularity and rating boost
@@ -167,6 +889,10 @@ class MovieRecommender:
         Args:
             movie_title: Name of the movie to get recommendations for
             n_recommendations: Number of recommendations to return
+            exclude: Optional catalog indices to leave out (e.g. already seen)
+            diversity: Optional MMR re-ranking strength in [0, 1) over the top
+                `n_candidates` hybrid results (e.g. 0.3 breaks up runs of sequels)
+            n_candidates: Candidates considered by the re-ranking
         
         Returns:
             List of recommendations with hybrid scores
@@ -176,95 +902,179 @@ class MovieRecommender:
         if movie_idx is None:
             return {"error": f"Movie '{movie_title}' not found"}
         
-        # Get content similarity
-        content_scores = self.similarity_matrix[movie_idx]
+        result = self.recommend_indices(
+            [movie_idx], 'hybrid', n_recommendations,
+            exclude=None if exclude is None else [exclude],
+            diversity=diversity, n_candidates=n_candidates
+        )[0]
+        return {'query_movie': movie_title, **result}
+    
+    def batch_recommend(self, movie_titles, model_type='hybrid', n_recommendations=5,
+                        deadline=None, chunk_size=16, exclude=None):
+        """
+        Get recommendations for multiple movies
         
-        # Handle different weight structures (old vs new model)
-        if 'ensemble' in self.hybrid_weights:
-            # New ultra model
-            hybrid_scores = (
-                self.hybrid_weights['ensemble'] * content_scores +
-                self.hybrid_weights['popularity'] * self.popularity_scaled +
-                self.hybrid_weights['rating'] * self.rating_scaled
-            )
-        else:
-            # Old model
-            hybrid_scores = (
-                self.hybrid_weights.get('content', 0.6) * content_scores +
-                self.hybrid_weights.get('popularity', 0.2) * self.popularity_scaled +
-                self.hybrid_weights.get('rating', 0.2) * self.rating_scaled
+        Args:
+            movie_titles: List of movie titles
+            model_type: 'content_based' or 'hybrid'
+            n_recommendations: Number of recommendations per movie
+            deadline: Optional admission.Deadline, checked between titles while
+                resolving and between scoring chunks
+            chunk_size: Titles scored per vectorized call when a deadline is set
+            exclude: Optional catalog indices left out of every title's results
+        
+        Returns:
+            Dictionary with recommendations for each movie. Titles not reached
+            before the deadline are left out.
+        """
+        if model_type != 'hybrid':
+            model_type = 'content_based'
+        
+        results = {}
+        resolved = {}
+        for movie_title in movie_titles:
+            if deadline is not None and deadline.expired():
+                break
+            movie_idx = self.get_movie_by_title(movie_title)
+            if movie_idx is None:
+                results[movie_title] = {"error": f"Movie '{movie_title}' not found"}
+            else:
+                resolved[movie_title] = movie_idx
+        
+        # Score resolved titles in vectorized passes (one pass without a deadline)
+        titles = list(resolved)
+        step = chunk_size if deadline is not None else max(len(titles), 1)
+        for start in range(0, len(titles), step):
+            if deadline is not None and deadline.expired():
+                break
+            chunk = titles[start:start + step]
+            batch = self.recommend_indices(
+                [resolved[t] for t in chunk], model_type, n_recommendations,
+                exclude=None if exclude is None else [exclude] * len(chunk)
             )
+            for movie_title, result in zip(chunk, batch):
+                results[movie_title] = {'query_movie': movie_title, **result}
         
-        # Exclude the movie itself
-        hybrid_scores[movie_idx] = -1
+        return {movie_title: results[movie_title] for movie_title in movie_titles if movie_title in results}
+    
+    def iter_recommendation_arrays(self, movie_indices, model_type='hybrid', n_recommendations=10, chunk_size=256):
+        """
+        (seed_id, rec_id, score) columns for many query movies, chunk by chunk
         
-        # Get top N recommendations
-        top_indices = np.argsort(hybrid_scores)[::-1][:n_recommendations]
+        Built straight from the scoring arrays with no per-item dicts, for bulk
+        consumers that only need the triples.
         
-        recommendations = []
-        for idx in top_indices:
-            movie_id = int(self.train_df.iloc[idx]['movie_id'])
-            title = self.movie_titles[idx]
-            year = int(self.train_df.iloc[idx]['release_year']) if 'release_year' in self.train_df.columns else ''
-            overview = self.train_df.iloc[idx]['overview'] if 'overview' in self.train_df.columns else ''
-            
-            recommendations.append({
-                'title': title,
-                'movie_id': movie_id,
-                'year': year,
-                'overview': overview,
-                'poster_url': f'https://img.omdbapi.com/?i=tt{movie_id}&apikey=placeholder',
-                'hybrid_score': float(hybrid_scores[idx]),
-                'content_similarity': float(content_scores[idx]),
-                'rating': float(self.train_df.iloc[idx]['vote_average']),
-                'popularity': float(self.train_df.iloc[idx]['popularity']),
-                'genres': self.train_df.iloc[idx]['genres_list']
-            })
+        Args:
+            movie_indices: Catalog indices of the query movies
+            model_type: 'content_based' or 'hybrid' (score is the hybrid score
+                or the content similarity accordingly)
+            n_recommendations: Recommendations per query movie; capped at
+                n_movies - 1 so every chunk has exactly that many rows per seed
+            chunk_size: Query movies scored per step
         
-        return {
-            'query_movie': movie_title,
-            'recommendations': recommendations,
-            'model_type': 'lightweight_hybrid',
-            'weights': self.hybrid_weights
-        }
+        Yields:
+            (seed_ids int64, rec_ids int64, scores float32) flat arrays; a seed
+            is never its own recommendation, and with no exclusions and at most
+            n_movies - 1 rows per seed every score is finite
+        """
+        n = min(n_recommendations, self.n_movies - 1)
+        movie_ids = np.asarray(self.movie_ids, dtype=np.int64)
+        movie_indices = np.asarray(movie_indices, dtype=np.intp)
+        for start in range(0, len(movie_indices), chunk_size):
+            chunk = movie_indices[start:start + chunk_size]
+            # One extra candidate per seed: drop the seed itself where it made the
+            # list, else the extra one, so every seed keeps exactly n rows
+            top_indices, top_scores, _ = self.top_n_arrays(chunk, model_type, n + 1)
+            is_seed = top_indices == chunk[:, np.newaxis]
+            drop = np.where(is_seed.any(axis=1), is_seed.argmax(axis=1), top_indices.shape[1] - 1)
+            keep = np.ones(top_indices.shape, dtype=bool)
+            keep[np.arange(len(chunk)), drop] = False
+            yield (
+                np.repeat(movie_ids[chunk], n),
+                movie_ids[top_indices[keep]],
+                top_scores[keep].astype(np.float32)
+            )
     
-    def batch_recommend(self, movie_titles, model_type='hybrid', n_recommendations=5):
+    def recommend_by_text(self, query, n_recommendations=10, model_type='hybrid', exclude=None):
         """
-        Get recommendations for multiple movies
+        Recommend movies whose overview matches a free-text description
+        
+        Only the TF-IDF postings of the query terms are read; the dense
+        similarity matrix is not used, so the query need not be a catalog title.
         
         Args:
-            movie_titles: List of movie titles
-            model_type: 'content_based' or 'hybrid'
-            n_recommendations: Number of recommendations per movie
+            query: Overview, plot description or keywords
+            n_recommendations: Number of recommendations to return
+            model_type: 'content_based' (text similarity only) or 'hybrid'
+                (text similarity blended with popularity and rating)
+            exclude: Optional sorted catalog indices to leave out (e.g. already seen)
         
         Returns:
-            Dictionary with recommendations for each movie
+            Dictionary with recommendations, or {"error": ...}
         """
-        results = {}
+        if self.text_index is None:
+            return {"error": "Text index not available (re-run the serving export)"}
         
-        for movie_title in movie_titles:
+        doc_ids, text_scores = self.text_index.score(query)
+        if len(doc_ids) == 0:
+            return {"error": f"No catalog overview shares a term with '{query}'"}
+        
+        if model_type == 'hybrid':
+            w_content, w_popularity, w_rating = self._hybrid_coefficients()
+            scores = (
+                w_content * text_scores +
+                w_popularity * np.asarray(self.popularity_scaled)[doc_ids] +
+                w_rating * np.asarray(self.rating_scaled)[doc_ids]
+            )
+        else:
+            model_type = 'content_based'
+            scores = text_scores.copy()
+        
+        if exclude is not None and len(exclude):
+            # Candidates are few (only docs sharing a term), so test them against the sorted exclusions
+            pos = np.minimum(np.searchsorted(exclude, doc_ids), len(exclude) - 1)
+            scores[exclude[pos] == doc_ids] = -np.inf
+        
+        top = self._top_n(scores[np.newaxis, :], n_recommendations)[0]
+        
+        recommendations = []
+        for pos in top:
+            if scores[pos] == -np.inf:
+                break
+            idx = doc_ids[pos]
+            entry = self._movie_entry(idx)
             if model_type == 'hybrid':
-                results[movie_title] = self.recommend_hybrid(
-                    movie_title, n_recommendations
-                )
-            else:
-                results[movie_title] = self.recommend_content_based(
-                    movie_title, n_recommendations
-                )
+                entry['hybrid_score'] = float(scores[pos])
+            entry['text_similarity'] = float(text_scores[pos])
+            entry['rating'] = float(self.catalog['vote_average'][idx])
+            entry['popularity'] = float(self.catalog['popularity'][idx])
+            entry['genres'] = self.catalog['genres_list'][idx]
+            recommendations.append(entry)
         
-        return results
+        result = {
+            'query_text': query,
+            'matched_terms': self.text_index.matched_terms(query)[:20],
+            'candidates': len(doc_ids),
+            'model_type': 'text_hybrid' if model_type == 'hybrid' else 'text_content_based',
+            'recommendations': recommendations
+        }
+        if exclude is not None:
+            result['excluded_seen'] = len(exclude)
+        return result
     
     def get_all_genres(self):
         """Get list of all unique genres"""
-        genres = set()
-        for genres_list in self.train_df['genres_list']:
-            if isinstance(genres_list, list):
-                for g in genres_list:
-                    if isinstance(g, dict) and 'name' in g:
-                        genres.add(g['name'])
-        return sorted(list(genres))
+        return sorted(self.genre_index)
+    
+    def get_catalog_stats(self):
+        """Catalog-level numbers for the /stats endpoint"""
+        return {
+            'total_movies': self.n_movies,
+            'available_genres': len(self.genre_index),
+            'avg_rating': float(np.nanmean(self.catalog['vote_average']))
+        }
     
-    def recommend_by_genre(self, genre, n_recommendations=20, sort_by='rating'):
+    def recommend_by_genre(self, genre, n_recommendations=20, sort_by='rating', deadline=None):
         """
         Get top movies by genre
         
@@ -272,63 +1082,58 @@ class MovieRecommender:
             genre: Genre name (e.g., 'Action', 'Comedy')
             n_recommendations: Number of movies to return
             sort_by: 'rating', 'popularity', or 'recent'
+            deadline: Optional admission.Deadline; once it expires the movies
+                built so far are returned with 'partial': True
         
         Returns:
             Dictionary with genre recommendations
         """
-        # Filter movies by genre
-        genre_movies = []
+        # Catalog positions of the genre's movies, prebuilt at load time
+        genre_movies = self.genre_index.get(genre)
         
-        for idx, row in self.train_df.iterrows():
-            genres_list = row['genres_list']
-            if isinstance(genres_list, list):
-                genre_names = [g['name'] if isinstance(g, dict) else g for g in genres_list]
-                if genre in genre_names:
-                    genre_movies.append(idx)
-        
-        if not genre_movies:
+        if genre_movies is None or len(genre_movies) == 0:
             return {'error': f'No movies found for genre: {genre}'}
         
-        # Create DataFrame of genre movies
-        genre_df = self.train_df.iloc[genre_movies].copy()
-        
         # Sort based on criteria
+        selected = genre_movies
         if sort_by == 'rating':
             # Sort by rating, but require minimum vote count
-            genre_df = genre_df[genre_df['vote_count'] >= 50]
-            genre_df = genre_df.sort_values('vote_average', ascending=False)
+            selected = selected[self.catalog['vote_count'][selected] >= 50]
+            selected = selected[np.argsort(-self.catalog['vote_average'][selected], kind='stable')]
         elif sort_by == 'popularity':
-            genre_df = genre_df.sort_values('popularity', ascending=False)
+            selected = selected[np.argsort(-self.catalog['popularity'][selected], kind='stable')]
         elif sort_by == 'recent':
-            if 'release_year' in genre_df.columns:
-                genre_df = genre_df.sort_values('release_year', ascending=False)
+            if 'release_year' in self.catalog:
+                selected = selected[np.argsort(-self.catalog['release_year'][selected], kind='stable')]
         
         # Get top N
-        top_movies = genre_df.head(n_recommendations)
+        top_movies = selected[:n_recommendations]
         
         recommendations = []
-        for idx, row in top_movies.iterrows():
-            movie_id = int(row['movie_id'])
-            title = row['title']
-            year = int(row['release_year']) if 'release_year' in row else ''
-            overview = row['overview'] if 'overview' in row else ''
-            
+        partial = False
+        for idx in top_movies:
+            if deadline is not None and deadline.expired():
+                partial = True
+                break
             recommendations.append({
-                'title': title,
-                'movie_id': movie_id,
-                'year': year,
-                'overview': overview,
-                'rating': float(row['vote_average']),
-                'popularity': float(row['popularity']),
-                'genres': row['genres_list']
+                'title': self.movie_titles[idx],
+                'movie_id': int(self.movie_ids[idx]),
+                'year': int(self.catalog['release_year'][idx]) if 'release_year' in self.catalog else '',
+                'overview': self.catalog['overview'][idx] if 'overview' in self.catalog else '',
+                'rating': float(self.catalog['vote_average'][idx]),
+                'popularity': float(self.catalog['popularity'][idx]),
+                'genres': self.catalog['genres_list'][idx]
             })
         
-        return {
+        result = {
             'genre': genre,
             'recommendations': recommendations,
             'total_found': len(genre_movies),
             'sort_by': sort_by
         }
+        if partial:
+            result['partial'] = True
+        return result
     
     def get_movie_info(self, movie_title):
         """Get detailed information about a movie"""
@@ -337,7 +1142,7 @@ class MovieRecommender:
         if movie_idx is None:
             return {"error": f"Movie '{movie_title}' not found"}
         
-        movie = self.train_df.iloc[movie_idx]
+        movie = {column: values[movie_idx] for column, values in self.catalog.items()}
         
         # Extract genre names
         genres = []
@@ -359,17 +1164,58 @@ class MovieRecommender:
     def search_movies(self, query, limit=10):
         """Search for movies by partial title match"""
         query_lower = query.lower()
+        ratings = self.catalog['vote_average']
         matches = []
         
-        for idx, title in enumerate(self.movie_titles):
-            if query_lower in title.lower():
+        for idx, title in enumerate(self.title_index.lower_titles):
+            if query_lower in title:
                 matches.append({
-                    'title': title,
+                    'title': self.movie_titles[idx],
                     'movie_id': int(self.movie_ids[idx]),
-                    'rating': float(self.train_df.iloc[idx]['vote_average'])
+                    'rating': float(ratings[idx])
                 })
         
         return sorted(matches, key=lambda x: x['rating'], reverse=True)[:limit]
+    
+    def get_movies_by_id(self, movie_ids):
+        """
+        Look up basic catalog fields for a list of movie ids
+        
+        Args:
+            movie_ids: List of movie ids; unknown ids are skipped
+        
+        Returns:
+            List of {'movie_id', 'title', 'year'} dicts in request order
+        """
+        has_year = 'release_year' in self.catalog
+        years = self.catalog['release_year'] if has_year else None
+        movies = []
+        for movie_id in movie_ids:
+            idx = self.id_to_index.get(int(movie_id))
+            if idx is None:
+                continue
+            movies.append({
+                'movie_id': int(movie_id),
+                'title': self.movie_titles[idx],
+                'year': int(years[idx]) if has_year else ''
+            })
+        return movies
+    
+    def autocomplete(self, prefix, limit=10):
+        """
+        Complete a partial title with the most popular matching movies
+        
+        Args:
+            prefix: Partial title as typed in the search box
+            limit: Maximum number of completions
+        
+        Returns:
+            List of {'title', 'movie_id'} dicts, most popular first
+        """
+        return [
+            {'title': self.movie_titles[idx], 'movie_id': int(self.movie_ids[idx])}
+            for idx in self.prefix_index.complete(prefix, limit=limit)
+        ]
 
 
 # Example usage and testing
@@ -386,7 +1232,7 @@ if __name__ == "__main__":
     # Get some test movies
     test_movies = recommender.movie_titles[:5]
     
-    print(f"\n[OK] Using {len(recommender.train_df)} movies in database")
+    print(f"\n[OK] Using {recommender.n_movies} movies in database")
     
     # Test 1: Content-based recommendation
     print("\n--- TEST 1: Content-Based Recommendations ---")
@@ -0,0 +1,225 @@
+"""
+Movie Recommendation System - Request Dispatcher
+Single-flight coalescing and micro-batching in front of MovieRecommender
+"""
+
+import asyncio
+import time
+from collections import Counter
+import numpy as np
+
+
+class _Pending:
+    """One scoring job shared by every caller asking for the same (model_type, movie, exclusions, diversity)"""
+
+    __slots__ = ('future', 'n_recommendations', 'exclude', 'diversity')
+
+    def __init__(self, future, n_recommendations, exclude=None, diversity=0.0):
+        self.future = future
+        self.n_recommendations = n_recommendations
+        self.exclude = exclude
+        self.diversity = diversity
+
+
+class RecommendDispatcher:
+    """
+    Merges concurrent recommend calls into vectorized batches
+
+    Identical requests (same resolved movie and model type) that are queued or
+    in flight share one result. Distinct requests arriving within `window_ms`
+    of each other are scored together with MovieRecommender.recommend_indices,
+    up to `max_batch_size` movies per call. Each caller gets its own top-N slice.
+    """
+
+    def __init__(self, recommender, window_ms=2.0, max_batch_size=32):
+        """
+        Args:
+            recommender: Loaded MovieRecommender
+            window_ms: How long the first request in a batch waits for company
+            max_batch_size: Flush immediately once this many movies are queued
+        """
+        self.recommender = recommender
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._queued = {}
+        self._inflight = {}
+        self._precomputed = {}
+        self._timer = None
+
+        self._requests = 0
+        self._precomputed_hits = 0
+        self._coalesced = 0
+        self._batches = 0
+        self._batched_movies = 0
+        self._scoring_seconds = 0.0
+        self._batch_sizes = Counter()
+
+    async def recommend(self, movie_title, n_recommendations=10, model_type='hybrid',
+                        exclude=None, exclude_key=None, diversity=0.0):
+        """
+        Same contract as MovieRecommender.recommend_hybrid / recommend_content_based
+
+        Args:
+            exclude: Optional sorted catalog indices to leave out (a user's seen movies)
+            exclude_key: Hashable identity of `exclude` (e.g. user id and history
+                revision), so identical requests still coalesce; defaults to its bytes
+            diversity: MMR re-ranking strength (0 = plain ranking); diversified
+                results are never served from the precomputed plain ones
+
+        Returns:
+            Result dict, or {"error": ...} if the title cannot be resolved
+        """
+        if model_type != 'hybrid':
+            model_type = 'content_based'
+
+        movie_idx = self.recommender.get_movie_by_title(movie_title)
+        if movie_idx is None:
+            return {"error": f"Movie '{movie_title}' not found"}
+
+        self._requests += 1
+        if exclude is not None and len(exclude) == 0:
+            exclude = None
+        if exclude is None:
+            key = (model_type, movie_idx)
+        else:
+            key = (model_type, movie_idx, exclude_key if exclude_key is not None else exclude.tobytes())
+        if diversity:
+            key += ('mmr', diversity)
+
+        result = self._precomputed.get((model_type, movie_idx)) if not diversity else None
+        if result is not None and exclude is not None:
+            result = self._without_seen(result, exclude)
+        if result is not None and len(result['recommendations']) >= n_recommendations:
+            self._precomputed_hits += 1
+            return self._caller_view(result, movie_title, n_recommendations)
+
+        pending = self._inflight.get(key)
+        if pending is not None and pending.n_recommendations >= n_recommendations:
+            self._coalesced += 1
+        elif key in self._queued:
+            pending = self._queued[key]
+            pending.n_recommendations = max(pending.n_recommendations, n_recommendations)
+            self._coalesced += 1
+        else:
+            pending = _Pending(asyncio.get_running_loop().create_future(), n_recommendations, exclude, diversity)
+            self._queued[key] = pending
+            self._schedule_flush()
+
+        # Shield so one cancelled caller does not cancel the shared job
+        result = await asyncio.shield(pending.future)
+        return self._caller_view(result, movie_title, n_recommendations)
+
+    def _without_seen(self, result, exclude):
+        """A precomputed result with the excluded movies filtered out (it may come up short)"""
+        recommendations = result['recommendations']
+        positions = np.array([self.recommender.id_to_index[r['movie_id']] for r in recommendations], dtype=np.intp)
+        hit = np.minimum(np.searchsorted(exclude, positions), len(exclude) - 1)
+        seen = exclude[hit] == positions
+        return {
+            **result,
+            'recommendations': [r for r, is_seen in zip(recommendations, seen) if not is_seen],
+            'excluded_seen': len(exclude)
+        }
+
+    @staticmethod
+    def _caller_view(result, movie_title, n_recommendations):
+        return {
+            'query_movie': movie_title,
+            **result,
+            'recommendations': result['recommendations'][:n_recommendations]
+        }
+
+    def precompute(self, movie_indices, model_types=('hybrid', 'content_based'), n_recommendations=50):
+        """
+        Score movies ahead of time and serve them without queueing (startup warm-up)
+
+        Args:
+            movie_indices: Catalog indices to precompute, e.g. the most popular titles
+            model_types: Model types to precompute for each movie
+            n_recommendations: Depth stored; requests asking for more are scored normally
+
+        Returns:
+            Number of (model_type, movie) results stored
+        """
+        for model_type in model_types:
+            for start in range(0, len(movie_indices), self.max_batch_size):
+                chunk = movie_indices[start:start + self.max_batch_size]
+                results = self.recommender.recommend_indices(chunk, model_type, n_recommendations)
+                for movie_idx, result in zip(chunk, results):
+                    self._precomputed[(model_type, movie_idx)] = result
+        return len(self._precomputed)
+
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        if len(self._queued) >= self.max_batch_size:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        if not self._queued:
+            return
+
+        keys = list(self._queued)[:self.max_batch_size]
+        batch = {key: self._queued.pop(key) for key in keys}
+        self._inflight.update(batch)
+        asyncio.ensure_future(self._run_batch(batch))
+
+        if self._queued:
+            self._timer = asyncio.get_running_loop().call_later(0, self._flush)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        self._batches += 1
+        self._batched_movies += len(batch)
+        self._batch_sizes[len(batch)] += 1
+
+        by_model = {}
+        for (model_type, movie_idx, *_), pending in batch.items():
+            by_model.setdefault((model_type, pending.diversity), []).append((movie_idx, pending))
+
+        start = time.perf_counter()
+        try:
+            for (model_type, diversity), items in by_model.items():
+                indices = [movie_idx for movie_idx, _ in items]
+                n_max = max(pending.n_recommendations for _, pending in items)
+                exclude = [pending.exclude for _, pending in items]
+                if all(seen is None for seen in exclude):
+                    exclude = None
+                results = await loop.run_in_executor(
+                    None, self.recommender.recommend_indices, indices, model_type, n_max, exclude, diversity
+                )
+                for (_, pending), result in zip(items, results):
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+        except Exception as e:
+            for pending in batch.values():
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            self._scoring_seconds += time.perf_counter() - start
+            for key, pending in batch.items():
+                if self._inflight.get(key) is pending:
+                    del self._inflight[key]
+
+    def metrics(self):
+        """Counters and batch-size distribution since startup"""
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_batch_size': self.max_batch_size,
+            'requests': self._requests,
+            'precomputed': len(self._precomputed),
+            'precomputed_hits': self._precomputed_hits,
+            'coalesced': self._coalesced,
+            'batches': self._batches,
+            'mean_batch_size': self._batched_movies / self._batches if self._batches else 0.0,
+            'batch_size_histogram': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            'scoring_ms_total': self._scoring_seconds * 1000.0,
+            'queued': len(self._queued),
+            'inflight': len(self._inflight)
+        }
@@ -0,0 +1,151 @@
+"""
+Movie Recommendation System - Request Profiler
+Opt-in cProfile capture of individual requests, kept as downloadable artifacts
+"""
+
+import cProfile
+import contextvars
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+from collections import OrderedDict
+
+
+# The cProfile.Profile of the request being profiled, None elsewhere
+_profiling = contextvars.ContextVar('profiling_request', default=None)
+
+
+def is_profiling():
+    """True inside a request that is being profiled"""
+    return _profiling.get() is not None
+
+
+def profiled(func, *args, **kwargs):
+    """
+    Call func, recording it in the request's profile if the request is profiled
+
+    The profiler is only enabled for the duration of this synchronous call.
+    While it runs the event loop is blocked, so nothing but this request's own
+    work ends up in the profile.
+    """
+    profile = _profiling.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+
+
+class RequestProfiler:
+    """
+    Profiles selected requests with cProfile
+
+    A request is profiled when it asks for it explicitly or when it is the Nth
+    eligible request under sampling. Only the synchronous calls the handler
+    makes through profiled() are recorded, not the request as a whole: across
+    an await cProfile would also record every other coroutine the event loop
+    runs meanwhile. Work that would normally go to a worker thread should run
+    inline through profiled() while is_profiling() is true (cProfile only sees
+    its own thread). Response bodies streamed after the handler returns are
+    not covered. Only one request is profiled at a time; others run unprofiled
+    rather than wait.
+    """
+
+    def __init__(self, sample_every=0, max_stored=50, top_n=40):
+        """
+        Args:
+            sample_every: Profile one in this many eligible requests (0 disables sampling)
+            max_stored: Profiles kept in memory; the oldest are dropped first
+            top_n: Functions listed in the text summary
+        """
+        self.sample_every = sample_every
+        self.max_stored = max_stored
+        self.top_n = top_n
+
+        self.profiles = OrderedDict()
+        self._ids = itertools.count(1)
+        self._seen = 0
+        self._busy = threading.Lock()
+        self.stats = {'explicit': 0, 'sampled': 0, 'skipped_busy': 0}
+
+    def sample(self):
+        """Whether the next eligible request falls on the sampling interval"""
+        if not self.sample_every:
+            return False
+        self._seen += 1
+        return self._seen % self.sample_every == 0
+
+    async def run(self, call_next, request, reason):
+        """
+        Call the rest of the app with profiling enabled for its profiled() calls
+
+        Returns:
+            (response, profile_id); profile_id is None if another profile was running
+        """
+        if not self._busy.acquire(blocking=False):
+            self.stats['skipped_busy'] += 1
+            return await call_next(request), None
+
+        profile = cProfile.Profile()
+        token = _profiling.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _profiling.reset(token)
+            self._busy.release()
+
+        duration_ms = (time.perf_counter() - start) * 1000.0
+        self.stats[reason] += 1
+        profile_id = self._store(profile, request, response.status_code, reason, duration_ms)
+        return response, profile_id
+
+    def _store(self, profile, request, status_code, reason, duration_ms):
+        summary = io.StringIO()
+        profile.create_stats()
+        if profile.stats:
+            stats = pstats.Stats(profile, stream=summary)
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            raw_stats = stats.stats
+        else:
+            summary.write("No profiled work: this endpoint makes no recommender calls through profiled()\n")
+            raw_stats = {}
+
+        profile_id = str(next(self._ids))
+        self.profiles[profile_id] = {
+            'meta': {
+                'id': profile_id,
+                'method': request.method,
+                'path': request.url.path,
+                'query': str(request.url.query),
+                'status_code': status_code,
+                'reason': reason,
+                'duration_ms': round(duration_ms, 3),
+                'captured_at': time.time()
+            },
+            'text': summary.getvalue().lstrip('\n'),
+            # Same format as pstats.dump_stats, loadable with pstats.Stats(path)
+            'pstats': marshal.dumps(raw_stats)
+        }
+        while len(self.profiles) > self.max_stored:
+            self.profiles.popitem(last=False)
+        return profile_id
+
+    def list(self):
+        """Metadata of the stored profiles, newest first"""
+        return [entry['meta'] for entry in reversed(self.profiles.values())]
+
+    def get(self, profile_id):
+        return self.profiles.get(profile_id)
+
+    def metrics(self):
+        return {
+            'sample_every': self.sample_every,
+            'stored': len(self.profiles),
+            **self.stats
+        }
@@ -0,0 +1,214 @@
+"""
+Serving Mode Report
+Exports lean serving artifacts and compares import time / RSS of full vs lean mode
+(and sharded mode, when shards have been exported)
+
+Usage:
+    python scripts/serving_report.py export [--models-dir results] [--float32] [--variants svd,w2v]
+    python scripts/serving_report.py compare [--models-dir results] [--json out.json]
+    python scripts/serving_report.py recall [--models-dir results] [--k 10] [--queries 200] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
+
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'pyarrow')
+
+# Runs in a fresh interpreter per mode so imports and RSS are not shared
+PROBE = r'''
+import json, resource, sys, time
+sys.path.insert(0, {scripts!r})
+t0 = time.perf_counter()
+from movie_recommender import MovieRecommender
+t1 = time.perf_counter()
+recommender = MovieRecommender(models_dir={models_dir!r}, serving_mode={mode!r})
+t2 = time.perf_counter()
+recommender.recommend_hybrid(recommender.movie_titles[0], 10)
+t3 = time.perf_counter()
+
+def read_status(pid='self'):
+    status = {{}}
+    try:
+        with open(f'/proc/{{pid}}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile', 'VmHWM'):
+                    status[key] = int(value.split()[0]) / 1024.0
+    except OSError:
+        pass
+    return status
+
+status = read_status()
+# Sharded mode keeps the similarity matrix in shard processes; count them separately
+router = recommender.shard_router
+shard_rss = [read_status(p.pid).get('VmRSS', 0.0) for p in router.processes] if router is not None else []
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_mb = peak / 1024.0 if sys.platform != 'darwin' else peak / (1024.0 * 1024.0)
+
+print(json.dumps({{
+    'mode': {mode!r},
+    'import_s': t1 - t0,
+    'load_s': t2 - t1,
+    'first_query_ms': (t3 - t2) * 1000.0,
+    'rss_mb': status.get('VmRSS'),
+    'rss_private_mb': status.get('RssAnon'),
+    'rss_file_backed_mb': status.get('RssFile'),
+    'peak_rss_mb': status.get('VmHWM', peak_mb),
+    'shard_rss_mb': sum(shard_rss) if shard_rss else None,
+    'n_movies': recommender.n_movies,
+    'heavy_modules_loaded': [m for m in {heavy!r} if m in sys.modules],
+    'model_version': recommender.model_version
+}}))
+'''
+
+
+def export(models_dir, float32=False, variants=()):
+    """Load the pickles once (full mode) and write <models_dir>/serving"""
+    from movie_recommender import MovieRecommender
+
+    recommender = MovieRecommender(models_dir=models_dir, serving_mode='full')
+    loaded = [recommender.load_variant(name) for name in variants]
+    out_dir = recommender.export_serving_artifacts(float32=float32, variants=loaded)
+    print(f"[OK] Exported lean serving artifacts to {out_dir}")
+    return out_dir
+
+
+def probe(models_dir, mode):
+    """Measure one serving mode in a subprocess"""
+    code = PROBE.format(scripts=str(script_dir), models_dir=models_dir, mode=mode, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} mode probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(models_dir, json_path=None):
+    """Print (and optionally save) the full vs lean (vs sharded) comparison"""
+    modes = ['full', 'lean']
+    if os.path.exists(os.path.join(models_dir, 'serving', 'shards', 'manifest.json')):
+        modes.append('sharded')
+    rows = [probe(models_dir, mode) for mode in modes]
+
+    def fmt(value, spec):
+        return format(value, spec) if isinstance(value, (int, float)) else 'n/a'
+
+    print("=" * 80)
+    print("SERVING MODE REPORT")
+    print("=" * 80)
+    print(f"{'':<24}" + "".join(f"{row['mode']:>14}" for row in rows))
+    for label, key, spec in [
+        ('import time (s)', 'import_s', '.3f'),
+        ('model load (s)', 'load_s', '.3f'),
+        ('first query (ms)', 'first_query_ms', '.2f'),
+        ('RSS (MB)', 'rss_mb', '.1f'),
+        ('  private (MB)', 'rss_private_mb', '.1f'),
+        ('  file-backed (MB)', 'rss_file_backed_mb', '.1f'),
+        ('peak RSS (MB)', 'peak_rss_mb', '.1f'),
+        ('shard processes (MB)', 'shard_rss_mb', '.1f'),
+    ]:
+        print(f"{label:<24}" + "".join(f"{fmt(row[key], spec):>14}" for row in rows))
+    print(f"{'heavy modules':<24}" + "".join(f"{','.join(row['heavy_modules_loaded']) or '-':>14}" for row in rows))
+
+    if any(row['model_version'] != rows[0]['model_version'] for row in rows[1:]):
+        print("\n⚠ Lean artifacts are from a different model version; re-run export")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'models_dir': models_dir, 'modes': rows}, f, indent=2)
+        print(f"\n✓ Saved: {json_path}")
+    return rows
+
+
+def _query_latencies(recommender, seeds, k):
+    """Per-query top-k latency in ms, one query movie at a time"""
+    recommender.top_n_arrays(seeds[:1], 'hybrid', k)
+    latencies = []
+    for idx in seeds:
+        start = time.perf_counter()
+        recommender.top_n_arrays([idx], 'hybrid', k)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies)
+
+
+def recall(models_dir, k=10, n_queries=200, json_path=None):
+    """
+    Recall@k and latency of the approximate serving modes against exact full mode
+
+    The exact reference is the float64 pickled model. Lean mode is measured as
+    exported, plus a float32 export written to a temporary directory, and
+    sharded mode when shards have been exported.
+    """
+    from movie_recommender import MovieRecommender
+
+    exact = MovieRecommender(models_dir=models_dir, serving_mode='full')
+    rng = np.random.default_rng(0)
+    seeds = rng.choice(exact.n_movies, size=min(n_queries, exact.n_movies), replace=False)
+    reference = exact.top_n_arrays(seeds, 'hybrid', k)[0]
+
+    def measure(mode, recommender):
+        found = recommender.top_n_arrays(seeds, 'hybrid', k)[0]
+        hits = [len(np.intersect1d(a, b)) for a, b in zip(found, reference)]
+        p50, p95, p99 = np.percentile(_query_latencies(recommender, seeds, k), [50, 95, 99])
+        similarity = recommender.similarity_matrix
+        return {
+            'mode': mode,
+            'dtype': str(similarity.dtype) if similarity is not None else recommender.shard_router.manifest.get('similarity_dtype'),
+            'recall_at_k': float(np.sum(hits)) / reference.size,
+            'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)
+        }
+
+    rows = [measure('full', exact)]
+    rows.append(measure('lean', MovieRecommender(models_dir=models_dir, serving_mode='lean')))
+    with tempfile.TemporaryDirectory() as tmp:
+        exact.export_serving_artifacts(out_dir=os.path.join(tmp, 'serving'), float32=True)
+        rows.append(measure('lean-float32', MovieRecommender(models_dir=tmp, serving_mode='lean')))
+    if os.path.exists(os.path.join(models_dir, 'serving', 'shards', 'manifest.json')):
+        sharded = MovieRecommender(models_dir=models_dir, serving_mode='sharded')
+        rows.append(measure('sharded', sharded))
+        sharded.shard_router.close()
+
+    print("=" * 80)
+    print(f"RECALL vs SPEED  (recall@{k} against full mode, {len(seeds)} queries)")
+    print("=" * 80)
+    print(f"{'mode':<16}{'dtype':>10}{'recall':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in rows:
+        print(f"{row['mode']:<16}{str(row['dtype']):>10}{row['recall_at_k']:>10.4f}"
+              f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'models_dir': models_dir, 'n_movies': exact.n_movies, 'k': k,
+                       'n_queries': len(seeds), 'modes': rows}, f, indent=2)
+        print(f"\n✓ Saved: {json_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['export', 'compare', 'recall'])
+    parser.add_argument('--models-dir', default=str(script_dir.parent / 'results'))
+    parser.add_argument('--float32', action='store_true', help='export the similarity matrix as float32')
+    parser.add_argument('--variants', default='', help='comma-separated extra model variants to export')
+    parser.add_argument('--k', type=int, default=10, help='recall cut-off (recall)')
+    parser.add_argument('--queries', type=int, default=200, help='query movies sampled (recall)')
+    parser.add_argument('--json', dest='json_path', help='also write the comparison as JSON')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export(args.models_dir, float32=args.float32,
+               variants=[v.strip() for v in args.variants.split(',') if v.strip()])
+    elif args.command == 'recall':
+        recall(args.models_dir, k=args.k, n_queries=args.queries, json_path=args.json_path)
+    else:
+        compare(args.models_dir, json_path=args.json_path)
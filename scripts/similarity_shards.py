@@ -0,0 +1,451 @@
+"""
+Movie Recommendation System - Similarity Shards
+Column-partitioned similarity matrix served by local shard processes, with a
+scatter-gather router that merges their per-shard top-N lists
+
+Usage:
+    python scripts/similarity_shards.py export --shards 4 [--models-dir results] [--float32]
+    python scripts/similarity_shards.py bench [--models-dir results] [--queries 200] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from artifact_store import files_dir, new_export_dir, publish, read_manifest
+
+SHARDS_DIR = 'shards'
+
+
+def _top_n(scores, n):
+    """Column positions of the n highest scores in each row, best first"""
+    n = min(n, scores.shape[1])
+    if n <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    candidates = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def export_shards(recommender, out_dir, n_shards, float32=False, chunk_rows=1024):
+    """
+    Split a recommender's similarity matrix into column shards
+
+    Shard k holds similarity[:, lo_k:hi_k] for every query row, plus the scaled
+    popularity/rating of its columns, so it can score and rank its slice of the
+    catalog on its own. Rows are copied in chunks, so a memory-mapped source
+    never has to fit in memory. Shard processes memory-map these files, so
+    each export goes to a fresh directory under out_dir and is published by
+    atomically replacing out_dir/manifest.json.
+
+    Args:
+        recommender: Loaded MovieRecommender (full or lean)
+        out_dir: Destination directory
+        n_shards: Number of column partitions
+        float32: Store the slices as float32
+        chunk_rows: Rows copied per step
+
+    Returns:
+        Path of the output directory
+    """
+    similarity = recommender.similarity_matrix
+    n_movies = similarity.shape[1]
+    if not 1 <= n_shards <= n_movies:
+        raise ValueError(f"n_shards must be between 1 and {n_movies}")
+    export_dir, _ = new_export_dir(out_dir, recommender.model_version)
+
+    dtype = np.float32 if float32 else similarity.dtype
+    bounds = np.linspace(0, n_movies, n_shards + 1).astype(int)
+    shards = []
+    for k in range(n_shards):
+        lo, hi = int(bounds[k]), int(bounds[k + 1])
+        entry = {
+            'columns': [lo, hi],
+            'similarity_file': f'shard_{k}.npy',
+            'scaled_file': f'shard_{k}_scaled.npy'
+        }
+        block = np.lib.format.open_memmap(
+            os.path.join(export_dir, entry['similarity_file']), mode='w+', dtype=dtype, shape=(similarity.shape[0], hi - lo)
+        )
+        for start in range(0, similarity.shape[0], chunk_rows):
+            block[start:start + chunk_rows] = similarity[start:start + chunk_rows, lo:hi]
+        block.flush()
+        del block
+        np.save(
+            os.path.join(export_dir, entry['scaled_file']),
+            np.stack([
+                np.asarray(recommender.popularity_scaled, dtype=np.float64)[lo:hi],
+                np.asarray(recommender.rating_scaled, dtype=np.float64)[lo:hi]
+            ])
+        )
+        shards.append(entry)
+
+    publish(out_dir, export_dir, {
+        'model_version': recommender.model_version,
+        'n_movies': n_movies,
+        'n_shards': n_shards,
+        'similarity_dtype': str(np.dtype(dtype)),
+        'shards': shards
+    })
+    return out_dir
+
+
+def _shard_top_n(matrix, scaled, lo, movie_indices, coefficients, n, exclude):
+    """Score and rank one shard's columns for a batch of query rows"""
+    hi = lo + matrix.shape[1]
+    content_scores = np.asarray(matrix[movie_indices])
+    if coefficients is not None:
+        w_content, w_popularity, w_rating = coefficients
+        scores = w_content * content_scores + w_popularity * scaled[0] + w_rating * scaled[1]
+    else:
+        scores = content_scores.astype(np.float64)
+
+    rows = np.arange(len(movie_indices))
+    own = (movie_indices >= lo) & (movie_indices < hi)
+    scores[rows[own], movie_indices[own] - lo] = -1
+    if exclude is not None:
+        for row, seen in enumerate(exclude):
+            if seen is not None and len(seen):
+                seen = seen[(seen >= lo) & (seen < hi)]
+                scores[row, seen - lo] = -np.inf
+
+    top = _top_n(scores, n)
+    return (
+        top + lo,
+        np.take_along_axis(scores, top, axis=1),
+        np.take_along_axis(content_scores, top, axis=1).astype(np.float64)
+    )
+
+
+def serve_shard(shard_dir, shard, address, authkey):
+    """
+    Shard process main loop: answer scoring requests for one column slice
+
+    Requests are (op, args) tuples on a local Unix socket; replies are
+    (ok, result, service_seconds). `shard_dir` is the export directory itself
+    (the router resolves it), so a re-export published meanwhile is not mixed in.
+    """
+    entry = read_manifest(shard_dir)['shards'][shard]
+    lo, _ = entry['columns']
+    matrix = np.load(os.path.join(shard_dir, entry['similarity_file']), mmap_mode='r')
+    scaled = np.load(os.path.join(shard_dir, entry['scaled_file']))
+
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        with listener.accept() as conn:
+            while True:
+                try:
+                    op, args = conn.recv()
+                except EOFError:
+                    break
+                if op == 'stop':
+                    break
+                start = time.perf_counter()
+                try:
+                    if op == 'top_n':
+                        result = _shard_top_n(matrix, scaled, lo, *args)
+                    elif op == 'block':
+                        rows, cols = args
+                        owned = np.flatnonzero((cols >= lo) & (cols < lo + matrix.shape[1]))
+                        result = (owned, np.asarray(matrix[np.ix_(rows, cols[owned] - lo)]))
+                    elif op == 'warm':
+                        result = 0
+                        for row in range(0, matrix.shape[0], 256):
+                            block = np.asarray(matrix[row:row + 256])
+                            block.sum()
+                            result += block.nbytes
+                    elif op == 'info':
+                        result = {'columns': entry['columns'], 'rows': matrix.shape[0],
+                                  'dtype': str(matrix.dtype), 'pid': os.getpid()}
+                    else:
+                        raise ValueError(f"Unknown shard op '{op}'")
+                    conn.send((True, result, time.perf_counter() - start))
+                except Exception as e:
+                    conn.send((False, f"{type(e).__name__}: {e}", time.perf_counter() - start))
+
+
+def _reap(processes, socket_dir):
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def _shutdown(processes, connections, socket_dir):
+    """
+    Stop shard processes (finalizer: must not reference the router)
+
+    Runs on whichever thread drops the last reference, e.g. a request that
+    finished on a swapped-out model, so it only signals the shards; waiting
+    for them to exit (tens to hundreds of ms) happens on a reaper thread.
+    """
+    for conn in connections:
+        try:
+            conn.send(('stop', None))
+            conn.close()
+        except (OSError, ValueError):
+            pass
+    try:
+        threading.Thread(target=_reap, args=(list(processes), socket_dir), name='shard-reaper').start()
+    except RuntimeError:
+        # Interpreter shutting down: no new threads, reap inline
+        _reap(processes, socket_dir)
+
+
+def _percentiles(values):
+    values = np.fromiter(values, dtype=np.float64)
+    if not len(values):
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'mean': round(float(values.mean()), 3)
+    }
+
+
+class ShardRouter:
+    """
+    Scatter-gather front for local shard processes
+
+    Starts one process per shard of an export_shards() directory and talks to
+    each over a Unix socket. A query is sent to every shard, each returns its
+    own top-N (global indices, scores, content scores), and the router merges
+    those k*N candidates into the global top-N. Calls are serialized: the
+    dispatcher already micro-batches /recommend, so one call carries many rows.
+    Shard processes stop when the router is closed or garbage collected.
+    """
+
+    def __init__(self, shard_dir, expected_version=None, start_timeout_s=60.0, latency_window=2048):
+        """
+        Args:
+            shard_dir: Directory written by export_shards
+            expected_version: Model version the shards must have been exported from
+            start_timeout_s: How long to wait for every shard to come up
+            latency_window: Recent calls kept for latency percentiles
+        """
+        self.shard_dir = shard_dir
+        self.manifest = read_manifest(shard_dir)
+        # Resolved once; every shard process opens this export, not whatever is published later
+        self.files_dir = files_dir(shard_dir, self.manifest)
+        if expected_version is not None and self.manifest['model_version'] != expected_version:
+            raise ValueError(
+                f"Shards in {shard_dir} are from model {self.manifest['model_version']}, "
+                f"expected {expected_version} (re-run the shard export)"
+            )
+        self.n_movies = self.manifest['n_movies']
+        self.n_shards = self.manifest['n_shards']
+
+        self.processes = []
+        self.connections = []
+        self._socket_dir = tempfile.mkdtemp(prefix='similarity-shards-')
+        self._finalizer = weakref.finalize(self, _shutdown, self.processes, self.connections, self._socket_dir)
+        self._lock = threading.Lock()
+
+        self._calls = 0
+        self._fanout_ms = deque(maxlen=latency_window)
+        self._slowest_shard_ms = deque(maxlen=latency_window)
+        self._merge_ms = deque(maxlen=latency_window)
+        self._shard_ms = [deque(maxlen=latency_window) for _ in range(self.n_shards)]
+
+        try:
+            self._start(start_timeout_s)
+        except Exception:
+            self.close()
+            raise
+
+    def _start(self, timeout_s):
+        authkey = os.urandom(16)
+        env = {**os.environ, 'SHARD_AUTHKEY': authkey.hex()}
+        addresses = []
+        for shard in range(self.n_shards):
+            address = os.path.join(self._socket_dir, f'shard-{shard}.sock')
+            addresses.append(address)
+            self.processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'serve',
+                 '--shard-dir', self.files_dir, '--shard', str(shard), '--address', address],
+                env=env
+            ))
+
+        deadline = time.monotonic() + timeout_s
+        for shard, (process, address) in enumerate(zip(self.processes, addresses)):
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Shard {shard} exited with code {process.returncode} during startup")
+                try:
+                    self.connections.append(Client(address, family='AF_UNIX', authkey=authkey))
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"Shard {shard} did not start within {timeout_s}s")
+                    time.sleep(0.02)
+
+    def _scatter(self, op, args):
+        """Send one request to every shard and collect the replies, in shard order"""
+        with self._lock:
+            for conn in self.connections:
+                conn.send((op, args))
+            replies = [conn.recv() for conn in self.connections]
+        for shard, (ok, result, _) in enumerate(replies):
+            if not ok:
+                raise RuntimeError(f"Shard {shard} failed: {result}")
+        return [result for _, result, _ in replies], [seconds for _, _, seconds in replies]
+
+    def top_n(self, movie_indices, coefficients, n, exclude=None):
+        """
+        Global top-N across all shards
+
+        Args:
+            movie_indices: Catalog indices of the query movies
+            coefficients: (content, popularity, rating) hybrid weights, or None
+                for plain content similarity
+            n: Results per query movie
+            exclude: Optional per-row catalog index arrays to mask out
+
+        Returns:
+            (indices, scores, content_scores), each of shape (len(movie_indices), n')
+        """
+        movie_indices = np.asarray(movie_indices, dtype=np.intp)
+        start = time.perf_counter()
+        results, service = self._scatter('top_n', (movie_indices, coefficients, n, exclude))
+        gathered = time.perf_counter()
+
+        indices = np.concatenate([r[0] for r in results], axis=1)
+        scores = np.concatenate([r[1] for r in results], axis=1)
+        content_scores = np.concatenate([r[2] for r in results], axis=1)
+        best = _top_n(scores, n)
+        merged = (
+            np.take_along_axis(indices, best, axis=1),
+            np.take_along_axis(scores, best, axis=1),
+            np.take_along_axis(content_scores, best, axis=1)
+        )
+        end = time.perf_counter()
+
+        self._calls += 1
+        self._fanout_ms.append((end - start) * 1000.0)
+        self._merge_ms.append((end - gathered) * 1000.0)
+        self._slowest_shard_ms.append(max(service) * 1000.0)
+        for shard, seconds in enumerate(service):
+            self._shard_ms[shard].append(seconds * 1000.0)
+        return merged
+
+    def similarity_block(self, rows, cols):
+        """similarity[rows][:, cols], assembled from the columns each shard owns"""
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        block = np.empty((len(rows), len(cols)), dtype=np.float64)
+        for owned, values in self._scatter('block', (rows, cols))[0]:
+            block[:, owned] = values
+        return block
+
+    def warm_up(self):
+        """Have every shard touch its pages; returns bytes touched"""
+        return int(sum(self._scatter('warm', ())[0]))
+
+    def info(self):
+        return self._scatter('info', ())[0]
+
+    def alive(self):
+        return bool(self.processes) and all(process.poll() is None for process in self.processes)
+
+    def close(self):
+        self._finalizer()
+
+    def metrics(self):
+        """Fan-out latency (scatter + slowest shard + merge) and per-shard service time"""
+        return {
+            'shards': self.n_shards,
+            'alive': self.alive(),
+            'calls': self._calls,
+            'fanout_ms': _percentiles(self._fanout_ms),
+            'slowest_shard_ms': _percentiles(self._slowest_shard_ms),
+            'merge_ms': _percentiles(self._merge_ms),
+            'per_shard': [
+                {'columns': entry['columns'], 'service_ms': _percentiles(latencies)}
+                for entry, latencies in zip(self.manifest['shards'], self._shard_ms)
+            ]
+        }
+
+
+def bench(models_dir, n_queries=200, batch_sizes=(1, 16), n_recommendations=10):
+    """Latency of sharded vs in-process scoring on the same queries, and whether they agree"""
+    from movie_recommender import MovieRecommender
+
+    lean = MovieRecommender(models_dir=models_dir, serving_mode='lean')
+    sharded = MovieRecommender(models_dir=models_dir, serving_mode='sharded')
+    sharded.warm_up()
+    queries = np.random.default_rng(0).integers(0, lean.n_movies, n_queries)
+
+    report = {'shards': sharded.shard_router.n_shards, 'n_movies': lean.n_movies, 'batches': {}}
+    for batch_size in batch_sizes:
+        timings = {}
+        agree = True
+        for name, rec in (('lean', lean), ('sharded', sharded)):
+            latencies = []
+            for start in range(0, n_queries, batch_size):
+                batch = [int(i) for i in queries[start:start + batch_size]]
+                t0 = time.perf_counter()
+                rec.recommend_indices(batch, 'hybrid', n_recommendations)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            timings[name] = _percentiles(latencies)
+        for idx in queries[:20]:
+            expected = [r['movie_id'] for r in lean.recommend_indices([int(idx)], 'hybrid', n_recommendations)[0]['recommendations']]
+            got = [r['movie_id'] for r in sharded.recommend_indices([int(idx)], 'hybrid', n_recommendations)[0]['recommendations']]
+            agree = agree and expected == got
+        report['batches'][str(batch_size)] = {**timings, 'same_results': agree}
+    report['router'] = sharded.shard_router.metrics()
+    sharded.shard_router.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = sub.add_parser('export', help='split the exported similarity matrix into column shards')
+    export_parser.add_argument('--models-dir', default=str(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results')))
+    export_parser.add_argument('--shards', type=int, required=True)
+    export_parser.add_argument('--float32', action='store_true')
+
+    bench_parser = sub.add_parser('bench', help='compare sharded and in-process latency')
+    bench_parser.add_argument('--models-dir', default=str(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results')))
+    bench_parser.add_argument('--queries', type=int, default=200)
+    bench_parser.add_argument('--json', dest='json_path')
+
+    serve_parser = sub.add_parser('serve', help='run one shard process (started by ShardRouter)')
+    serve_parser.add_argument('--shard-dir', required=True)
+    serve_parser.add_argument('--shard', type=int, required=True)
+    serve_parser.add_argument('--address', required=True)
+
+    args = parser.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.command == 'serve':
+        serve_shard(args.shard_dir, args.shard, args.address, bytes.fromhex(os.environ['SHARD_AUTHKEY']))
+    elif args.command == 'export':
+        from movie_recommender import MovieRecommender, SERVING_DIR
+
+        models_dir = os.path.abspath(args.models_dir)
+        source = MovieRecommender(models_dir=models_dir, serving_mode='lean')
+        out_dir = export_shards(source, os.path.join(models_dir, SERVING_DIR, SHARDS_DIR), args.shards, args.float32)
+        print(f"✓ Wrote {args.shards} shards to {out_dir}")
+    else:
+        result = bench(os.path.abspath(args.models_dir), n_queries=args.queries)
+        print(json.dumps(result, indent=2))
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"\n✓ Saved: {args.json_path}")
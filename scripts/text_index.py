@@ -0,0 +1,218 @@
+"""
+Movie Recommendation System - Text Index
+Free-text "movies like this description" search over a sparse TF-IDF matrix
+"""
+
+import re
+import json
+from collections import Counter
+import numpy as np
+
+
+# Same settings as the Part 2 notebook vectorizer, applied to the raw overviews
+TFIDF_PARAMS = {
+    'max_features': 1500,
+    'ngram_range': (1, 3),
+    'min_df': 1,
+    'max_df': 0.9,
+    'sublinear_tf': True,
+    'stop_words': 'english'
+}
+
+DEFAULT_TOKEN_PATTERN = r'(?u)\b\w\w+\b'
+
+
+class QueryVectorizer:
+    """
+    Transform-only copy of a fitted sklearn TfidfVectorizer (word analyzer)
+
+    Holds the vocabulary, idf weights and analyzer settings as plain Python/NumPy
+    values, so queries can be vectorized in lean mode without importing sklearn.
+    """
+
+    def __init__(self, terms, idf, ngram_range=(1, 1), lowercase=True,
+                 token_pattern=DEFAULT_TOKEN_PATTERN, stop_words=(), sublinear_tf=False):
+        """
+        Args:
+            terms: Vocabulary terms in feature-index order
+            idf: Inverse document frequency per feature
+            ngram_range: (min_n, max_n) word n-gram lengths
+            lowercase: Lowercase text before tokenizing
+            token_pattern: Regex selecting tokens
+            stop_words: Tokens dropped before building n-grams
+            sublinear_tf: Use 1 + log(tf) instead of raw counts
+        """
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self.stop_words = frozenset(stop_words or ())
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer):
+        """Copy the state of a fitted TfidfVectorizer"""
+        if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+            raise ValueError("Only word-analyzer vectorizers without custom callables can be exported")
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, i in vectorizer.vocabulary_.items():
+            terms[i] = term
+        return cls(
+            terms,
+            vectorizer.idf_,
+            ngram_range=vectorizer.ngram_range,
+            lowercase=vectorizer.lowercase,
+            token_pattern=vectorizer.token_pattern,
+            stop_words=vectorizer.get_stop_words(),
+            sublinear_tf=vectorizer.sublinear_tf
+        )
+
+    def analyze(self, text):
+        """Tokens and word n-grams, as sklearn's word analyzer produces them"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = [t for t in self._token_re.findall(text) if t not in self.stop_words]
+
+        min_n, max_n = self.ngram_range
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform_one(self, text):
+        """
+        L2-normalized TF-IDF vector for one document
+
+        Returns:
+            (feature_ids, weights) arrays; empty if no term is in the vocabulary
+        """
+        counts = Counter(g for g in self.analyze(text) if g in self.vocabulary)
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+        ids = np.fromiter((self.vocabulary[g] for g in counts), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            tf = 1.0 + np.log(tf)
+        weights = tf * self.idf[ids]
+        return ids, weights / np.linalg.norm(weights)
+
+    def to_dict(self):
+        return {
+            'terms': self.terms,
+            'idf': self.idf.tolist(),
+            'ngram_range': list(self.ngram_range),
+            'lowercase': self.lowercase,
+            'token_pattern': self.token_pattern,
+            'stop_words': sorted(self.stop_words),
+            'sublinear_tf': self.sublinear_tf
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class TextIndex:
+    """
+    Inverted index over the L2-normalized TF-IDF rows of the catalog
+
+    Stored row-major (CSR: movie -> features) for export, and transposed once at
+    load time into feature -> (movie, weight) postings. A query only touches the
+    postings of its own terms, so scoring costs O(matching postings) instead of
+    O(N) rows of the dense similarity matrix.
+    """
+
+    def __init__(self, vectorizer, data, indices, indptr, n_docs):
+        """
+        Args:
+            vectorizer: QueryVectorizer the matrix was built with
+            data, indices, indptr: CSR arrays of the (n_docs, n_features) matrix
+            n_docs: Number of catalog rows
+        """
+        self.vectorizer = vectorizer
+        self.n_docs = n_docs
+        self.data = np.asarray(data, dtype=np.float32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+
+        # CSR -> CSC without scipy: stable sort of the nonzeros by feature id
+        rows = np.repeat(np.arange(n_docs, dtype=np.int32), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind='stable')
+        self.posting_docs = rows[order]
+        self.posting_weights = self.data[order]
+        counts = np.bincount(self.indices, minlength=len(vectorizer.terms))
+        self.posting_ptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    @classmethod
+    def fit(cls, texts, params=None):
+        """Fit a TfidfVectorizer on the catalog overviews (full mode; needs sklearn)"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(**(params or TFIDF_PARAMS))
+        matrix = vectorizer.fit_transform(['' if t is None else str(t) for t in texts]).tocsr()
+        matrix.sort_indices()
+        return cls(
+            QueryVectorizer.from_sklearn(vectorizer),
+            matrix.data, matrix.indices, matrix.indptr, matrix.shape[0]
+        )
+
+    @property
+    def n_features(self):
+        return len(self.vectorizer.terms)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (
+            self.data, self.indices, self.indptr,
+            self.posting_docs, self.posting_weights, self.posting_ptr
+        ))
+
+    def score(self, text):
+        """
+        Cosine similarity of `text` against every catalog row
+
+        Returns:
+            (doc_ids, scores) for rows sharing at least one term with the query
+        """
+        ids, weights = self.vectorizer.transform_one(text)
+        if len(ids) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+        starts, ends = self.posting_ptr[ids], self.posting_ptr[ids + 1]
+        lengths = ends - starts
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        docs = self.posting_docs[positions]
+        contributions = self.posting_weights[positions] * np.repeat(weights, lengths)
+
+        # Accumulate per document, then keep only documents that were touched
+        doc_ids, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions, minlength=len(doc_ids))
+        return doc_ids.astype(np.intp), scores
+
+    def matched_terms(self, text):
+        """Vocabulary terms found in `text`, highest weight first"""
+        ids, weights = self.vectorizer.transform_one(text)
+        return [self.vectorizer.terms[i] for i in ids[np.argsort(-weights, kind='stable')]]
+
+    def save(self, vectorizer_path, matrix_path):
+        """Write the vectorizer as JSON and the CSR matrix as .npz"""
+        with open(vectorizer_path, 'w') as f:
+            json.dump(self.vectorizer.to_dict(), f)
+        np.savez(
+            matrix_path,
+            data=self.data, indices=self.indices, indptr=self.indptr,
+            shape=np.array([self.n_docs, self.n_features], dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, vectorizer_path, matrix_path):
+        with open(vectorizer_path) as f:
+            vectorizer = QueryVectorizer.from_dict(json.load(f))
+        with np.load(matrix_path) as arrays:
+            return cls(
+                vectorizer, arrays['data'], arrays['indices'], arrays['indptr'], int(arrays['shape'][0])
+            )
@@ -0,0 +1,248 @@
+"""
+Movie Recommendation System - Title Index
+Typo-tolerant title lookup and popularity-ranked prefix autocomplete
+"""
+
+import re
+import heapq
+from bisect import bisect_left
+import numpy as np
+
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_LEADING_ARTICLE = re.compile(r'^(the|a|an) ')
+
+
+def normalize_title(title):
+    """Lowercase a title and collapse punctuation/whitespace to single spaces"""
+    return _NON_ALNUM.sub(' ', str(title).lower()).strip()
+
+
+def title_trigrams(text):
+    """Set of character trigrams for an already normalized string"""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_dist):
+    """
+    Levenshtein distance between two strings, giving up early
+
+    Args:
+        a, b: Strings to compare
+        max_dist: Largest distance of interest
+
+    Returns:
+        The edit distance, or max_dist + 1 if it exceeds max_dist
+    """
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    previous = list(range(len(a) + 1))
+    for j, cb in enumerate(b, 1):
+        current = [j]
+        row_min = j
+        for i, ca in enumerate(a, 1):
+            cost = previous[i - 1] + (ca != cb)
+            if previous[i] + 1 < cost:
+                cost = previous[i] + 1
+            if current[i - 1] + 1 < cost:
+                cost = current[i - 1] + 1
+            current.append(cost)
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_dist:
+            return max_dist + 1
+        previous = current
+    return previous[-1]
+
+
+class TitleIndex:
+    """Prebuilt lookup structures over the catalog titles"""
+
+    def __init__(self, titles, max_candidates=40):
+        """
+        Build exact and trigram indexes
+
+        Args:
+            titles: Sequence of movie titles, in catalog order
+            max_candidates: Trigram candidates re-scored with edit distance
+        """
+        self.max_candidates = max_candidates
+        self.lower_titles = [str(t).lower() for t in titles]
+        self.normalized = [normalize_title(t) for t in titles]
+
+        # First occurrence wins, matching the original linear scan
+        self.exact = {}
+        for idx, title in enumerate(self.lower_titles):
+            self.exact.setdefault(title, idx)
+
+        postings = {}
+        gram_counts = np.zeros(len(self.normalized), dtype=np.int32)
+        for idx, title in enumerate(self.normalized):
+            grams = title_trigrams(title)
+            gram_counts[idx] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(idx)
+
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+        self.gram_counts = gram_counts
+
+    def __len__(self):
+        return len(self.normalized)
+
+    def lookup_exact(self, title):
+        """Index of the first title equal to `title` (case-insensitive), or None"""
+        return self.exact.get(title.lower())
+
+    def lookup_substring(self, title):
+        """
+        Index of the first title containing `title` (case-insensitive), or None
+
+        Every trigram inside the normalized query also occurs in the normalized
+        title of any match, so intersecting their postings leaves a few
+        candidates to verify. Queries shorter than a trigram once normalized
+        fall back to scanning all titles.
+        """
+        title_lower = title.lower()
+        q = normalize_title(title_lower)
+        if len(q) < 3:
+            return self._scan_substring(title_lower)
+
+        lists = []
+        for gram in {q[i:i + 3] for i in range(len(q) - 2)}:
+            ids = self.postings.get(gram)
+            if ids is None:
+                return None
+            lists.append(ids)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return None
+
+        # Postings are in catalog order, so the first verified candidate is the first match
+        for idx in candidates:
+            if title_lower in self.lower_titles[idx]:
+                return int(idx)
+        return None
+
+    def _scan_substring(self, title_lower):
+        for idx, movie_title in enumerate(self.lower_titles):
+            if title_lower in movie_title:
+                return idx
+        return None
+
+    def search(self, query, limit=5):
+        """
+        Rank titles by similarity to a possibly misspelled query
+
+        Args:
+            query: Title as typed by the user
+            limit: Maximum number of candidates to return
+
+        Returns:
+            List of (index, confidence) tuples, best first. Confidence is
+            1 - edit_distance / max(len(query), len(title)) on normalized text.
+        """
+        q = normalize_title(query)
+        if not q:
+            return []
+
+        grams = title_trigrams(q)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+
+        # Dice coefficient on trigram sets picks the candidates to verify
+        shared = np.bincount(np.concatenate(lists), minlength=len(self))
+        dice = 2.0 * shared / (len(grams) + self.gram_counts)
+        n_candidates = min(self.max_candidates, int(np.count_nonzero(shared)))
+        candidates = np.argpartition(-dice, n_candidates - 1)[:n_candidates]
+
+        max_dist = max(1, len(q) // 3)
+        ranked = []
+        for idx in candidates:
+            title = self.normalized[idx]
+            dist = bounded_levenshtein(q, title, max_dist)
+            if dist > max_dist:
+                continue
+            confidence = 1.0 - dist / max(len(q), len(title))
+            ranked.append((int(idx), confidence, float(dice[idx])))
+
+        ranked.sort(key=lambda x: (-x[1], -x[2], x[0]))
+        return [(idx, confidence) for idx, confidence, _ in ranked[:limit]]
+
+
+class PrefixIndex:
+    """
+    Popularity-ranked prefix completion over normalized titles
+
+    Prefixes up to `max_prefix` characters map straight to their precomputed
+    top-K ids (a flattened trie). Longer prefixes bisect a sorted key array,
+    where the matching range is already small.
+    """
+
+    def __init__(self, titles, popularity, top_k=10, max_prefix=8):
+        """
+        Build the sorted key array and the per-prefix top-K table
+
+        Args:
+            titles: Sequence of movie titles, in catalog order
+            popularity: Ranking score per title (higher first)
+            top_k: Completions stored per prefix
+            max_prefix: Longest prefix with a precomputed entry
+        """
+        self.top_k = top_k
+        self.max_prefix = max_prefix
+        self.popularity = np.asarray(popularity, dtype=np.float64)
+
+        # Titles are reachable with or without a leading article
+        title_keys = []
+        for title in titles:
+            norm = normalize_title(title)
+            title_keys.append({norm, _LEADING_ARTICLE.sub('', norm)} - {''})
+
+        pairs = sorted((key, idx) for idx, keys in enumerate(title_keys) for key in keys)
+        self.keys = [key for key, _ in pairs]
+        self.key_ids = np.array([idx for _, idx in pairs], dtype=np.int32)
+
+        table = {}
+        for idx in np.argsort(-self.popularity, kind='stable'):
+            prefixes = {
+                key[:length]
+                for key in title_keys[idx]
+                for length in range(1, min(len(key), max_prefix) + 1)
+            }
+            for prefix in prefixes:
+                bucket = table.setdefault(prefix, [])
+                if len(bucket) < top_k:
+                    bucket.append(int(idx))
+        self.top = {prefix: tuple(ids) for prefix, ids in table.items()}
+
+    def complete(self, prefix, limit=10):
+        """
+        Most popular titles starting with `prefix`
+
+        Args:
+            prefix: Partial title as typed
+            limit: Maximum number of ids (capped at top_k)
+
+        Returns:
+            List of catalog indices, most popular first
+        """
+        p = normalize_title(prefix)
+        if not p:
+            return []
+        limit = min(limit, self.top_k)
+
+        if len(p) <= self.max_prefix:
+            return list(self.top.get(p, ())[:limit])
+
+        lo = bisect_left(self.keys, p)
+        hi = bisect_left(self.keys, p + '\x7f', lo)
+        ids = set(self.key_ids[lo:hi].tolist())
+        return heapq.nlargest(limit, ids, key=lambda i: (self.popularity[i], -i))
@@ -0,0 +1,283 @@
+"""
+Movie Recommendation System - User History
+Per-user watched movies as compact sets of catalog indices, for seen-item exclusion
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class SeenSet:
+    """
+    Catalog indices one user has already seen
+
+    Stored like a roaring container: a sorted uint16/uint32 array while the set
+    is sparse, switching to a bitmap (one bit per catalog movie) once the array
+    would be larger than the bitmap. A user with 20 watched movies costs 40
+    bytes; one with half of a 10k catalog costs 1.25 KB.
+    """
+
+    __slots__ = ('n_items', 'revision', '_array', '_bitmap')
+
+    def __init__(self, n_items):
+        self.n_items = n_items
+        self.revision = 0
+        self._array = np.empty(0, dtype=np.uint16 if n_items <= 1 << 16 else np.uint32)
+        self._bitmap = None
+
+    @property
+    def is_bitmap(self):
+        return self._bitmap is not None
+
+    @property
+    def nbytes(self):
+        return self._bitmap.nbytes if self._bitmap is not None else self._array.nbytes
+
+    def __len__(self):
+        if self._bitmap is not None:
+            return int(np.unpackbits(self._bitmap, count=self.n_items).sum())
+        return len(self._array)
+
+    def __contains__(self, idx):
+        return bool(self.contains([idx])[0])
+
+    def contains(self, indices):
+        """Boolean membership for an array of catalog indices"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if self._bitmap is not None:
+            return (self._bitmap[indices >> 3] >> (7 - (indices & 7))) & 1 == 1
+        pos = np.searchsorted(self._array, indices)
+        found = np.zeros(len(indices), dtype=bool)
+        inside = pos < len(self._array)
+        found[inside] = self._array[pos[inside]] == indices[inside]
+        return found
+
+    def add(self, indices):
+        """
+        Add catalog indices
+
+        Returns:
+            Number of indices that were not in the set yet
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.intp))
+        if len(indices) and (indices[0] < 0 or indices[-1] >= self.n_items):
+            raise ValueError(f"Movie index out of range for a catalog of {self.n_items}")
+        new = indices[~self.contains(indices)]
+        if len(new) == 0:
+            return 0
+
+        if self._bitmap is not None:
+            bits = np.unpackbits(self._bitmap, count=self.n_items)
+            bits[new] = 1
+            self._bitmap = np.packbits(bits)
+        else:
+            self._array = np.union1d(self._array, new).astype(self._array.dtype)
+            if self._array.nbytes > self._bitmap_nbytes():
+                bits = np.zeros(self.n_items, dtype=np.uint8)
+                bits[self._array] = 1
+                self._bitmap = np.packbits(bits)
+                self._array = self._array[:0]
+        return len(new)
+
+    def remove(self, indices):
+        """Drop catalog indices (unknown ones are ignored)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if self._bitmap is not None:
+            bits = np.unpackbits(self._bitmap, count=self.n_items)
+            bits[indices[(indices >= 0) & (indices < self.n_items)]] = 0
+            remaining = np.flatnonzero(bits)
+            # Back to an array once it is clearly smaller (half, to avoid flapping)
+            if len(remaining) * self._array.itemsize * 2 < self._bitmap_nbytes():
+                self._array = remaining.astype(self._array.dtype)
+                self._bitmap = None
+            else:
+                self._bitmap = np.packbits(bits)
+        else:
+            self._array = np.setdiff1d(self._array, indices).astype(self._array.dtype)
+
+    def to_indices(self):
+        """Sorted catalog indices as an intp array, ready for fancy indexing"""
+        if self._bitmap is not None:
+            return np.flatnonzero(np.unpackbits(self._bitmap, count=self.n_items))
+        return self._array.astype(np.intp)
+
+    def _bitmap_nbytes(self):
+        return (self.n_items + 7) // 8
+
+
+def _index_map(src_ids, dst_ids):
+    """Position in `dst_ids` of every movie id in `src_ids` (-1 where dst lacks it)"""
+    if len(dst_ids) == 0:
+        return np.full(len(src_ids), -1, dtype=np.intp)
+    order = np.argsort(dst_ids, kind='stable')
+    sorted_ids = dst_ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, src_ids), len(dst_ids) - 1)
+    return np.where(sorted_ids[pos] == src_ids, order[pos], -1)
+
+
+class HistoryStore:
+    """
+    Seen sets for many users, least recently used evicted first
+
+    Keyed by user id and holding catalog indices, so it must be re-bound with
+    bind() whenever a model version with a different catalog is swapped in.
+    Reads and writes may name the catalog their indices refer to (`movie_ids`
+    of the recommender serving the request); indices from any other catalog
+    than the bound one are translated by movie id. A request that started on
+    the old model therefore stays correct while a swap binds the new one.
+    """
+
+    def __init__(self, max_users=100000, max_items_per_user=5000):
+        """
+        Args:
+            max_users: Users kept; the least recently used are dropped beyond this
+            max_items_per_user: Cap on one user's history (the request is rejected past it)
+        """
+        self.max_users = max_users
+        self.max_items_per_user = max_items_per_user
+
+        self.users = OrderedDict()
+        self.movie_ids = None
+        self._maps = {}
+        self._revisions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {'evicted': 0, 'dropped_on_rebind': 0}
+
+    @property
+    def n_items(self):
+        return 0 if self.movie_ids is None else len(self.movie_ids)
+
+    def bind(self, movie_ids):
+        """
+        Attach the store to a catalog, translating existing histories if it changed
+
+        Args:
+            movie_ids: Movie id of every catalog index, in catalog order
+        """
+        movie_ids = np.asarray(movie_ids)
+        with self._lock:
+            old_ids = self.movie_ids
+            # Adopt the new array even if equal, so its requests take the untranslated path
+            self.movie_ids = movie_ids
+            self._maps = {}
+            if old_ids is not None and np.array_equal(old_ids, movie_ids):
+                return
+            if old_ids is None or not self.users:
+                self.users = OrderedDict()
+                return
+
+            position = {int(movie_id): idx for idx, movie_id in enumerate(movie_ids)}
+            users = OrderedDict()
+            for user_id, seen in self.users.items():
+                remapped = [position.get(int(old_ids[idx]), -1) for idx in seen.to_indices()]
+                kept = [idx for idx in remapped if idx >= 0]
+                self.stats['dropped_on_rebind'] += len(remapped) - len(kept)
+                if kept:
+                    new_seen = SeenSet(len(movie_ids))
+                    new_seen.add(kept)
+                    new_seen.revision = next(self._revisions)
+                    users[user_id] = new_seen
+            self.users = users
+
+    def _translate(self, indices, src_ids, dst_ids):
+        """Catalog indices from catalog `src_ids` into catalog `dst_ids`, dropping movies dst lacks"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if src_ids is None or dst_ids is None or src_ids is dst_ids:
+            return indices
+        key = (id(src_ids), id(dst_ids))
+        entry = self._maps.get(key)
+        # The arrays are kept in the entry, so their ids cannot be reused while cached
+        if entry is None:
+            if len(self._maps) >= 8:
+                self._maps.clear()
+            entry = self._maps[key] = (src_ids, dst_ids, _index_map(np.asarray(src_ids), np.asarray(dst_ids)))
+        mapped = entry[2][indices]
+        return mapped[mapped >= 0]
+
+    def get(self, user_id):
+        """SeenSet of a user, or None if nothing is recorded"""
+        with self._lock:
+            seen = self.users.get(user_id)
+            if seen is not None:
+                self.users.move_to_end(user_id)
+            return seen
+
+    def seen_indices(self, user_id, movie_ids=None):
+        """
+        Sorted seen catalog indices of a user (empty if none)
+
+        Args:
+            movie_ids: Catalog the indices should refer to (default: the bound one)
+        """
+        with self._lock:
+            seen = self.users.get(user_id)
+            if seen is None:
+                return np.empty(0, dtype=np.intp)
+            self.users.move_to_end(user_id)
+            indices, bound_ids = seen.to_indices(), self.movie_ids
+        return np.sort(self._translate(indices, bound_ids, movie_ids))
+
+    def revision(self, user_id):
+        """Changes whenever the user's history does; 0 for users without one"""
+        seen = self.users.get(user_id)
+        return seen.revision if seen is not None else 0
+
+    def add(self, user_id, indices, movie_ids=None):
+        """
+        Record watched catalog indices for a user
+
+        Args:
+            movie_ids: Catalog the indices refer to (default: the bound one)
+
+        Returns:
+            Number of newly recorded movies
+
+        Raises:
+            ValueError: If the store is not bound or the history would exceed its cap
+        """
+        if self.movie_ids is None:
+            raise ValueError("History store is not bound to a catalog yet")
+        with self._lock:
+            seen = self.users.get(user_id)
+            if seen is None:
+                seen = SeenSet(self.n_items)
+            indices = np.unique(self._translate(indices, movie_ids, self.movie_ids))
+            if len(seen) + int((~seen.contains(indices)).sum()) > self.max_items_per_user:
+                raise ValueError(f"History is limited to {self.max_items_per_user} movies per user")
+            added = seen.add(indices)
+            if added:
+                seen.revision = next(self._revisions)
+            self.users[user_id] = seen
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+                self.stats['evicted'] += 1
+            return added
+
+    def remove(self, user_id, indices, movie_ids=None):
+        with self._lock:
+            seen = self.users.get(user_id)
+            if seen is None:
+                return
+            seen.remove(self._translate(indices, movie_ids, self.movie_ids))
+            seen.revision = next(self._revisions)
+            if len(seen) == 0:
+                del self.users[user_id]
+
+    def clear(self, user_id):
+        """Forget a user's history; returns whether there was one"""
+        with self._lock:
+            return self.users.pop(user_id, None) is not None
+
+    def metrics(self):
+        with self._lock:
+            sets = list(self.users.values())
+        return {
+            'users': len(sets),
+            'max_users': self.max_users,
+            'bitmap_users': sum(seen.is_bitmap for seen in sets),
+            'bytes': int(sum(seen.nbytes for seen in sets)),
+            **self.stats
+        }
@@ -0,0 +1,339 @@
+"""
+Performance Dashboard
+Collects benchmark JSON and /metrics snapshots into a history file and charts
+latency, memory and recall trends across commits and catalog sizes
+
+Inputs (recognised by their keys):
+    serving_report.py compare --json   RSS per serving mode
+    serving_report.py recall --json    recall@k vs latency of approximate modes
+    similarity_shards.py bench --json  sharded vs in-process latency per batch size
+    GET /metrics                       latency percentiles per endpoint
+
+Usage:
+    python scripts/visualize_performance.py record modes.json recall.json [--label nightly]
+    python scripts/visualize_performance.py record --metrics-url http://localhost:8000
+    python scripts/visualize_performance.py plot [--history results/performance_history.jsonl]
+"""
+
+import argparse
+import json
+import subprocess
+import time
+from pathlib import Path
+
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Set style
+plt.style.use('seaborn-v0_8-darkgrid')
+sns.set_palette("husl")
+
+# Directories
+script_dir = Path(__file__).parent
+project_dir = script_dir.parent
+results_dir = project_dir / 'results'
+HISTORY_PATH = results_dir / 'performance_history.jsonl'
+OUTPUT_DIR = results_dir / 'performance_visualizations'
+
+
+def detect_kind(data):
+    """Which report a JSON document came from (None if unrecognised)"""
+    if 'dispatcher' in data and 'admission' in data:
+        return 'metrics'
+    if 'batches' in data and 'router' in data:
+        return 'shard_bench'
+    if 'modes' in data and data['modes']:
+        return 'recall' if 'recall_at_k' in data['modes'][0] else 'serving_modes'
+    return None
+
+
+def current_commit():
+    """Short hash of the checked-out commit, or 'unknown' outside a git checkout"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_dir,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def fetch_metrics(url):
+    """GET /metrics from a running server"""
+    import urllib.request
+
+    with urllib.request.urlopen(url.rstrip('/') + '/metrics') as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def record(documents, history_path, commit=None, label=''):
+    """
+    Append reports to the history file, tagged with commit, catalog size and time
+
+    Args:
+        documents: List of (source, parsed JSON) pairs
+        history_path: JSON-lines file to append to
+        commit: Commit the numbers belong to (default: current HEAD)
+        label: Free-form tag (machine, run name, ...)
+
+    Returns:
+        Number of records written
+    """
+    commit = commit or current_commit()
+    recorded_at = time.time()
+    written = 0
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(history_path, 'a') as f:
+        for source, data in documents:
+            kind = detect_kind(data)
+            if kind is None:
+                print(f"⚠ Skipped {source}: not a recognised benchmark or /metrics document")
+                continue
+            n_movies = data.get('n_movies')
+            if n_movies is None and kind == 'serving_modes':
+                n_movies = data['modes'][0].get('n_movies')
+            f.write(json.dumps({
+                'kind': kind, 'commit': commit, 'label': label, 'n_movies': n_movies,
+                'recorded_at': recorded_at, 'source': source, 'data': data
+            }) + '\n')
+            written += 1
+            print(f"✓ Recorded {kind} from {source} (commit {commit}, {n_movies} movies)")
+    return written
+
+
+def load_history(history_path):
+    """All records, oldest first"""
+    records = []
+    with open(history_path) as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return sorted(records, key=lambda r: r['recorded_at'])
+
+
+def flatten(records):
+    """
+    One DataFrame per chart source, one row per measured point
+
+    Every row carries commit, n_movies, recorded_at and a `run` label
+    ("<commit>" over "<n> movies") used as the x axis of trend charts.
+    """
+    endpoints, modes, recall, shards = [], [], [], []
+    for r in records:
+        base = {'commit': r['commit'], 'label': r.get('label', ''), 'n_movies': r.get('n_movies'),
+                'recorded_at': r['recorded_at'], 'run': f"{r['commit']}\n{r.get('n_movies') or '?'} movies"}
+        data = r['data']
+        if r['kind'] == 'metrics':
+            for endpoint, stats in (data.get('endpoints') or {}).items():
+                endpoints.append({**base, 'endpoint': endpoint, **stats})
+            fanout = (data.get('shards') or {}).get('fanout_ms')
+            if fanout:
+                endpoints.append({**base, 'endpoint': 'shard fan-out', **fanout})
+        elif r['kind'] == 'serving_modes':
+            for row in data['modes']:
+                modes.append({**base, **row})
+        elif r['kind'] == 'recall':
+            for row in data['modes']:
+                recall.append({**base, 'k': data.get('k'), **row})
+        elif r['kind'] == 'shard_bench':
+            for batch_size, result in data['batches'].items():
+                for mode in ('lean', 'sharded'):
+                    shards.append({**base, 'batch_size': int(batch_size), 'mode': mode,
+                                   'shards': data.get('shards'), **result[mode]})
+    return pd.DataFrame(endpoints), pd.DataFrame(modes), pd.DataFrame(recall), pd.DataFrame(shards)
+
+
+def latest(df):
+    """Rows of the most recent record only"""
+    return df[df['recorded_at'] == df['recorded_at'].max()]
+
+
+def plot_endpoint_latency(endpoints, output_dir):
+    """Latest p50/p95/p99 per endpoint, and p95 per endpoint across runs"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+
+    now = latest(endpoints).sort_values('p95', ascending=False)
+    x = range(len(now))
+    width = 0.27
+    for offset, column, color in [(-width, 'p50', '#2ecc71'), (0, 'p95', '#f39c12'), (width, 'p99', '#e74c3c')]:
+        ax1.bar([i + offset for i in x], now[column], width, label=column, color=color, alpha=0.8, edgecolor='black')
+    ax1.set_xticks(list(x))
+    ax1.set_xticklabels(now['endpoint'], rotation=35, ha='right', fontsize=9)
+    ax1.set_ylabel('Latency (ms)', fontweight='bold')
+    ax1.set_title(f"Latency per Endpoint ({now['run'].iloc[0].replace(chr(10), ', ')})", fontweight='bold', fontsize=12)
+    ax1.legend()
+
+    runs = list(dict.fromkeys(endpoints['run']))
+    for endpoint, group in endpoints.groupby('endpoint'):
+        group = group.drop_duplicates('run', keep='last')
+        ax2.plot([runs.index(run) for run in group['run']], group['p95'], marker='o', linewidth=2, label=endpoint)
+    ax2.set_xticks(range(len(runs)))
+    ax2.set_xticklabels(runs, fontsize=8)
+    ax2.set_ylabel('p95 latency (ms)', fontweight='bold')
+    ax2.set_title('p95 Latency Across Commits', fontweight='bold', fontsize=12)
+    ax2.legend(fontsize=8, loc='upper left')
+
+    plt.tight_layout()
+    plt.savefig(output_dir / '01_endpoint_latency.png', dpi=300, bbox_inches='tight')
+    print("✓ Generated: 01_endpoint_latency.png")
+    plt.close()
+
+
+def plot_rss_by_mode(modes, output_dir):
+    """Latest RSS split per serving mode, and total RSS per mode across runs and catalog sizes"""
+    modes = modes.copy()
+    modes['shard_rss_mb'] = modes.get('shard_rss_mb', pd.Series(dtype=float)).fillna(0.0)
+    modes['total_rss_mb'] = modes['rss_mb'] + modes['shard_rss_mb']
+    fig, axes = plt.subplots(1, 3, figsize=(20, 6))
+
+    now = latest(modes)
+    ax = axes[0]
+    ax.bar(now['mode'], now['rss_private_mb'], label='private', color='#3498db', alpha=0.8, edgecolor='black')
+    ax.bar(now['mode'], now['rss_file_backed_mb'], bottom=now['rss_private_mb'],
+           label='file-backed', color='#95a5a6', alpha=0.8, edgecolor='black')
+    ax.bar(now['mode'], now['shard_rss_mb'], bottom=now['rss_private_mb'] + now['rss_file_backed_mb'],
+           label='shard processes', color='#e67e22', alpha=0.8, edgecolor='black')
+    for i, total in enumerate(now['total_rss_mb']):
+        ax.text(i, total, f'{total:.0f} MB', ha='center', va='bottom', fontweight='bold')
+    ax.set_ylabel('RSS (MB)', fontweight='bold')
+    ax.set_title(f"RSS per Serving Mode ({now['run'].iloc[0].replace(chr(10), ', ')})", fontweight='bold', fontsize=12)
+    ax.legend()
+
+    ax = axes[1]
+    runs = list(dict.fromkeys(modes['run']))
+    for mode, group in modes.groupby('mode'):
+        group = group.drop_duplicates('run', keep='last')
+        ax.plot([runs.index(run) for run in group['run']], group['total_rss_mb'], marker='o', linewidth=2, label=mode)
+    ax.set_xticks(range(len(runs)))
+    ax.set_xticklabels(runs, fontsize=8)
+    ax.set_ylabel('RSS incl. shard processes (MB)', fontweight='bold')
+    ax.set_title('RSS Across Commits', fontweight='bold', fontsize=12)
+    ax.legend()
+
+    ax = axes[2]
+    sized = modes.dropna(subset=['n_movies']).drop_duplicates(['mode', 'n_movies'], keep='last')
+    for mode, group in sized.groupby('mode'):
+        group = group.sort_values('n_movies')
+        ax.plot(group['n_movies'], group['total_rss_mb'], marker='o', linewidth=2, label=mode)
+    ax.set_xlabel('Catalog size (movies)', fontweight='bold')
+    ax.set_ylabel('RSS incl. shard processes (MB)', fontweight='bold')
+    ax.set_title('RSS vs Catalog Size (latest per size)', fontweight='bold', fontsize=12)
+    ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(output_dir / '02_rss_by_mode.png', dpi=300, bbox_inches='tight')
+    print("✓ Generated: 02_rss_by_mode.png")
+    plt.close()
+
+
+def plot_recall_vs_speed(recall, output_dir):
+    """Recall@k against p50 query latency, one point per mode and catalog size"""
+    fig, ax = plt.subplots(figsize=(12, 7))
+
+    points = recall.drop_duplicates(['mode', 'n_movies'], keep='last')
+    markers = dict(zip(sorted(points['n_movies'].dropna().unique()), 'os^Dvp*'))
+    colors = dict(zip(sorted(points['mode'].unique()), sns.color_palette('husl', points['mode'].nunique())))
+    for _, row in points.iterrows():
+        ax.errorbar(row['p50_ms'], row['recall_at_k'], xerr=[[0], [row['p95_ms'] - row['p50_ms']]],
+                    fmt=markers.get(row['n_movies'], 'o'), color=colors[row['mode']], markersize=10,
+                    markeredgecolor='black', capsize=4)
+    for mode, color in colors.items():
+        dtypes = points[points['mode'] == mode]['dtype'].dropna()
+        name = f'{mode} ({dtypes.iloc[-1]})' if len(dtypes) else mode
+        ax.scatter([], [], marker='o', color=color, edgecolor='black', label=name)
+    for n_movies, marker in markers.items():
+        ax.scatter([], [], marker=marker, color='gray', edgecolor='black', label=f'{int(n_movies)} movies')
+
+    ax.set_xscale('log')
+    ax.set_xlabel('Query latency (ms, p50; bar to p95)', fontweight='bold')
+    ax.set_ylabel(f"Recall@{int(points['k'].iloc[-1])} vs exact full mode", fontweight='bold')
+    ax.set_ylim(min(0.9, points['recall_at_k'].min() - 0.02), 1.01)
+    ax.set_title('Recall vs Speed of Serving Modes', fontweight='bold', fontsize=14)
+    ax.legend(loc='lower right')
+
+    plt.tight_layout()
+    plt.savefig(output_dir / '03_recall_vs_speed.png', dpi=300, bbox_inches='tight')
+    print("✓ Generated: 03_recall_vs_speed.png")
+    plt.close()
+
+
+def plot_shard_fanout(shards, output_dir):
+    """Latest sharded vs in-process latency per batch size"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    now = latest(shards)
+    for mode, color in [('lean', '#2ecc71'), ('sharded', '#e67e22')]:
+        group = now[now['mode'] == mode].sort_values('batch_size')
+        ax.plot(group['batch_size'], group['p50'], marker='o', linewidth=2, color=color, label=f'{mode} p50')
+        ax.fill_between(group['batch_size'], group['p50'], group['p99'], color=color, alpha=0.2,
+                        label=f'{mode} p50-p99')
+    ax.set_xscale('log', base=2)
+    ax.set_xlabel('Query movies per call', fontweight='bold')
+    ax.set_ylabel('Latency (ms)', fontweight='bold')
+    ax.set_title(f"Sharded ({int(now['shards'].iloc[0])} shards) vs In-Process Top-N "
+                 f"({now['run'].iloc[0].replace(chr(10), ', ')})", fontweight='bold', fontsize=12)
+    ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(output_dir / '04_shard_fanout.png', dpi=300, bbox_inches='tight')
+    print("✓ Generated: 04_shard_fanout.png")
+    plt.close()
+
+
+def plot(history_path, output_dir):
+    """Render every chart that the history has data for"""
+    print("=" * 80)
+    print("GENERATING PERFORMANCE DASHBOARD")
+    print("=" * 80)
+
+    records = load_history(history_path)
+    print(f"\n✓ Loaded {len(records)} records from {history_path}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    endpoints, modes, recall, shards = flatten(records)
+
+    print("\nGenerating visualizations...")
+    generated = []
+    for name, df, chart, source in [
+        ('01_endpoint_latency.png', endpoints, plot_endpoint_latency, '/metrics snapshots'),
+        ('02_rss_by_mode.png', modes, plot_rss_by_mode, 'serving_report.py compare'),
+        ('03_recall_vs_speed.png', recall, plot_recall_vs_speed, 'serving_report.py recall'),
+        ('04_shard_fanout.png', shards, plot_shard_fanout, 'similarity_shards.py bench'),
+    ]:
+        if df.empty:
+            print(f"⚠ No {source} recorded, skipping {name}")
+            continue
+        chart(df, output_dir)
+        generated.append(name)
+
+    print("\n" + "=" * 80)
+    print("VISUALIZATION COMPLETE!")
+    print("=" * 80)
+    print(f"\nAll charts saved to: {output_dir}")
+    print("\nGenerated files:")
+    for i, name in enumerate(generated, 1):
+        print(f"  {i}. {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['record', 'plot'])
+    parser.add_argument('files', nargs='*', help='benchmark or /metrics JSON files (record)')
+    parser.add_argument('--metrics-url', help='snapshot GET /metrics from a running server (record)')
+    parser.add_argument('--commit', help='commit to tag records with (default: current HEAD)')
+    parser.add_argument('--label', default='', help='free-form tag stored with the records')
+    parser.add_argument('--history', default=str(HISTORY_PATH))
+    parser.add_argument('--out-dir', default=str(OUTPUT_DIR))
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        documents = []
+        for path in args.files:
+            with open(path) as f:
+                documents.append((path, json.load(f)))
+        if args.metrics_url:
+            documents.append((args.metrics_url, fetch_metrics(args.metrics_url)))
+        if not documents:
+            parser.error("record needs JSON files and/or --metrics-url")
+        record(documents, Path(args.history), commit=args.commit, label=args.label)
+    else:
+        plot(Path(args.history), Path(args.out_dir))
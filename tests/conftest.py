@@ -0,0 +1,90 @@
+"""
+Shared test setup: scripts/ on the import path and one small synthetic catalog
+
+The catalog has N_MOVIES movies in N_CLUSTERS groups of similar content, with
+movie ids that are not catalog positions (so id/index mix-ups show), written
+as the notebook pickles a full-mode MovieRecommender loads.
+"""
+
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+N_CLUSTERS = 6
+CLUSTER_SIZE = 8
+N_MOVIES = N_CLUSTERS * CLUSTER_SIZE
+
+NAMED_TITLES = [
+    'Inception', 'The Dark Knight', 'Avatar', 'Star Wars', 'The Empire Strikes Back',
+    'Spider-Man 2', 'Amélie', 'The Lord of the Rings: The Two Towers'
+]
+WORDS = ['night', 'river', 'silent', 'city', 'winter', 'garden', 'echo', 'harbor', 'mirror', 'signal']
+GENRES = ['Action', 'Comedy', 'Drama', 'Horror', 'Science Fiction', 'Romance']
+
+
+@pytest.fixture(scope='session')
+def catalog():
+    """Plain arrays of the synthetic catalog (titles, movie ids, clusters, similarity)"""
+    rng = np.random.default_rng(7)
+    titles = list(NAMED_TITLES)
+    while len(titles) < N_MOVIES:
+        title = ' '.join(rng.choice(WORDS, size=2, replace=False)).title() + f' {len(titles)}'
+        titles.append(title)
+
+    clusters = np.repeat(np.arange(N_CLUSTERS), CLUSTER_SIZE)
+    centres = rng.normal(size=(N_CLUSTERS, 16))
+    vectors = centres[clusters] + 0.35 * rng.normal(size=(N_MOVIES, 16))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Non-negative like TF-IDF cosine similarity
+    similarity = np.clip(vectors @ vectors.T, 0.0, 1.0)
+
+    return {
+        'titles': titles,
+        'movie_ids': 1000 + 7 * np.arange(N_MOVIES),
+        'clusters': clusters,
+        'popularity': rng.uniform(0, 100, N_MOVIES),
+        'vote_average': rng.uniform(1, 9, N_MOVIES).round(1),
+        'similarity': similarity
+    }
+
+
+@pytest.fixture(scope='session')
+def models_dir(catalog, tmp_path_factory):
+    """The catalog as notebook-style model pickles"""
+    pd = pytest.importorskip('pandas')
+    rng = np.random.default_rng(11)
+    n = len(catalog['titles'])
+    train_df = pd.DataFrame({
+        'movie_id': catalog['movie_ids'],
+        'title': catalog['titles'],
+        'release_year': rng.integers(1960, 2020, n),
+        'overview': [' '.join(rng.choice(WORDS, size=12)) for _ in range(n)],
+        'vote_average': catalog['vote_average'],
+        'vote_count': rng.integers(0, 5000, n),
+        'popularity': catalog['popularity'],
+        'genres_list': [
+            [{'id': int(j), 'name': GENRES[j]} for j in rng.choice(len(GENRES), size=2, replace=False)]
+            for _ in range(n)
+        ]
+    })
+
+    path = tmp_path_factory.mktemp('models')
+    with open(path / 'preprocessed_data.pkl', 'wb') as f:
+        pickle.dump({'train_df': train_df}, f)
+    with open(path / 'content_based_models_improved.pkl', 'wb') as f:
+        pickle.dump({'similarity_matrix_cosine': catalog['similarity']}, f)
+    with open(path / 'hybrid_model_improved.pkl', 'wb') as f:
+        pickle.dump({'weights': {'ensemble': 0.8, 'popularity': 0.08, 'rating': 0.12}}, f)
+    return path
+
+
+@pytest.fixture(scope='session')
+def recommender(models_dir):
+    """Full-mode MovieRecommender over the synthetic catalog"""
+    from movie_recommender import MovieRecommender
+    return MovieRecommender(models_dir=str(models_dir), serving_mode='full')
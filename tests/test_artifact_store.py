@@ -0,0 +1,63 @@
+import json
+import os
+
+import numpy as np
+
+import artifact_store
+
+
+def _export(parent, version, payload, mtime):
+    path, name = artifact_store.new_export_dir(str(parent), version)
+    with open(os.path.join(path, 'data.json'), 'w') as f:
+        json.dump(payload, f)
+    # Exports created within one test would otherwise share a timestamp
+    os.utime(path, ns=(mtime, mtime))
+    return path, name
+
+
+def test_publish_points_the_manifest_at_the_export(tmp_path):
+    path, name = _export(tmp_path, 'v1', {'value': 1}, mtime=1)
+    artifact_store.publish(str(tmp_path), path, {'model_version': 'v1'})
+
+    manifest = artifact_store.read_manifest(str(tmp_path))
+    assert manifest == {'model_version': 'v1', 'files_dir': name}
+    assert artifact_store.files_dir(str(tmp_path), manifest) == path
+    # The copy inside the export describes it without pointing anywhere else
+    assert artifact_store.read_manifest(path) == {'model_version': 'v1', 'files_dir': None}
+    assert sorted(os.listdir(tmp_path)) == sorted([name, artifact_store.MANIFEST_FILE])
+
+
+def test_manifests_without_files_dir_keep_files_beside_them(tmp_path):
+    assert artifact_store.files_dir(str(tmp_path), {'model_version': 'legacy'}) == str(tmp_path)
+
+
+def test_publish_keeps_the_newest_exports_and_never_the_published_one(tmp_path):
+    names = []
+    for version in range(4):
+        path, name = _export(tmp_path, f'v{version}', {'value': version}, mtime=10 + version)
+        names.append(name)
+    # Publish an export that is older than the others: it still survives pruning
+    artifact_store.publish(str(tmp_path), os.path.join(tmp_path, names[1]), {'model_version': 'v1'}, keep=2)
+
+    remaining = {entry for entry in os.listdir(tmp_path) if entry.startswith(artifact_store.EXPORT_PREFIX)}
+    assert remaining == {names[1], names[3]}
+
+
+def test_republishing_leaves_a_live_export_untouched(recommender, tmp_path):
+    from movie_recommender import MovieRecommender
+
+    serving_dir = str(tmp_path / 'serving')
+    recommender.export_serving_artifacts(serving_dir)
+    first_dir = artifact_store.files_dir(serving_dir, artifact_store.read_manifest(serving_dir))
+    lean = MovieRecommender(models_dir=str(tmp_path), serving_mode='lean')
+    before = {name: os.path.getmtime(os.path.join(first_dir, name)) for name in os.listdir(first_dir)}
+
+    recommender.export_serving_artifacts(serving_dir)
+
+    second_dir = artifact_store.files_dir(serving_dir, artifact_store.read_manifest(serving_dir))
+    assert second_dir != first_dir
+    assert {name: os.path.getmtime(os.path.join(first_dir, name)) for name in os.listdir(first_dir)} == before
+    indices, scores, _ = lean.top_n_arrays([0, 5], n_recommendations=5)
+    expected_indices, expected_scores, _ = recommender.top_n_arrays([0, 5], n_recommendations=5)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pytest
+
+from bulk_export import TRIPLE_DTYPE, encode_stream, export_recommendations, read_triples, resolve_format
+
+
+def _chunks():
+    yield np.array([1, 1]), np.array([10, 11]), np.array([0.9, 0.8], dtype=np.float32)
+    yield np.array([2]), np.array([12]), np.array([0.5], dtype=np.float32)
+
+
+def test_npy_stream_is_a_loadable_structured_array():
+    data = b''.join(encode_stream(_chunks(), 3, 'npy'))
+    rows = np.load(io.BytesIO(data))
+    assert rows.dtype == TRIPLE_DTYPE
+    assert rows['seed_id'].tolist() == [1, 1, 2]
+    assert rows['rec_id'].tolist() == [10, 11, 12]
+    np.testing.assert_allclose(rows['score'], [0.9, 0.8, 0.5])
+
+
+def test_npy_header_declares_the_row_count():
+    stream = io.BytesIO(next(encode_stream(iter(()), 7, 'npy')))
+    assert np.lib.format.read_magic(stream) == (1, 0)
+    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    assert shape == (7,) and not fortran_order and dtype == TRIPLE_DTYPE
+
+
+def test_arrow_ipc_stream_round_trips():
+    pa = pytest.importorskip('pyarrow')
+    data = b''.join(encode_stream(_chunks(), 3, 'arrow'))
+
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.schema.names == ['seed_id', 'rec_id', 'score']
+    assert table.num_rows == 3
+    assert table.column('rec_id').to_pylist() == [10, 11, 12]
+    rows = read_triples(data, 'arrow')
+    assert rows['seed_id'].tolist() == [1, 1, 2]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_format('parquet')
+
+
+@pytest.mark.parametrize('model_type', ['hybrid', 'content_based'])
+def test_export_never_recommends_a_seed_to_itself(recommender, model_type):
+    # Every other movie requested: the seed's own column used to make the list
+    seeds = list(range(recommender.n_movies))
+    fmt, n_rows, stream = export_recommendations(
+        recommender, seeds, model_type, n_recommendations=recommender.n_movies, fmt='npy', chunk_size=10
+    )
+
+    rows = np.load(io.BytesIO(b''.join(stream)))
+    assert len(rows) == n_rows == len(seeds) * (recommender.n_movies - 1)
+    assert not (rows['seed_id'] == rows['rec_id']).any()
+    assert np.isfinite(rows['score']).all()
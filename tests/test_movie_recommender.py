@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from movie_recommender import MovieRecommender
+
+
+def test_mmr_demotes_candidates_redundant_with_earlier_picks():
+    relevance = np.array([0.9, 0.89, 0.5])
+    # 0 and 1 are near duplicates, 2 is unrelated to both
+    block = np.array([[1.0, 0.99, 0.0], [0.99, 1.0, 0.0], [0.0, 0.0, 1.0]])
+
+    assert MovieRecommender._mmr_order(block, relevance, 3, diversity=0.0).tolist() == [0, 1, 2]
+    assert MovieRecommender._mmr_order(block, relevance, 3, diversity=0.5).tolist() == [0, 2, 1]
+
+
+def test_mmr_puts_masked_candidates_last():
+    relevance = np.array([-np.inf, 0.2, 0.8, -np.inf])
+    order = MovieRecommender._mmr_order(np.eye(4), relevance, 4, diversity=0.3)
+    assert order[:2].tolist() == [2, 1]
+    assert sorted(order[2:].tolist()) == [0, 3]
+
+
+@pytest.mark.parametrize('diversity', [0.5, 0.9])
+def test_diversified_results_never_include_the_query_movie(recommender, catalog, diversity):
+    clusters = catalog['clusters']
+    n_clusters = clusters.max() + 1
+    for seed in range(0, len(clusters), 5):
+        # Only one other cluster left: its members are redundant with each other while
+        # the query movie is not, which used to let MMR pick the query movie itself
+        others = np.flatnonzero(clusters != (clusters[seed] + 1) % n_clusters)
+        exclude = [np.setdiff1d(others, [seed])]
+
+        result, = recommender.recommend_indices([seed], 'content_based', 5, exclude=exclude, diversity=diversity)
+
+        ids = [entry['movie_id'] for entry in result['recommendations']]
+        assert len(ids) == 5
+        assert catalog['movie_ids'][seed] not in ids
+
+
+def test_diversity_changes_order_but_not_relevance_pool(recommender):
+    plain, = recommender.recommend_indices([0], 'hybrid', 10)
+    diverse, = recommender.recommend_indices([0], 'hybrid', 10, diversity=0.7, n_candidates=10)
+
+    plain_ids = [entry['movie_id'] for entry in plain['recommendations']]
+    diverse_ids = [entry['movie_id'] for entry in diverse['recommendations']]
+    assert sorted(diverse_ids) == sorted(plain_ids)
+    assert diverse['diversity'] == {'lambda': 0.7, 'candidates': 10}
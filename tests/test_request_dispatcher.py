@@ -0,0 +1,76 @@
+import asyncio
+
+from request_dispatcher import RecommendDispatcher
+
+
+class CountingRecommender:
+    """Delegates to the real recommender, recording each recommend_indices batch"""
+
+    def __init__(self, recommender):
+        self._recommender = recommender
+        self.batches = []
+
+    def __getattr__(self, name):
+        return getattr(self._recommender, name)
+
+    def recommend_indices(self, movie_indices, *args, **kwargs):
+        self.batches.append(list(movie_indices))
+        return self._recommender.recommend_indices(movie_indices, *args, **kwargs)
+
+
+def _gather(dispatcher, titles, **kwargs):
+    async def run():
+        return await asyncio.gather(*(dispatcher.recommend(title, **kwargs) for title in titles))
+    return asyncio.run(run())
+
+
+def test_identical_requests_share_one_scoring_job(recommender):
+    counting = CountingRecommender(recommender)
+    dispatcher = RecommendDispatcher(counting, window_ms=5.0)
+
+    first, second = _gather(dispatcher, ['Avatar', 'Avatar'], n_recommendations=5)
+
+    assert counting.batches == [[2]]
+    assert first['recommendations'] == second['recommendations']
+    metrics = dispatcher.metrics()
+    assert metrics['requests'] == 2 and metrics['coalesced'] == 1 and metrics['inflight'] == 0
+
+
+def test_coalesced_callers_get_their_own_depth(recommender):
+    dispatcher = RecommendDispatcher(CountingRecommender(recommender), window_ms=5.0)
+
+    async def run():
+        return await asyncio.gather(
+            dispatcher.recommend('Avatar', n_recommendations=3),
+            dispatcher.recommend('Avatar', n_recommendations=8)
+        )
+    short, deep = asyncio.run(run())
+
+    assert len(short['recommendations']) == 3
+    assert len(deep['recommendations']) == 8
+    assert deep['recommendations'][:3] == short['recommendations']
+
+
+def test_distinct_requests_are_split_into_batches_of_max_size(recommender, catalog):
+    counting = CountingRecommender(recommender)
+    dispatcher = RecommendDispatcher(counting, window_ms=5.0, max_batch_size=2)
+    titles = catalog['titles'][:5]
+
+    results = _gather(dispatcher, titles, n_recommendations=4)
+
+    assert sorted(len(batch) for batch in counting.batches) == [1, 2, 2]
+    assert sorted(idx for batch in counting.batches for idx in batch) == [0, 1, 2, 3, 4]
+    assert dispatcher.metrics()['batch_size_histogram'] == {'1': 1, '2': 2}
+    for title, result in zip(titles, results):
+        assert result['query_movie'] == title
+        assert result['recommendations'] == recommender.recommend_hybrid(title, 4)['recommendations']
+
+
+def test_unknown_titles_are_not_queued(recommender):
+    counting = CountingRecommender(recommender)
+    dispatcher = RecommendDispatcher(counting)
+
+    result, = _gather(dispatcher, ['Qwxyz Plover'])
+
+    assert 'error' in result
+    assert counting.batches == []
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from similarity_shards import ShardRouter, export_shards
+
+
+@pytest.fixture(scope='module')
+def router(recommender, tmp_path_factory):
+    # 48 columns in 3 shards of 16, so a top-20 needs candidates from several shards
+    shard_dir = export_shards(recommender, str(tmp_path_factory.mktemp('shards')), n_shards=3)
+    router = ShardRouter(shard_dir, expected_version=recommender.model_version, start_timeout_s=30)
+    yield router
+    router.close()
+
+
+@pytest.mark.parametrize('model_type', ['hybrid', 'content_based'])
+@pytest.mark.parametrize('n', [5, 20])
+def test_merged_top_n_matches_the_full_matrix(recommender, router, model_type, n):
+    queries = [0, 17, 47]
+    coefficients = recommender._hybrid_coefficients() if model_type == 'hybrid' else None
+
+    indices, scores, content = router.top_n(queries, coefficients, n)
+    expected = recommender.top_n_arrays(queries, model_type, n)
+
+    np.testing.assert_array_equal(indices, expected[0])
+    np.testing.assert_allclose(scores, expected[1], rtol=1e-6)
+    np.testing.assert_allclose(content, expected[2], rtol=1e-6)
+
+
+def test_exclusions_are_applied_in_every_shard(recommender, router):
+    queries = [3, 30]
+    exclude = [np.arange(0, 48, 2), None]
+
+    indices, scores, _ = router.top_n(queries, recommender._hybrid_coefficients(), 10, exclude)
+    expected = recommender.top_n_arrays(queries, 'hybrid', 10, exclude)
+
+    np.testing.assert_array_equal(indices, expected[0])
+    assert not np.isin(indices[0], exclude[0]).any()
+    assert np.isfinite(scores).all()
+
+
+def test_similarity_block_is_assembled_across_shards(catalog, router):
+    rows, cols = np.array([1, 40]), np.array([2, 20, 45, 0])
+    np.testing.assert_allclose(router.similarity_block(rows, cols), catalog['similarity'][np.ix_(rows, cols)])
+
+
+def test_shards_from_another_model_version_are_refused(router):
+    with pytest.raises(ValueError):
+        ShardRouter(router.shard_dir, expected_version='not-this-one')
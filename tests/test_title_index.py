@@ -0,0 +1,53 @@
+import pytest
+
+from title_index import TitleIndex, bounded_levenshtein
+
+
+@pytest.fixture(scope='module')
+def index(catalog):
+    return TitleIndex(catalog['titles'])
+
+
+def test_bounded_levenshtein_gives_up_past_the_bound():
+    assert bounded_levenshtein('inception', 'incepton', 3) == 1
+    assert bounded_levenshtein('inception', 'avatar', 2) == 3
+
+
+def test_exact_lookup_ignores_case(index):
+    assert index.lookup_exact('the dark KNIGHT') == 1
+    assert index.lookup_exact('Dark Knight') is None
+
+
+@pytest.mark.parametrize('query', [
+    'dark kni', 'star', 'WARS', ': the two', 'spider-man', 'r-m', 'amélie', 'mé', '2', 'e', 'zzz', '::'
+])
+def test_substring_lookup_matches_a_linear_scan(index, catalog, query):
+    lowered = [title.lower() for title in catalog['titles']]
+    expected = next((idx for idx, title in enumerate(lowered) if query.lower() in title), None)
+    assert index.lookup_substring(query) == expected
+
+
+def test_substring_lookup_finds_every_slice_of_every_title(index, catalog):
+    for idx, title in enumerate(catalog['titles']):
+        for start in range(0, len(title) - 3, 3):
+            found = index.lookup_substring(title[start:start + 4])
+            assert found is not None and found <= idx
+            assert title[start:start + 4].lower() in catalog['titles'][found].lower()
+
+
+def test_search_confidence_is_normalized_edit_distance(index):
+    (idx, confidence), = index.search('Incepton', limit=1)
+    assert idx == 0
+    assert confidence == pytest.approx(1 - 1 / 9)
+    assert index.search('Qwxyz') == []
+
+
+def test_fuzzy_threshold_decides_acceptance(recommender):
+    # 1 and 3 substitutions in 9 characters: confidence 0.89 and 0.67 against the 0.75 default
+    assert recommender.get_movie_by_title('Incepton') == 0
+    assert recommender.get_movie_by_title('Incepxxxn') is None
+
+    suggestion, = recommender.suggest_titles('Incepxxxn', limit=1)
+    assert suggestion['title'] == 'Inception'
+    assert suggestion['confidence'] == pytest.approx(1 - 3 / 9, abs=1e-4)
+    assert not suggestion['accepted']
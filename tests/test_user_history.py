@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from user_history import HistoryStore, SeenSet
+
+
+def test_seen_set_switches_to_a_bitmap_once_it_is_smaller():
+    seen = SeenSet(1000)  # bitmap: 125 bytes; array: 2 bytes per movie
+    seen.add(np.arange(0, 124, 2))
+    assert not seen.is_bitmap and seen.nbytes == 124
+
+    assert seen.add([500, 502]) == 2
+    assert seen.is_bitmap and seen.nbytes == 125
+    assert len(seen) == 64
+    assert seen.contains([0, 1, 500, 999]).tolist() == [True, False, True, False]
+
+
+def test_seen_set_goes_back_to_an_array_only_when_clearly_smaller():
+    seen = SeenSet(1000)
+    seen.add(np.arange(64))
+    assert seen.is_bitmap
+
+    seen.remove(np.arange(32))  # 32 left: 64 bytes as an array, not under half the bitmap
+    assert seen.is_bitmap
+    seen.remove([32])
+    assert not seen.is_bitmap
+    assert seen.to_indices().tolist() == list(range(33, 64))
+
+
+def test_seen_set_rejects_indices_outside_the_catalog():
+    with pytest.raises(ValueError):
+        SeenSet(10).add([10])
+
+
+def test_bind_remaps_histories_by_movie_id(catalog):
+    old_ids = catalog['movie_ids']
+    store = HistoryStore()
+    store.bind(old_ids)
+    store.add('alice', [0, 3, 5])
+    revision = store.revision('alice')
+
+    # New catalog: reversed, without movie 3, with an unknown movie appended
+    new_ids = np.r_[np.delete(old_ids, 3)[::-1], 99999]
+    store.bind(new_ids)
+
+    assert set(new_ids[store.seen_indices('alice')]) == {old_ids[0], old_ids[5]}
+    assert store.revision('alice') != revision
+    assert store.stats['dropped_on_rebind'] == 1
+
+
+def test_rebinding_an_equal_catalog_keeps_histories(catalog):
+    store = HistoryStore()
+    store.bind(catalog['movie_ids'])
+    store.add('alice', [1, 2])
+    revision = store.revision('alice')
+
+    store.bind(catalog['movie_ids'].copy())
+
+    assert store.seen_indices('alice').tolist() == [1, 2]
+    assert store.revision('alice') == revision
+
+
+def test_requests_on_the_previous_catalog_are_translated(catalog):
+    old_ids = catalog['movie_ids']
+    new_ids = old_ids[::-1].copy()
+    store = HistoryStore()
+    store.bind(old_ids)
+    store.add('alice', [0])
+    store.bind(new_ids)
+
+    # A request still running on the old recommender reads and writes in its own indices
+    assert store.seen_indices('alice', old_ids).tolist() == [0]
+    store.add('alice', [1], old_ids)
+    store.remove('alice', [0], old_ids)
+
+    assert store.seen_indices('alice', old_ids).tolist() == [1]
+    assert store.seen_indices('alice', new_ids).tolist() == [len(old_ids) - 2]
+
+
+def test_least_recently_used_users_are_evicted(catalog):
+    store = HistoryStore(max_users=2)
+    store.bind(catalog['movie_ids'])
+    store.add('a', [1])
+    store.add('b', [2])
+    store.seen_indices('a')
+    store.add('c', [3])
+
+    assert set(store.users) == {'a', 'c'}
+    assert store.stats['evicted'] == 1
+
+
+def test_history_size_is_capped_per_user(catalog):
+    store = HistoryStore(max_items_per_user=3)
+    store.bind(catalog['movie_ids'])
+    store.add('alice', [0, 1, 2])
+
+    with pytest.raises(ValueError):
+        store.add('alice', [3])
+    assert store.add('alice', [2]) == 0